@@ -0,0 +1,102 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Benchmark suite runner:
+#   PYTHONPATH=src python -m benchmarks run -o results.json [-k 'run:*'] [--repeat 5]
+#   PYTHONPATH=src python -m benchmarks compare baseline.json results.json [--threshold 0.1]
+#   PYTHONPATH=src python -m benchmarks list
+# compare exits with status 1 if any case is slower than the baseline by more than the threshold
+import typing
+import argparse
+import json
+import sys
+
+from . import suite
+from .common import report
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f} ms'
+    return f'{seconds * 1e6:.2f} us'
+
+
+def run(args: argparse.Namespace) -> int:
+    cases = suite.select(args.filter)
+    if not cases:
+        print(f'No benchmarks match {args.filter}', file=sys.stderr)
+        return 2
+    results: typing.Dict[str, typing.Any] = {}
+    for result in suite.run(cases, repeat=args.repeat):
+        results[result.name] = result.as_dict()
+        print(f'{result.name:<50} {_format_time(result.seconds):>12}', file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': suite.metadata(), 'results': results}, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    rows = []
+    regressions = 0
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append([name, '-', _format_time(result['seconds']), '-', 'new'])
+            continue
+        ratio = result['seconds'] / base['seconds']
+        if ratio > 1 + args.threshold:
+            status = 'SLOWER'
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            status = 'faster'
+        else:
+            status = ''
+        rows.append(
+            [name, _format_time(base['seconds']), _format_time(result['seconds']), f'{ratio:.2f}x', status]
+        )
+    report(
+        f'{baseline["metadata"]["version"]} ({args.baseline}) vs {current["metadata"]["version"]} ({args.current})',
+        rows,
+        ['benchmark', 'baseline', 'current', 'ratio', ''],
+    )
+    if regressions:
+        print(f'\n{regressions} benchmark(s) slower than baseline by more than {args.threshold:.0%}')
+        return 1
+    return 0
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='yrunner benchmark suite')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run benchmarks')
+    run_parser.add_argument('-k', dest='filter', action='append', default=[], help='Only benchmarks matching')
+    run_parser.add_argument('-o', '--output', help='Write results (json) to this file')
+    run_parser.add_argument('--repeat', type=int, default=5, help='Repetitions of each benchmark (best is kept)')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare results with a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument(
+        '--threshold', type=float, default=0.1, help='Relative slowdown considered a regression (default 0.1)'
+    )
+    compare_parser.set_defaults(func=compare)
+
+    list_parser = subparsers.add_parser('list', help='List benchmarks')
+    list_parser.set_defaults(func=lambda args: print('\n'.join(suite.CASES)) or 0)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,25 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+import typing
+import timeit
+
+
+# Best time per call (in seconds) of several repetitions, less noisy than the average
+def measure(func: typing.Callable[[], typing.Any], number: int = 10000, repeat: int = 5) -> float:
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def report(title: str, rows: typing.Iterable[typing.Sequence[typing.Any]], headers: typing.Sequence[str]) -> None:
+    rows = [[str(col) for col in row] for row in rows]
+    widths = [max(len(h), *(len(row[i]) for row in rows)) for i, h in enumerate(headers)]
+    print(f'\n{title}')
+    print('  '.join(h.ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(col.ljust(w) for col, w in zip(row, widths)))
+
+
+def usec(seconds: float) -> str:
+    return f'{seconds * 1e6:.2f} us'
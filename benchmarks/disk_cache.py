@@ -0,0 +1,43 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Cold start compilation (empty in memory caches, as a new worker) vs loading from the disk cache
+# Run with: PYTHONPATH=src python -m benchmarks.disk_cache
+import tempfile
+
+from yrunner import YRunner, diskcache, parser, runner
+
+from .common import measure, report
+from .yaml_loading import generate
+
+
+def cold_compile(yrunner: YRunner, script: str) -> None:
+    parser.EXPRESSION_CACHE.clear()
+    runner.TEMPLATE_CACHE.clear()
+    yrunner.compile(script)
+
+
+def main() -> None:
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        cached = YRunner(disk_cache=diskcache.DiskCache(directory))
+        for steps in (100, 1000, 5000):
+            script = generate(steps)
+            cached.compile(script)  # Store it
+            compile_time = measure(lambda: cold_compile(YRunner(), script), number=1, repeat=3)
+            cached_time = measure(lambda: cold_compile(cached, script), number=1, repeat=3)
+            rows.append(
+                [
+                    f'{steps * 2} commands',
+                    f'{compile_time * 1000:.1f} ms',
+                    f'{cached_time * 1000:.1f} ms',
+                    f'{compile_time / cached_time:.1f}x',
+                ]
+            )
+    report('Cold start compilation', rows, ['script', 'compile', 'disk cache', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Tree walking engine (YRunner.execute) vs flat instructions engine (vm)
+# Run with: PYTHONPATH=src python -m benchmarks.engines
+import typing
+
+from yrunner import YRunner
+
+from .common import measure, report
+
+TIGHT_LOOP_YAML: typing.Final[str] = '''
+- set:
+    var: i
+    value: 0
+- while:
+    condition: i < 10000
+    commands:
+        - set:
+            var: i
+            value: i + 1
+'''
+
+CONTINUE_BREAK_YAML: typing.Final[str] = '''
+- set:
+    var: i
+    value: 0
+- while:
+    condition: 1
+    commands:
+        - set:
+            var: i
+            value: i + 1
+        - if:
+            condition: i % 2 == 0
+            commands:
+                - continue
+        - if:
+            condition: i >= 10000
+            commands:
+                - break
+'''
+
+NESTED_LOOPS_YAML: typing.Final[str] = '''
+- set:
+    var: i
+    value: 0
+- while:
+    condition: i < 100
+    commands:
+        - set:
+            var: i
+            value: i + 1
+        - set:
+            var: j
+            value: 0
+        - while:
+            condition: j < 100
+            commands:
+                - set:
+                    var: j
+                    value: j + 1
+'''
+
+SCRIPTS: typing.Final[typing.Dict[str, str]] = {
+    'tight while (10k iterations)': TIGHT_LOOP_YAML,
+    'while + continue/break (10k iterations)': CONTINUE_BREAK_YAML,
+    'nested while (100x100)': NESTED_LOOPS_YAML,
+}
+
+
+def main() -> None:
+    rows = []
+    for name, script in SCRIPTS.items():
+        times = []
+        for use_vm in (False, True):
+            runner = YRunner(use_vm=use_vm)
+            compiled = runner.compile(script)
+            times.append(measure(lambda: runner.run(compiled), number=5, repeat=5))
+        rows.append([name, f'{times[0] * 1e3:.2f} ms', f'{times[1] * 1e3:.2f} ms', f'{times[0] / times[1]:.1f}x'])
+    report('Execution engines (per run)', rows, ['script', 'tree', 'vm', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Compiled (closure tree) expressions vs the stack based RPN interpreter
+# Run with: PYTHONPATH=src python -m benchmarks.expressions
+import typing
+
+from yrunner import parser
+
+from .common import measure, report, usec
+
+VARIABLES: typing.Final[typing.Dict[str, typing.Any]] = {'x0': 10, 'x1': 'hello', 'x2': 2.5, 'flag': False}
+
+EXPRESSIONS: typing.Final[typing.List[str]] = [
+    'x0',
+    'x0 - 1',
+    'x0 > 0',
+    'x0 * 2 + x2 / 3',
+    '(x0 + 1) * (x0 - 1) % 7',
+    'x1 + " world"',
+    'x0 > 0 and x1 == "hello"',
+    'flag and x0 > 0 and x2 < 10',
+    'x0 > 0 or flag',
+    'not flag && (x0 >= 5 || x2 <= 1)',
+]
+
+
+def main() -> None:
+    rows = []
+    for expression in EXPRESSIONS:
+        compiled = parser.compile_expression(expression)
+        rpn = compiled.rpn
+        stack_time = measure(lambda: parser.eval_rpn(rpn, VARIABLES))
+        compiled_time = measure(lambda: compiled.evaluate(VARIABLES))
+        rows.append([expression, usec(stack_time), usec(compiled_time), f'{stack_time / compiled_time:.1f}x'])
+    report('Expression evaluation (per call)', rows, ['expression', 'stack (rpn)', 'compiled', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Polling an endpoint in a while loop, with the pooled session of the runner vs a new session per request
+# Run with: PYTHONPATH=src python -m benchmarks.http_requests
+import typing
+
+import requests
+
+from yrunner import YRunner, types
+from yrunner.executors import http
+
+from tests.local_server import LocalServer  # Benchmarks run from the repository root
+
+from .common import measure, report
+
+REQUESTS: typing.Final[int] = 200
+
+POLL_YAML: typing.Final[str] = f'''
+- set:
+    var: i
+    value: 0
+- while:
+    condition: i < {REQUESTS}
+    commands:
+        - set:
+            var: i
+            value: i + 1
+        - request:
+            method: GET
+            url: "{{{{ base_url }}}}/poll"
+            params:
+                i: "{{{{ i }}}}"
+            response_var: response
+'''
+
+
+# Previous behaviour, every request creates (and destroys) its own session and connection pool
+def exec_request_no_pool(node: typing.Mapping[str, typing.Any], runner: YRunner) -> None:
+    request = node['request']
+    response = requests.request(
+        request['method'],
+        runner.eval_string(request['url']),
+        params={k: runner.eval_string(v) for k, v in request['params'].items()},
+    )
+    runner.set_variable(request['response_var'], response)
+
+
+def main() -> None:
+    with LocalServer() as server:
+        rows = []
+        for name, commands in [
+            ('new session per request', [types.Command('request', exec_request_no_pool, None)]),
+            ('pooled session', http.COMMANDS),
+        ]:
+            runner = YRunner(commands, variables={'base_url': server.url})
+            compiled = runner.compile(POLL_YAML)
+            elapsed = measure(lambda: runner.run(compiled), number=1, repeat=5)
+            rows.append(
+                [name, f'{elapsed * 1e3:.1f} ms', f'{elapsed / REQUESTS * 1e6:.0f} us', f'{REQUESTS / elapsed:.0f}']
+            )
+        report(
+            f'Polling a local server ({REQUESTS} requests per run)', rows, ['mode', 'per run', 'per request', 'req/s']
+        )
+
+
+if __name__ == '__main__':
+    main()
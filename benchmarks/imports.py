@@ -0,0 +1,57 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Start up time of a new interpreter importing yrunner (and running a small script with the cli), so the
+# cost of imports of short lived invocations can be tracked
+# Run with: PYTHONPATH=src python -m benchmarks.imports
+import typing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from .common import report
+
+SCRIPT_YAML: typing.Final[str] = '''
+- set:
+    var: x0
+    value: 1
+'''
+
+CASES: typing.Final[typing.Dict[str, str]] = {
+    'import yrunner': 'import yrunner',
+    'import yrunner.executors.http': 'import yrunner.executors.http',
+    'import yrunner.cli': 'import yrunner.cli',
+    'cli, small script (set)': 'import sys, yrunner.cli; yrunner.cli.main([sys.argv[1]])',
+}
+
+
+# Best wall time of a new interpreter running code (with the path of a small script as first argument)
+def startup_time(code: str, script: str, repeat: int = 10) -> float:
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)}
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code, script], env=env, check=True)  # nosec: fixed command
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, 'script.yaml')
+        with open(script, 'w', encoding='utf-8') as f:
+            f.write(SCRIPT_YAML)
+        interpreter = startup_time('pass', script)
+        rows = [['python (no imports)', f'{interpreter * 1000:.1f} ms', '']]
+        for name, code in CASES.items():
+            elapsed = startup_time(code, script)
+            rows.append([name, f'{elapsed * 1000:.1f} ms', f'{(elapsed - interpreter) * 1000:.1f} ms'])
+    report('Start up time (new interpreter)', rows, ['case', 'wall time', 'over interpreter'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Tokenizer throughput for (generated) long expressions, should scale linearly with the length
+# Run with: PYTHONPATH=src python -m benchmarks.lexer
+import typing
+
+from yrunner import parser
+
+from .common import measure, report
+
+SIZES: typing.Final[typing.List[int]] = [64, 1024, 4096, 16384, 65536]
+
+# A term with all kind of tokens: variables, numbers, strings, keywords and multi-char operators
+TERM: typing.Final[str] = '(counter_1 >= 10 and name != "some \\"quoted\\" text") or value ** 2 <= -3.5'
+
+
+def expression_of_size(size: int) -> str:
+    terms = [TERM]
+    while sum(len(t) + 4 for t in terms) < size:
+        terms.append(TERM)
+    return ' || '.join(terms)
+
+
+def main() -> None:
+    rows = []
+    for size in SIZES:
+        expression = expression_of_size(size)
+        tokens = len(parser.tokenize(expression))
+        number = max(1, 200000 // len(expression))
+        elapsed = measure(lambda: parser.tokenize(expression), number=number)
+        rows.append(
+            [
+                len(expression),
+                tokens,
+                f'{elapsed * 1e3:.3f} ms',
+                f'{len(expression) / elapsed / 1e6:.2f} MB/s',
+                f'{tokens / elapsed / 1e6:.2f} Mtok/s',
+            ]
+        )
+    report('Tokenizer throughput', rows, ['chars', 'tokens', 'per call', 'chars/s', 'tokens/s'])
+
+
+if __name__ == '__main__':
+    main()
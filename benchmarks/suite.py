@@ -0,0 +1,211 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Benchmark suite, with a fixed set of cases so results of different versions can be compared
+# (see __main__.py). Each case measures the best time of one operation, on fixed (generated) inputs
+import typing
+import contextlib
+import fnmatch
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import yrunner
+from yrunner import YRunner, parser, runner
+from yrunner.executors import http
+
+from tests.local_server import LocalServer  # Benchmarks run from the repository root
+
+from .common import measure
+from .engines import NESTED_LOOPS_YAML, TIGHT_LOOP_YAML
+from .expressions import VARIABLES
+from .imports import SCRIPT_YAML, startup_time
+from .lexer import expression_of_size
+from .yaml_loading import generate
+
+EXPRESSION: typing.Final[str] = 'x0 * 2 + x2 / 3 > 10 and x1 == "hello"'
+TEMPLATE: typing.Final[str] = 'https://{{ x1 }}.example.com/api/items?page={{ x0 + 1 }}&ratio={{ x2 }}'
+REQUESTS: typing.Final[int] = 50
+
+
+# Setup receives an exit stack for its resources (i.e. a local server), and returns the operation to measure
+Setup = typing.Callable[[contextlib.ExitStack], typing.Callable[[], typing.Any]]
+
+
+class Case(typing.NamedTuple):
+    name: str
+    setup: Setup
+    number: int  # Operations per repetition
+
+
+class Result(typing.NamedTuple):
+    name: str
+    seconds: float  # Best time per operation
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {'seconds': self.seconds, 'ops_per_second': 1 / self.seconds if self.seconds else 0.0}
+
+
+CASES: typing.Final[typing.Dict[str, Case]] = {}
+
+
+def case(name: str, number: int) -> typing.Callable[[Setup], Setup]:
+    def decorator(setup: Setup) -> Setup:
+        CASES[name] = Case(name, setup, number)
+        return setup
+
+    return decorator
+
+
+def nested_script(depth: int, iterations: int) -> str:
+    lines = ['- set:', '    var: i', '    value: 0', '- while:', f'    condition: i < {iterations}', '    commands:']
+    indent = ' ' * 8
+    lines.extend([indent + '- set:', indent + '    var: i', indent + '    value: i + 1'])
+    for level in range(depth):
+        lines.extend([indent + '- if:', indent + f'    condition: i > {-level - 1}', indent + '    commands:'])
+        indent += ' ' * 8
+    lines.extend([indent + '- set:', indent + '    var: x', indent + '    value: i'])
+    return '\n'.join(lines) + '\n'
+
+
+def _run(script: str, *commands: typing.Any, **kwargs: typing.Any) -> typing.Callable[[], typing.Any]:
+    yrunner = YRunner(*commands, **kwargs)
+    compiled = yrunner.compile(script)
+    return lambda: yrunner.run(compiled)
+
+
+@case('parser.tokenize', 1000)
+def _tokenize(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    expression = expression_of_size(1024)
+    return lambda: parser.tokenize(expression)
+
+
+@case('parser.rpn_expression', 1000)
+def _rpn(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    tokens = parser.tokenize(expression_of_size(1024))
+    return lambda: parser.rpn_expression(tokens)
+
+
+@case('parser.eval_expression', 20000)
+def _eval_expression(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    return lambda: parser.eval_expression(EXPRESSION, VARIABLES)
+
+
+@case('runner.eval_expr', 20000)
+def _eval_expr(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    yrunner = YRunner(variables=dict(VARIABLES))
+    return lambda: yrunner.eval_expr(EXPRESSION)
+
+
+@case('runner.eval_expr (python eval)', 20000)
+def _eval_expr_python(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    yrunner = YRunner(variables=dict(VARIABLES), use_python_eval=True)
+    return lambda: yrunner.eval_expr(EXPRESSION)
+
+
+@case('runner.eval_string', 20000)
+def _eval_string(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    yrunner = YRunner(variables=dict(VARIABLES))
+    return lambda: yrunner.eval_string(TEMPLATE)
+
+
+@case('run: tight while (10k iterations)', 3)
+def _tight_loop(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    return _run(TIGHT_LOOP_YAML)
+
+
+@case('run: tight while (10k iterations, vm)', 3)
+def _tight_loop_vm(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    return _run(TIGHT_LOOP_YAML, use_vm=True)
+
+
+@case('run: nested while (100x100)', 3)
+def _nested_loops(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    return _run(NESTED_LOOPS_YAML)
+
+
+@case('run: deep nesting (20 ifs, 1k iterations)', 3)
+def _deep_nesting(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    return _run(nested_script(20, 1000))
+
+
+@case('run: large script (2k commands)', 3)
+def _large_script(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    return _run(generate(1000, command='set:\n            var: message\n            value: x0'))
+
+
+@case('compile: large script (2k commands)', 3)
+def _compile(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    script = generate(1000)
+    return lambda: YRunner().compile(script)
+
+
+@case('yaml: load_yaml (2k commands)', 3)
+def _load_yaml(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    script = generate(1000)
+    return lambda: runner.load_yaml(script)
+
+
+@case(f'http: request ({REQUESTS} requests, local server)', 1)
+def _requests(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+    server = stack.enter_context(LocalServer())
+    script = f'''
+- set:
+    var: i
+    value: 0
+- while:
+    condition: i < {REQUESTS}
+    commands:
+        - set:
+            var: i
+            value: i + 1
+        - request:
+            method: GET
+            url: "{{{{ base_url }}}}/poll"
+            response_var: response
+'''
+    return _run(script, http.COMMANDS, variables={'base_url': server.url})
+
+
+def _startup(code: str) -> Setup:
+    def setup(stack: contextlib.ExitStack) -> typing.Callable[[], typing.Any]:
+        script = os.path.join(stack.enter_context(tempfile.TemporaryDirectory()), 'script.yaml')
+        with open(script, 'w', encoding='utf-8') as f:
+            f.write(SCRIPT_YAML)
+        return lambda: startup_time(code, script, repeat=1)
+
+    return setup
+
+
+case('startup: import yrunner', 3)(_startup('import yrunner'))
+case('startup: cli, small script', 3)(_startup('import sys, yrunner.cli; yrunner.cli.main([sys.argv[1]])'))
+
+
+def select(patterns: typing.Sequence[str]) -> typing.List[Case]:
+    if not patterns:
+        return list(CASES.values())
+    return [c for c in CASES.values() if any(fnmatch.fnmatch(c.name, p) or p in c.name for p in patterns)]
+
+
+def run(cases: typing.Iterable[Case], repeat: int = 5) -> typing.Iterator[Result]:
+    for bench in cases:
+        with contextlib.ExitStack() as stack:
+            operation = bench.setup(stack)
+            operation()  # Warm up (caches, connections...)
+            yield Result(bench.name, measure(operation, number=bench.number, repeat=repeat))
+
+
+def metadata() -> typing.Dict[str, typing.Any]:
+    return {
+        'version': yrunner.__version__,
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'yaml_loader': runner.SafeLoader.__name__,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
@@ -0,0 +1,44 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Compiled templates vs substituting each placeholder with str.replace (previous implementation)
+# Run with: PYTHONPATH=src python -m benchmarks.templates
+import typing
+
+from yrunner import YRunner
+from yrunner.runner import INTERPOLATE_REGEX
+
+from .common import measure, report, usec
+
+VARIABLES: typing.Final[typing.Dict[str, typing.Any]] = {'host': 'example.com', 'page': 3, 'size': 100, 'q': 'x' * 20}
+
+TEMPLATES: typing.Final[typing.Dict[str, str]] = {
+    'url': 'https://{{ host }}/api/v1/items?page={{ page }}&size={{ size }}',
+    'log message': 'fetching page {{ page + 1 }} of {{ host }}, query {{ q }}',
+    'large (4 KB, 40 placeholders)': ('lorem ipsum dolor sit amet ' * 4 + '{{ page }} {{ q }} ') * 20,
+}
+
+
+def replace_eval_string(runner: YRunner, string: str) -> str:
+    for match in INTERPOLATE_REGEX.finditer(string):
+        value = runner.eval_expr(match.group(1))
+        string = string.replace(match.group(0), str(value))
+    return string
+
+
+def main() -> None:
+    runner = YRunner(variables=dict(VARIABLES))
+    rows = []
+    for name, template in TEMPLATES.items():
+        compiled = runner.compile_template(template)
+        assert runner.eval_string(compiled) == replace_eval_string(runner, template)
+        replace_time = measure(lambda: replace_eval_string(runner, template), number=2000)
+        compiled_time = measure(lambda: runner.eval_string(compiled), number=2000)
+        rows.append([name, usec(replace_time), usec(compiled_time), f'{replace_time / compiled_time:.1f}x'])
+    report('Template rendering (per call)', rows, ['template', 'str.replace', 'compiled', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
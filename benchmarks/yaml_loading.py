@@ -0,0 +1,60 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Loading (and compiling) a large generated script with the pure python loader vs the libyaml one
+# Run with: PYTHONPATH=src python -m benchmarks.yaml_loading
+import typing
+
+import yaml
+
+from yrunner import YRunner, runner
+
+from .common import measure, report
+
+
+# Command executed by each if, by default a log of the variable
+def generate(steps: int, command: typing.Optional[str] = None) -> str:
+    lines: typing.List[str] = ['---']
+    for i in range(steps):
+        lines.extend(
+            [
+                '- set:',
+                f'    var: x{i}',
+                f'    value: {i} * 2 + 1',
+                '- if:',
+                f'    condition: x{i} > {i}',
+                '    commands:',
+                '        - ' + (command or f'log:\n            message: "step {i}: {{{{ x{i} }}}}"'),
+            ]
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def main() -> None:
+    yrunner = YRunner()
+    rows = []
+    for steps in (100, 1000, 5000):
+        script = generate(steps)
+        python_time = measure(lambda: yaml.load(script, Loader=yaml.SafeLoader), number=1, repeat=3)
+        c_time = measure(lambda: runner.load_yaml(script), number=1, repeat=3)
+        compile_time = measure(lambda: yrunner.compile(script), number=1, repeat=3)
+        rows.append(
+            [
+                f'{steps * 2} commands ({len(script) // 1024} KB)',
+                f'{python_time * 1000:.1f} ms',
+                f'{c_time * 1000:.1f} ms',
+                f'{python_time / c_time:.1f}x',
+                f'{compile_time * 1000:.1f} ms',
+            ]
+        )
+    report(
+        f'YAML loading (loader: {runner.SafeLoader.__name__})',
+        rows,
+        ['script', 'SafeLoader', 'load_yaml', 'speedup', 'compile (total)'],
+    )
+
+
+if __name__ == '__main__':
+    main()
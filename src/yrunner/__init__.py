@@ -2,12 +2,14 @@
 # Valid commands:
 #  - set: set a variable
 #  - request: make an HTTP request (parameters are the same as the requests library)
+#  - request_many: make an HTTP request for each item of a list, concurrently
 #  - sleep: sleep for a number of seconds (float)
 #  - if: conditional execution, based on the value of a variable (>, <, ==, !=, >=, <=)
 #  - while: loop execution, equal to if, but loops until the condition is false
 #  - break, continue: break or continue a loop
 #  - log: log a message to log (level, msg, *args, **kwargs)
 #  - exit: exit the script
+#  - parallel: execute blocks of commands (branches) concurrently, each one with a copy of the variables
 
 # Sample script:
 # ---
@@ -53,4 +55,20 @@
 #             message: "response is {{ var + 1 }}  {{ response }}"
 # - sleep: 5
 # - exit: 0
+import typing
+
+__version__ = '0.1.0'  # Must be defined before importing modules that uses it
+
 from .runner import YRunner
+
+if typing.TYPE_CHECKING:
+    from .async_runner import AsyncYRunner
+
+
+# AsyncYRunner is imported on first access, asyncio is slow to import and not needed by sync runners
+def __getattr__(name: str) -> typing.Any:
+    if name == 'AsyncYRunner':
+        from .async_runner import AsyncYRunner
+
+        return AsyncYRunner
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
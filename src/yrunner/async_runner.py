@@ -0,0 +1,164 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+import typing
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+import concurrent.futures
+
+from . import exceptions, program, types
+from .runner import YRunner, _documents
+from .executors import internal
+
+logger = logging.getLogger(__name__)
+
+T = typing.TypeVar('T')
+
+# Threads for the blocking calls (sync executors and requests) of the async runners. Scripts mostly wait
+# on them (i.e. on HTTP responses), so many more than the default executor of the loop (cpus + 4) are needed
+# to run hundreds of scripts at once. Threads are only started when needed
+DEFAULT_MAX_THREADS: typing.Final[int] = 256
+
+_POOLS: typing.Final[typing.Dict[int, concurrent.futures.ThreadPoolExecutor]] = {}
+_POOLS_LOCK: typing.Final[threading.Lock] = threading.Lock()
+
+
+# Thread pool shared by the async runners with the same max_threads
+def blocking_pool(max_threads: int = DEFAULT_MAX_THREADS) -> concurrent.futures.ThreadPoolExecutor:
+    pool = _POOLS.get(max_threads)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(max_threads)
+            if pool is None:
+                pool = _POOLS[max_threads] = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max_threads, thread_name_prefix='yrunner-blocking'
+                )
+    return pool
+
+
+# Runner for asyncio, so many scripts can be executed concurrently on a single thread
+# Executors can be coroutines (see ASYNC_COMMANDS on executors modules). Sync executors
+# still works, but are executed on a thread pool, so they must not execute nested commands
+class AsyncYRunner(YRunner):
+    commands_attribute = 'ASYNC_COMMANDS'
+
+    executor: concurrent.futures.Executor  # For blocking calls, blocking_pool(max_threads) if not given
+
+    _is_async: typing.Dict[typing.Callable[..., typing.Any], bool]
+
+    def __init__(
+        self,
+        *extra_commands: typing.Union[typing.List[types.Command], types.Command, str],
+        executor: typing.Optional[concurrent.futures.Executor] = None,
+        max_threads: int = DEFAULT_MAX_THREADS,
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(internal.ASYNC_COMMANDS, *extra_commands, **kwargs)
+        self.executor = executor if executor is not None else blocking_pool(max_threads)
+        self._is_async = {}
+
+    # Executes a blocking function on the thread pool, without blocking the loop
+    # (on a copy of the current context, as asyncio.to_thread, so instruments can relate it to the command)
+    async def run_blocking(self, func: typing.Callable[..., T], *args: typing.Any, **kwargs: typing.Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        )
+
+    async def _call(self, command: types.Command, node: typing.Any) -> None:
+        is_async = self._is_async.get(command.executor)
+        if is_async is None:
+            is_async = self._is_async[command.executor] = asyncio.iscoroutinefunction(command.executor)
+        if is_async:
+            await command.executor(node, self)  # type: ignore
+        else:
+            await self.run_blocking(command.executor, node, self)
+
+    async def execute(self, commands: typing.Iterable[typing.Any]) -> None:  # type: ignore[override]
+        # if commands is not an iterable, make it one
+        if not isinstance(commands, typing.Iterable):
+            commands = [commands]
+        if self.instruments:
+            return await self._execute_instrumented(commands)
+
+        for command in commands:
+            try:
+                step = command if isinstance(command, program.Step) else self._step(command)
+                await self._call(step.command, step.args)
+            except exceptions.YRunnerException:
+                raise
+            except Exception as e:
+                # Attach command to exception
+                raise Exception(f"Error executing command: {command}") from e
+
+    async def _execute_instrumented(self, commands: typing.Iterable[typing.Any]) -> None:  # type: ignore[override]
+        instruments = self.instruments
+        for command in commands:
+            start = time.perf_counter()
+            step = command
+            try:
+                if not isinstance(step, program.Step):
+                    step = self._step(command)
+                for i in instruments:
+                    i.command_start(step)
+                try:
+                    await self._call(step.command, step.args)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    for i in reversed(instruments):
+                        i.command_end(step, elapsed)
+            except exceptions.YRunnerException:
+                raise
+            except Exception as e:
+                raise Exception(f"Error executing command: {command}") from e
+
+    # Same as YRunner.run, but a coroutine. Programs are always executed by the tree engine
+    async def run(  # type: ignore[override]
+        self,
+        script: typing.Union[str, program.Program],
+        variables: typing.Optional[typing.MutableMapping[str, typing.Any]] = None,
+    ) -> int:
+        self.error = None
+        if variables is not None:
+            self.variables = variables
+
+        self._run_start()
+        try:
+            if not isinstance(script, program.Program):
+                script = self.compile(script)
+            await self.execute(script.steps)  # type: ignore
+        except Exception as e:
+            return self._exit_code(e)
+        finally:
+            self.close_resources()
+            self._run_end()
+
+        return 0
+
+    # Same as YRunner.run_stream, but a coroutine (the stream itself is read on the loop thread)
+    async def run_stream(  # type: ignore[override]
+        self,
+        stream: typing.Union[str, typing.Iterable[str]],
+        variables: typing.Optional[typing.MutableMapping[str, typing.Any]] = None,
+    ) -> int:
+        if isinstance(stream, str):
+            stream = stream.splitlines(keepends=True)
+        self.error = None
+        if variables is not None:
+            self.variables = variables
+
+        self._run_start()
+        try:
+            for start, document in _documents(stream):
+                await self.execute(self.compile(document, line_offset=start).steps)  # type: ignore
+        except Exception as e:
+            return self._exit_code(e)
+        finally:
+            self.close_resources()
+            self._run_end()
+
+        return 0
@@ -0,0 +1,136 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Execution of many scripts (or one script with many sets of variables) on a pool of processes
+import typing
+import itertools
+import concurrent.futures
+
+from . import cache, program
+from .runner import YRunner
+
+if typing.TYPE_CHECKING:
+    from . import diskcache
+
+# Executors modules used if none is provided
+DEFAULT_COMMANDS: typing.Final[typing.Tuple[str, ...]] = ('http', 'time')
+
+
+# Compact result of a run, can be pickled (to return it from workers) and converted to JSON
+class RunResult(typing.NamedTuple):
+    position: int  # Of the job on the input
+    code: int  # Exit code
+    error: typing.Optional[str]  # Error message, if the run failed
+    variables: typing.Dict[str, typing.Any]  # Final variables (values not representable on JSON are repr'ed)
+
+
+class RunOptions(typing.NamedTuple):
+    commands: typing.Tuple[str, ...] = DEFAULT_COMMANDS  # Executors modules (i.e. 'http' or 'my.package.executors')
+    use_python_eval: bool = False
+    use_vm: bool = False
+    optimize: bool = True
+    keep_variables: bool = True  # Return the final variables on results
+    cache_size: int = 128  # Compiled scripts kept by each worker
+    cache_dir: typing.Optional[str] = None  # Compiled scripts shared by all workers (and next executions)
+
+
+# Values that can be represented on JSON are kept as is, any other one is converted to its repr
+def portable(value: typing.Any) -> typing.Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [portable(v) for v in value]
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {k: portable(v) for k, v in value.items()}
+    return repr(value)
+
+
+# Disk cache on directory, if any
+def open_disk_cache(directory: typing.Optional[str]) -> typing.Optional['diskcache.DiskCache']:
+    if not directory:
+        return None
+    from . import diskcache  # Only imported if used
+
+    return diskcache.DiskCache(directory)
+
+
+class _Worker:
+    runner: YRunner
+    options: RunOptions
+    programs: cache.LRUCache[str, program.Program]  # Each distinct script is compiled once per worker
+
+    def __init__(self, options: RunOptions) -> None:
+        self.options = options
+        self.runner = YRunner(
+            *options.commands,
+            use_python_eval=options.use_python_eval,
+            use_vm=options.use_vm,
+            optimize=options.optimize,
+            disk_cache=open_disk_cache(options.cache_dir),
+        )
+        self.programs = cache.LRUCache(maxsize=options.cache_size)
+
+    def run(self, job: typing.Tuple[int, str, typing.Optional[typing.Mapping[str, typing.Any]]]) -> RunResult:
+        index, script, variables = job
+        runner = self.runner
+        try:
+            compiled = self.programs.get_or_create(script, runner.compile)
+        except Exception as e:
+            return RunResult(index, -1, str(e), {})
+        code = runner.run(compiled, variables=dict(variables or {}))
+        return RunResult(
+            index,
+            code,
+            None if runner.error is None else str(runner.error),
+            portable(runner.variables) if self.options.keep_variables else {},
+        )
+
+
+_worker: typing.Optional[_Worker] = None  # Worker of this process
+
+
+def _init_worker(options: RunOptions) -> None:
+    global _worker
+    _worker = _Worker(options)
+
+
+def _run_job(job: typing.Tuple[int, str, typing.Optional[typing.Mapping[str, typing.Any]]]) -> RunResult:
+    assert _worker is not None  # nosec: initialized by pool initializer
+    return _worker.run(job)
+
+
+# Executes scripts on a pool of "jobs" processes, yielding the results in input order
+# scripts can be a list of scripts, or a single script to be executed once per set of variables
+# If both a list of scripts and variables are provided, each script is executed with its variables
+def run_many(
+    scripts: typing.Union[str, typing.Iterable[str]],
+    variables: typing.Optional[typing.Iterable[typing.Optional[typing.Mapping[str, typing.Any]]]] = None,
+    *,
+    jobs: typing.Optional[int] = None,  # Number of processes, None for cpu count. 1 runs on this process
+    options: typing.Optional[RunOptions] = None,
+    chunksize: int = 16,
+) -> typing.Iterator[RunResult]:
+    options = options or RunOptions()
+    if isinstance(scripts, str):
+        if variables is None:
+            variables = [None]
+        all_jobs = ((index, scripts, vars) for index, vars in enumerate(variables))
+    else:
+        all_jobs = (
+            (index, script, vars)
+            for index, (script, vars) in enumerate(
+                zip(scripts, variables) if variables is not None else zip(scripts, itertools.repeat(None))
+            )
+        )
+
+    if jobs == 1:
+        worker = _Worker(options)
+        yield from map(worker.run, all_jobs)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(options,)
+    ) as pool:
+        yield from pool.map(_run_job, all_jobs, chunksize=chunksize)
@@ -0,0 +1,89 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+import typing
+import collections
+import threading
+
+KT = typing.TypeVar('KT')
+VT = typing.TypeVar('VT')
+
+
+class CacheInfo(typing.NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+# Simple bounded LRU cache, with hit/miss/eviction counters
+# Thread safe, so it can be shared by runners on different threads
+class LRUCache(typing.Generic[KT, VT]):
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+
+    _data: 'collections.OrderedDict[KT, VT]'
+    _lock: threading.Lock
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        if maxsize <= 0:
+            raise ValueError('maxsize must be greater than 0')
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: KT, default: typing.Optional[VT] = None) -> typing.Optional[VT]:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: KT, value: VT) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    # Returns cached value for key, or stores (and returns) the one created by factory
+    def get_or_create(self, key: KT, factory: typing.Callable[[KT], VT]) -> VT:
+        value = self.get(key)
+        if value is None:
+            value = factory(key)  # Outside the lock, factory can be slow
+            self.put(key, value)
+        return value
+
+    def resize(self, maxsize: int) -> None:
+        if maxsize <= 0:
+            raise ValueError('maxsize must be greater than 0')
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self._data), self.maxsize)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,168 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# yrunner command line:
+#   yrunner script.yaml                                 # executes a script, exit code is the script one
+#   yrunner -j 8 scripts/*.yaml                         # many scripts on 8 processes
+#   yrunner -j 8 --vars-file vars.jsonl script.yaml     # one script, once per line (JSON object) of vars.jsonl
+#   generator | yrunner --stream -                      # "---" separated documents, executed as they arrive
+#   yrunner --profile script.collapsed script.yaml      # report of slow lines on stderr, and flamegraph stacks
+#   yrunner --trace script.json script.yaml             # trace for chrome://tracing or ui.perfetto.dev
+#   yrunner --dump script.yaml                          # shows the compiled (optimized) script, without running it
+# Results are written as JSON lines (position, script, code, error, variables) when more than one run is done
+import typing
+import argparse
+import json
+import logging
+import sys
+
+from . import batch
+from .runner import YRunner
+
+
+def _parse_var(definition: str) -> typing.Tuple[str, typing.Any]:
+    name, sep, value = definition.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f'Invalid variable definition {definition}, must be NAME=VALUE')
+    try:
+        return name, json.loads(value)  # Numbers, lists, quoted strings...
+    except ValueError:
+        return name, value
+
+
+def _read(path: str) -> str:
+    if path == '-':
+        return sys.stdin.read()
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='yrunner', description='Yaml script runner')
+    parser.add_argument('scripts', nargs='+', help='Scripts to execute ("-" for stdin)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of processes (0 for cpu count)')
+    parser.add_argument(
+        '-c',
+        '--commands',
+        default=','.join(batch.DEFAULT_COMMANDS),
+        help='Comma separated executors modules (default: %(default)s)',
+    )
+    parser.add_argument('--var', action='append', type=_parse_var, default=[], help='Variable NAME=VALUE')
+    parser.add_argument('--vars-file', help='JSON lines file, the script is executed once per line')
+    parser.add_argument('--vm', action='store_true', help='Use the vm execution engine')
+    parser.add_argument('--python-eval', action='store_true', help='Use python eval for expressions')
+    parser.add_argument('--no-optimize', action='store_true', help='Do not optimize scripts when compiling')
+    parser.add_argument('--dump', action='store_true', help='Show the compiled scripts, instead of running them')
+    parser.add_argument(
+        '--stream', action='store_true', help='Execute each document of a multi document script as it is read'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Profile by script line, writing collapsed stacks (for flamegraph tools) to FILE',
+    )
+    parser.add_argument('--trace', metavar='FILE', help='Write a Chrome trace of the execution to FILE')
+    parser.add_argument('--cache-dir', help='Directory to keep compiled scripts between executions')
+    parser.add_argument('--json', action='store_true', help='Write results as JSON lines, even for one run')
+    parser.add_argument('--no-variables', action='store_true', help='Do not include variables on results')
+    parser.add_argument('--log-level', default='WARNING', help='Log level (default: %(default)s)')
+    return parser
+
+
+def _dump(args: argparse.Namespace, commands: typing.Tuple[str, ...]) -> int:
+    runner = YRunner(*commands, use_python_eval=args.python_eval, optimize=not args.no_optimize)
+    for path in args.scripts:
+        print(f'# {path}\n{runner.compile(_read(path)).dump()}')
+    return 0
+
+
+# Streaming, profiling and tracing modes, scripts are executed in order by a single runner on this process
+def _run_local(args: argparse.Namespace, commands: typing.Tuple[str, ...]) -> int:
+    from . import profiler, trace  # Only needed (and imported) on this mode
+
+    profile = profiler.Profiler() if args.profile else None
+    tracer = trace.Tracer(args.trace) if args.trace else None
+    runner = YRunner(
+        *commands,
+        use_python_eval=args.python_eval,
+        use_vm=args.vm,
+        optimize=not args.no_optimize,
+        disk_cache=batch.open_disk_cache(args.cache_dir),
+        instruments=[i for i in (profile, tracer) if i is not None],
+    )
+    runner.variables = dict(args.var)
+    code = 0
+    for path in args.scripts:
+        lines: typing.List[str] = []  # Read lines, for the profile report
+
+        def read(stream: typing.Iterable[str]) -> typing.Iterator[str]:
+            for line in stream:
+                lines.append(line)
+                yield line
+
+        with open(path, encoding='utf-8') if path != '-' else sys.stdin as f:
+            if args.stream:
+                code = runner.run_stream(read(f))
+            else:
+                code = runner.run(''.join(read(f)))
+        if profile:
+            print(f'Profile of {path}:\n{profile.report("".join(lines))}\n', file=sys.stderr)
+            profile.write_collapsed(args.profile)
+        if code != 0:
+            if runner.error:
+                print(runner.error, file=sys.stderr)
+            break
+    if tracer:
+        tracer.close()
+    return code & 0xFF
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s %(levelname)s %(message)s')
+    commands = tuple(name.strip() for name in args.commands.split(',') if name.strip())
+    if args.dump:
+        return _dump(args, commands)
+    if args.stream or args.profile or args.trace:
+        return _run_local(args, commands)
+
+    base_variables = dict(args.var)
+    scripts = [_read(path) for path in args.scripts]
+    names = list(args.scripts)
+    variables: typing.List[typing.Dict[str, typing.Any]]
+    if args.vars_file:
+        if len(scripts) != 1:
+            _parser().error('--vars-file can only be used with a single script')
+        with open(args.vars_file, encoding='utf-8') as f:
+            variables = [{**base_variables, **json.loads(line)} for line in f if line.strip()]
+        scripts, names = scripts * len(variables), names * len(variables)
+    else:
+        variables = [dict(base_variables) for _ in scripts]
+
+    options = batch.RunOptions(
+        commands=commands,
+        use_python_eval=args.python_eval,
+        use_vm=args.vm,
+        optimize=not args.no_optimize,
+        keep_variables=not args.no_variables,
+        cache_dir=args.cache_dir,
+    )
+    results = batch.run_many(scripts, variables, jobs=args.jobs or None, options=options)
+
+    if len(scripts) == 1 and not args.json:
+        result = next(results)
+        if result.error:
+            print(result.error, file=sys.stderr)
+        return result.code & 0xFF
+
+    failed = False
+    for result in results:
+        failed = failed or result.code != 0
+        print(json.dumps({'script': names[result.position], **result._asdict()}, default=repr), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Persistent cache of compiled scripts, so new processes do not need to parse the yaml and compile the expressions
+# Entries are keyed by the script content, the commands of the runner (names and executors), the eval mode
+# and the package version, so any change on them just uses a new entry (and old ones are evicted by size)
+# Entries are pickles: the cache directory must be only writable by the user running the scripts
+import typing
+import hashlib
+import logging
+import os
+import pickle  # nosec: only loads entries written by this module, on a private directory
+import tempfile
+
+from . import __version__, program
+
+if typing.TYPE_CHECKING:
+    from .runner import YRunner  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+SUFFIX: typing.Final[str] = '.pickle'
+FORMAT: typing.Final[str] = '2'  # Layout of the pickled programs, changed when not compatible with previous one
+
+
+# Signature of the commands of a runner, executors identified by its qualified name (or by its module, if
+# registered by module name, so it does not change once the module is imported)
+def commands_signature(runner: 'YRunner') -> str:
+    signatures = {
+        name: f'{getattr(command.executor, "__module__", "")}.{getattr(command.executor, "__qualname__", "")}'
+        for name, command in runner.commands.items()
+    }
+    signatures.update({name: f'{module}:*' for name, module in runner.lazy_commands.items()})
+    return ';'.join(f'{name}={signature}' for name, signature in sorted(signatures.items()))
+
+
+class DiskCache:
+    directory: str
+    max_size: int  # Max total size of the entries, in bytes. Least recently used entries are evicted first
+    hits: int
+    misses: int
+
+    def __init__(self, directory: str, max_size: int = 64 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = self.misses = 0
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def key(self, script: str, runner: 'YRunner', line_offset: int = 0) -> str:
+        # Offset of the source marks (see YRunner.compile), only when they are kept
+        marks = str(runner.source_marks)
+        if runner.source_marks and line_offset:
+            marks += f'+{line_offset}'
+        digest = hashlib.sha256()
+        for part in (
+            __version__,
+            FORMAT,
+            str(runner.use_python_eval),
+            str(runner.optimize),
+            marks,
+            commands_signature(runner),
+            script,
+        ):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key: str) -> typing.Optional[program.Program]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                compiled = pickle.load(f)  # nosec: see above
+            os.utime(path)  # Recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:  # Corrupt or not loadable (i.e. executor removed), just discard it
+            logger.warning(f'Discarding cache entry {path}: {e}')
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return compiled
+
+    def store(self, key: str, compiled: program.Program) -> None:
+        try:
+            data = pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:  # i.e. lambdas as executors
+            logger.debug(f'Compiled script can not be cached: {e}')
+            return
+        # Written to a temporary file and renamed, so concurrent processes never reads a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f'Can not write cache entry: {e}')
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    # Removes least recently used entries until the total size is below max_size
+    def evict(self) -> None:
+        entries: typing.List[typing.Tuple[float, int, str]] = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:  # Removed by another process
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self) -> None:
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX):
+                    self._remove(entry.path)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
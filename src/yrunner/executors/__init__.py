@@ -0,0 +1,29 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Executor modules can be registered by name, i.e. YRunner('http', 'time'), so the module (and its
+# dependencies, as requests) is only imported when a script uses one of its commands
+import typing
+import importlib
+
+from .. import types
+
+# Commands provided by each bundled executor module, to register them without importing the module
+# Other modules (by full name, i.e. 'mypackage.executors') are imported when registered
+MODULES: typing.Final[typing.Dict[str, typing.Tuple[str, ...]]] = {
+    'http': ('request', 'request_many'),
+    'time': ('gettime', 'sleep'),
+}
+
+
+# Full name of an executor module, bundled ones can be referenced by its short name
+def module_name(name: str) -> str:
+    return name if '.' in name else f'{__name__}.{name}'
+
+
+# Commands of an executor module (attribute is COMMANDS, or ASYNC_COMMANDS for AsyncYRunner if provided)
+def load(name: str, attribute: str = 'COMMANDS') -> typing.List[types.Command]:
+    module = importlib.import_module(module_name(name))
+    return getattr(module, attribute, None) or module.COMMANDS
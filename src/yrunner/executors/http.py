@@ -1,77 +1,488 @@
 import typing
+import email.utils
+import functools
 import logging
+import mmap
+import os
+import time
+import urllib.parse
+import concurrent.futures
 
-import requests
-
-from .. import types
+from .. import exceptions, httpcache, ratelimit, types
+from ..runner import CompiledTemplate
 
 if typing.TYPE_CHECKING:
+    import requests
+
     from ..runner import YRunner
+    from ..async_runner import AsyncYRunner
 
 logger = logging.getLogger(__name__)
 
 
-def exec_request(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    # Make a copy of the request, removing non-requests parameters
-    request = node['request']
+# Settings for the http executors, can be provided to runner as YRunner(settings={'http': HttpSettings(...)})
+class HttpSettings(typing.NamedTuple):
+    pool_connections: int = 10  # Number of hosts to keep connection pools for
+    pool_maxsize: int = 10  # Max connections kept open per host
+    pool_block: bool = False  # Wait for a free connection instead of opening a new (not pooled) one
+    max_retries: int = 0  # Retries on connection errors (and retry_statuses)
+    backoff_factor: float = 0.0  # Sleep between retries is backoff_factor * (2 ** (retry - 1))
+    retry_statuses: typing.Tuple[int, ...] = ()  # i.e (429, 502, 503, 504), waits as its Retry-After header if any
+    backoff_max: float = 120.0  # Max sleep between retries (also if the Retry-After header asks for more)
+    download_chunk_size: int = 1024 * 1024  # Bytes read (and written) at once when downloading to a file
+    # Limits per host, shared by all the runners of the process (see ratelimit.py)
+    rate_limit: float = 0.0  # Requests per second (0, no limit)
+    rate_burst: int = 1  # Requests that can be done at once, before waiting for the rate
+    max_per_host: int = 0  # Concurrent requests (0, no limit)
+    rate_limit_dir: typing.Optional[str] = None  # Directory to share rate limits (and pauses) with other processes
+
+
+DEFAULT_SETTINGS: typing.Final[HttpSettings] = HttpSettings()
+
+
+def get_settings(runner: 'YRunner') -> HttpSettings:
+    return runner.settings.get('http') or DEFAULT_SETTINGS
+
+
+# requests (and urllib3) are imported on first session, so scripts not doing requests do not pay for it
+def create_session(settings: HttpSettings) -> 'requests.Session':
+    import requests
+    import requests.adapters
+    import urllib3.util.retry
+
+    session = requests.Session()
+    # Retries on connection errors. retry_statuses (and Retry-After) are handled by send, with the limits of the host
+    retries = urllib3.util.retry.Retry(
+        total=settings.max_retries, backoff_factor=settings.backoff_factor, respect_retry_after_header=False
+    )
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=settings.pool_connections,
+        pool_maxsize=settings.pool_maxsize,
+        pool_block=settings.pool_block,
+        max_retries=retries,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Session of the runner for the current run, so connections are kept alive between requests
+def get_session(runner: 'YRunner') -> 'requests.Session':
+    return runner.get_resource('http.session', lambda: create_session(get_settings(runner)))
+
+
+# session.request, reporting the request to the instruments of the runner (if any)
+def _request(
+    session: 'requests.Session', runner: 'YRunner', args: typing.Mapping[str, typing.Any]
+) -> 'requests.Response':
+    if not runner.instruments:
+        return session.request(**args)
+    start = time.perf_counter()
+    status: typing.Optional[int] = None
+    try:
+        response = session.request(**args)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        for i in runner.instruments:
+            i.http(str(args.get('method')), str(args.get('url')), status, elapsed)
+
+
+# Seconds to wait as asked by a Retry-After header (seconds or http date), None if not valid
+def retry_after(value: typing.Optional[str]) -> typing.Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Seconds to wait before a retry (1 based): the Retry-After header of the response or the backoff
+def retry_delay(response: 'requests.Response', retry: int, settings: HttpSettings) -> float:
+    delay = retry_after(response.headers.get('Retry-After'))
+    if delay is None:
+        delay = settings.backoff_factor * (2 ** (retry - 1))
+    return min(delay, settings.backoff_max)
+
+
+# Request with the limits of its host, retrying on retry_statuses. Waits before a retry are pauses of the host,
+# so all the requests to the host (of any runner) waits, instead of making more requests that will be refused
+def send(
+    session: 'requests.Session', runner: 'YRunner', args: typing.Mapping[str, typing.Any]
+) -> 'requests.Response':
+    settings = get_settings(runner)
+    if not (settings.rate_limit or settings.max_per_host or settings.retry_statuses):
+        return _request(session, runner, args)
+    limits = ratelimit.Limits(settings.rate_limit, settings.rate_burst, settings.max_per_host)
+    limiter = ratelimit.limiter(urllib.parse.urlsplit(args['url']).netloc, limits, settings.rate_limit_dir)
+    retry = 0
+    while True:
+        with limiter.slot():
+            response = _request(session, runner, args)
+        if response.status_code not in settings.retry_statuses or retry >= settings.max_retries:
+            return response
+        retry += 1
+        delay = retry_delay(response, retry, settings)
+        logger.info(f"{args.get('method')} {args['url']}: status {response.status_code}, retry {retry} in {delay:.2f}s")
+        response.close()
+        limiter.pause(delay)
+
+
+# Arguments for session.request, from the request arguments (with templates evaluated)
+def _request_args(
+    request: types.Arguments, runner: 'YRunner', templated_headers: bool = False
+) -> typing.Dict[str, typing.Any]:
+    # Only the requests parameters that are present
     lrequest = {
-        k: v
-        for k, v in request.items()
-        if k
-        in [
-            'method',
-            'url',
-            'params',
-            'data',
-            'headers',
-            'cookies',
-            'auth',
-            'timeout',
-            'allow_redirects',
-            'proxies',
-            'hooks',
-            'stream',
-            'verify',
-            'cert',
-        ]
+        parameter.name: getattr(request, parameter.name)
+        for parameter in REQUEST_PARAMETERS
+        if getattr(request, parameter.name) is not None
     }
 
     # Fix url with eval_string
     lrequest['url'] = runner.eval_string(lrequest['url'])
-    # If parameters are present,
+    # If parameters are present, templates (a string, or the values of a dict) are rendered
+    # Other forms accepted by requests (as a list of (key, value) pairs) are used as they are
     if 'params' in lrequest:
-        if isinstance(lrequest['params'], str):
-            lrequest['params'] = runner.eval_string(lrequest['params'])
-        elif isinstance(lrequest['params'], dict):
-            lrequest['params'] = {k: runner.eval_string(v) for k, v in lrequest['params'].items()}
+        params = lrequest['params']
+        if isinstance(params, (str, CompiledTemplate)):
+            lrequest['params'] = runner.eval_string(params)
+        elif isinstance(params, dict):
+            lrequest['params'] = {k: runner.eval_string(v) for k, v in params.items()}
+    if templated_headers and 'headers' in lrequest:
+        lrequest['headers'] = {k: runner.eval_string(v) for k, v in lrequest['headers'].items()}
+    return lrequest
+
+
+_NOT_PARSED: typing.Final[typing.Any] = object()
+
+
+# Response being projected. Attributes are the ones of the response, but its json is parsed only once
+# (even if several json paths are selected), and file is the file the body was downloaded to (if any)
+class Projection:
+    __slots__ = ('response', 'file', '_json')
+
+    response: 'requests.Response'
+    file: typing.Optional[str]
+
+    def __init__(self, response: 'requests.Response', file: typing.Optional[str] = None) -> None:
+        self.response, self.file, self._json = response, file, _NOT_PARSED
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.response, name)
+
+    def json(self) -> typing.Any:
+        if self._json is _NOT_PARSED:
+            self._json = self.response.json()
+        return self._json
+
+
+# Downloaded body, as a read only memory mapped buffer (empty files can not be mapped)
+def map_file(path: str) -> typing.Union[mmap.mmap, bytes]:
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# Response attributes that can be selected, to keep only them instead of the whole response
+SELECTORS: typing.Final[typing.Dict[str, typing.Callable[[Projection], typing.Any]]] = {
+    'status_code': lambda response: response.status_code,
+    'ok': lambda response: response.ok,
+    'reason': lambda response: response.reason,
+    'url': lambda response: response.url,
+    'headers': lambda response: dict(response.headers),
+    'elapsed': lambda response: response.elapsed.total_seconds(),
+    'text': lambda response: response.text,
+    'content': lambda response: response.content,
+    'json': lambda response: response.json(),
+    'file': lambda response: response.file,
+    'mmap': lambda response: map_file(response.file) if response.file is not None else None,
+}
+
+
+# Selected when downloading without select: the body was already consumed (written to the file), so the
+# response itself would be of no use (and would keep its connection)
+DOWNLOAD_SELECT: typing.Final[typing.List[str]] = ['status_code', 'headers', 'file']
+
+
+# Value on a json path ("data.items.0.id"), None if not found
+def json_path(value: typing.Any, path: typing.Tuple[str, ...]) -> typing.Any:
+    for key in path:
+        try:
+            value = value[int(key)] if isinstance(value, list) else value[key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+    return value
+
+
+# Selectors by name, created once. Besides SELECTORS, "header:<name>" (None if not present)
+# and "json:<path>" (see json_path)
+@functools.lru_cache(maxsize=None)
+def _selector(name: str) -> typing.Callable[[Projection], typing.Any]:
+    selector = SELECTORS.get(name)
+    if selector is not None:
+        return selector
+    kind, sep, argument = name.partition(':')
+    if sep and argument and kind == 'header':
+        return lambda response: response.headers.get(argument)
+    if sep and argument and kind == 'json':
+        path = tuple(argument.split('.'))
+        return lambda response: json_path(response.json(), path)
+    raise exceptions.YRunnerInvalidParameter(
+        f"Invalid select {name}, valid ones are {', '.join(SELECTORS)}, header:<name> and json:<path>"
+    )
 
-    # Make request
-    response = requests.request(**lrequest)
+
+# Projects the response on the selected attributes (and releases it), select can be:
+#  * None: the response itself
+#  * attribute name: the value of the attribute
+#  * list of attribute names: dict attribute -> value
+#  * dict: dict key -> value of the attribute
+def project(response: 'requests.Response', select: typing.Any, file: typing.Optional[str] = None) -> typing.Any:
+    if select is None:
+        return response
+    projection = Projection(response, file)
+    try:
+        if isinstance(select, str):
+            return _selector(select)(projection)
+        if isinstance(select, list):
+            return {name: _selector(name)(projection) for name in select}
+        return {key: _selector(name)(projection) for key, name in select.items()}
+    finally:
+        response.close()
+
+
+# Writes the body of a (streamed) response to path, in chunks, so it is never fully on memory
+def download(response: 'requests.Response', path: str, chunk_size: int) -> None:
+    try:
+        with open(path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+    finally:
+        response.close()
+
+
+# send, reusing the response to the same request for ttl seconds (see httpcache)
+def cached_send(
+    session: 'requests.Session', runner: 'YRunner', args: typing.Dict[str, typing.Any], ttl: float
+) -> 'requests.Response':
+    key = httpcache.request_key(args)
+    entry, fresh = httpcache.RESPONSE_CACHE.lookup(key)
+    if entry is not None and fresh:
+        return entry.response
+    validators = entry.validators() if entry is not None else None
+    if entry is not None and validators:
+        response = send(session, runner, {**args, 'headers': {**(args.get('headers') or {}), **validators}})
+        if response.status_code == 304:  # Not modified
+            response.close()
+            return httpcache.RESPONSE_CACHE.revalidated(key, entry, ttl)
+    else:
+        response = send(session, runner, args)
+    httpcache.RESPONSE_CACHE.store(key, response, ttl)
+    return response
+
+
+# Sends a request, downloading its body to a file if requested, and projects the response
+def fetch(
+    session: 'requests.Session',
+    runner: 'YRunner',
+    args: typing.Dict[str, typing.Any],
+    select: typing.Any = None,
+    file: typing.Optional[str] = None,
+    ttl: typing.Optional[float] = None,
+) -> typing.Any:
+    if ttl is not None and file is None and httpcache.cacheable(args):
+        return project(cached_send(session, runner, args, ttl), select)
+    if file is None:
+        return project(send(session, runner, args), select)
+    response = send(session, runner, {**args, 'stream': True})
+    settings = get_settings(runner)
+    download(response, file, settings.download_chunk_size)
+    return project(response, select if select is not None else DOWNLOAD_SELECT, file)
+
+
+def _download_path(request: types.Arguments, runner: 'YRunner') -> typing.Optional[str]:
+    return runner.eval_string(request.download) if request.download is not None else None
+
+
+def _cache_ttl(request: types.Arguments, runner: 'YRunner') -> typing.Optional[float]:
+    return float(runner.eval_expr(request.cache)) if request.cache is not None else None
+
+
+def exec_request(request: types.Arguments, runner: 'YRunner') -> None:
+    # Make request, using the pooled session of the runner
+    response = fetch(
+        get_session(runner),
+        runner,
+        _request_args(request, runner),
+        request.select,
+        _download_path(request, runner),
+        _cache_ttl(request, runner),
+    )
 
     # Store response
-    if 'response_var' in request:
-        runner.set_variable(request['response_var'], response)
+    if request.response_var is not None:
+        runner.set_variable(request.response_var, response)
+
+
+# Coroutine version, for AsyncYRunner. The request itself is done on the runner thread pool,
+# so the loop is not blocked while waiting for the response
+async def aexec_request(request: types.Arguments, runner: 'AsyncYRunner') -> None:
+    response = await runner.run_blocking(
+        fetch,
+        get_session(runner),
+        runner,
+        _request_args(request, runner),
+        request.select,
+        _download_path(request, runner),
+        _cache_ttl(request, runner),
+    )
+
+    if request.response_var is not None:
+        runner.set_variable(request.response_var, response)
+
+
+# Arguments (and download path) for each item of request_many, rendered with the item variable set to the item
+def _request_many_args(
+    request: types.Arguments, runner: 'YRunner'
+) -> typing.List[typing.Tuple[typing.Dict[str, typing.Any], typing.Optional[str]]]:
+    item_var = request.item_var
+    variables = runner.variables
+    previous = variables.get(item_var, variables)  # variables is used as sentinel
+    try:
+        all_args = []
+        for item in runner.eval_expr(request.items):
+            variables[item_var] = item  # Only while rendering (restored after), not an assignment of the script
+            all_args.append((_request_args(request, runner, templated_headers=True), _download_path(request, runner)))
+        return all_args
+    finally:
+        if previous is variables:
+            variables.pop(item_var, None)
+        else:
+            variables[item_var] = previous
+
+
+def _max_concurrency(request: types.Arguments, runner: 'YRunner') -> int:
+    if request.max_concurrency is not None:
+        return max(1, int(runner.eval_expr(request.max_concurrency)))
+    settings = get_settings(runner)
+    return max(1, settings.pool_maxsize)
+
+
+# Issues one request per item of a list, concurrently, storing the (projected) responses in input order
+def exec_request_many(request: types.Arguments, runner: 'YRunner') -> None:
+    all_args = _request_many_args(request, runner)
+    session = get_session(runner)
+    select = request.select
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=_max_concurrency(request, runner), thread_name_prefix='yrunner-request'
+    ) as pool:
+        futures = [pool.submit(fetch, session, runner, args, select, file) for args, file in all_args]
+        # On first error, do not issue the pending requests
+        _, pending = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+
+    for future in futures:
+        if not future.cancelled() and future.exception() is not None:
+            raise typing.cast(BaseException, future.exception())
+
+    if request.response_var is not None:
+        runner.set_variable(request.response_var, [future.result() for future in futures])
+
+
+async def aexec_request_many(request: types.Arguments, runner: 'AsyncYRunner') -> None:
+    import asyncio  # Already imported by the running loop
+
+    all_args = _request_many_args(request, runner)
+    session = get_session(runner)
+    select = request.select
+    semaphore = asyncio.Semaphore(_max_concurrency(request, runner))
+
+    async def fetch_one(args: typing.Dict[str, typing.Any], file: typing.Optional[str]) -> typing.Any:
+        async with semaphore:
+            return await runner.run_blocking(fetch, session, runner, args, select, file)
+
+    tasks = [asyncio.ensure_future(fetch_one(args, file)) for args, file in all_args]
+    if not tasks:
+        results: typing.List[typing.Any] = []
+    else:
+        # On first error, do not issue the pending requests
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in tasks:
+            if not task.cancelled() and task.exception() is not None:
+                raise typing.cast(BaseException, task.exception())
+        results = [task.result() for task in tasks]
+
+    if request.response_var is not None:
+        runner.set_variable(request.response_var, results)
+
+
+# Parameters passed to requests
+REQUEST_PARAMETERS: typing.Final[typing.List[types.CommandParameter]] = [
+    types.CommandParameter('method'),
+    types.CommandParameter('url', kind=types.ParameterKind.TEMPLATE),
+    types.CommandParameter('params', True, kind=types.ParameterKind.TEMPLATE),
+    types.CommandParameter('data', True),
+    types.CommandParameter('json', True),
+    types.CommandParameter('headers', True),
+    types.CommandParameter('cookies', True),
+    types.CommandParameter('auth', True),
+    types.CommandParameter('timeout', True),
+    types.CommandParameter('allow_redirects', True),
+    types.CommandParameter('proxies', True),
+    types.CommandParameter('hooks', True),
+    types.CommandParameter('stream', True),
+    types.CommandParameter('verify', True),
+    types.CommandParameter('cert', True),
+]
 
 # Define internal commands
 COMMANDS: typing.Final[typing.List[types.Command]] = [
     types.Command(
         'request',
         exec_request,
+        REQUEST_PARAMETERS
+        + [
+            types.CommandParameter('select', True),
+            types.CommandParameter('download', True, kind=types.ParameterKind.TEMPLATE),
+            types.CommandParameter('cache', True, kind=types.ParameterKind.EXPRESSION),  # Seconds to reuse it
+            types.CommandParameter('response_var', True, kind=types.ParameterKind.VARIABLE),
+        ],
+        bind=True,
+    ),
+    types.Command(
+        'request_many',
+        exec_request_many,
         [
-            types.CommandParameter('method'),
-            types.CommandParameter('url'),
-            types.CommandParameter('params', True),
-            types.CommandParameter('data', True),
-            types.CommandParameter('headers', True),
-            types.CommandParameter('cookies', True),
-            types.CommandParameter('auth', True),
-            types.CommandParameter('timeout', True),
-            types.CommandParameter('allow_redirects', True),
-            types.CommandParameter('proxies', True),
-            types.CommandParameter('hooks', True),
-            types.CommandParameter('stream', True),
-            types.CommandParameter('verify', True),
-            types.CommandParameter('cert', True),
+            # Headers are also templates, rendered for each item
+            p._replace(kind=types.ParameterKind.TEMPLATE) if p.name == 'headers' else p
+            for p in REQUEST_PARAMETERS
+        ]
+        + [
+            types.CommandParameter('items', kind=types.ParameterKind.EXPRESSION),
+            types.CommandParameter('item_var', True, 'item', kind=types.ParameterKind.VARIABLE),
+            types.CommandParameter('max_concurrency', True, kind=types.ParameterKind.EXPRESSION),
+            types.CommandParameter('select', True),
+            types.CommandParameter('download', True, kind=types.ParameterKind.TEMPLATE),
+            types.CommandParameter('response_var', True, kind=types.ParameterKind.VARIABLE),
         ],
+        bind=True,
     ),
 ]
+
+ASYNC_COMMANDS: typing.Final[typing.List[types.Command]] = [
+    COMMANDS[0]._replace(executor=aexec_request),
+    COMMANDS[1]._replace(executor=aexec_request_many),
+]
@@ -6,74 +6,239 @@
 import typing
 import time
 import logging
+import contextvars
+import concurrent.futures
 
 from .. import exceptions, types
 
 if typing.TYPE_CHECKING:
     from ..runner import YRunner
+    from ..async_runner import AsyncYRunner
 
 logger = logging.getLogger(__name__)
 
 
-def exec_set(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    data = node['set']
-    if 'value' in data:
-        runner.set_variable(data['var'], runner.eval_expr(data['value']))
-    else:
-        raise exceptions.YRunnerInvalidParameter("Invalid set types.Command, missing 'value' parameter")
+# Commands bind its parameters (see types.Command.bind), so executors receive its Arguments
+def exec_set(args: types.Arguments, runner: 'YRunner') -> None:
+    runner.set_variable(args.var, runner.eval_expr(args.value))
 
 
-def exec_if(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    condition = runner.eval_expr(node['if']['condition'])
-    if condition:
-        runner.execute(node['if']['commands'])
+def exec_if(args: types.Arguments, runner: 'YRunner') -> None:
+    if runner.eval_expr(args.condition):
+        runner.execute(args.commands)
 
 
-def exec_while(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    while runner.eval_expr(node['while']['condition']):
+def exec_while(args: types.Arguments, runner: 'YRunner') -> None:
+    condition, commands = args.condition, args.commands
+    while runner.eval_expr(condition):
         try:
-            runner.execute(node['while']['commands'])
+            runner.execute(commands)
         except exceptions.LoopBreak:
             break
         except exceptions.LoopContinue:
             continue
 
 
-def exec_break(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
+def exec_break(args: types.Arguments, runner: 'YRunner') -> None:
     raise exceptions.LoopBreak()
 
 
-def exec_continue(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
+def exec_continue(args: types.Arguments, runner: 'YRunner') -> None:
     raise exceptions.LoopContinue()
 
 
-def exec_exit(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    if 'code' in node['exit']:
-        raise exceptions.Exit(int(runner.eval_expr(node['exit']['code'])))
-    raise exceptions.Exit(0)
+def exec_exit(args: types.Arguments, runner: 'YRunner') -> None:
+    raise exceptions.Exit(int(runner.eval_expr(args.code)))
 
 
-def exec_log(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    log = node['log']
+def exec_log(args: types.Arguments, runner: 'YRunner') -> None:
     # Convert to logging level
-    level: int = logging.getLevelName(log.get('level', 'INFO').upper())
-    args = log.get('args', [])
-    kwargs = log.get('kwargs', {})
-
-    logger.log(level, runner.eval_string(log['message']), args, kwargs)
+    level = logging.getLevelName(args.level.upper())  # int for the known level names
+    logger.log(level, runner.eval_string(args.message), args.args, args.kwargs)
+
+
+def _parallel_workers(args: types.Arguments, runner: 'YRunner') -> int:
+    max_workers = args.max_workers if args.max_workers is not None else len(args.branches)
+    return max(1, int(runner.eval_expr(max_workers)))
+
+
+# Once all branches has finished (or was cancelled), raise the error of the first failed branch (in branch order)
+# or, if all succeeded, copy back the requested variables
+def _parallel_finish(
+    args: types.Arguments,
+    runner: 'YRunner',
+    children: typing.List['YRunner'],  # Forked tracking the assigned variables
+    outcomes: typing.List[typing.Optional[BaseException]],  # None for succeeded (or cancelled) branches
+) -> None:
+    for outcome in outcomes:
+        if isinstance(outcome, (exceptions.LoopBreak, exceptions.LoopContinue)):
+            raise exceptions.YRunnerInvalidCommand("break and continue can not cross a parallel branch")
+        if outcome is not None:
+            raise outcome  # Exit included, the script exits with the code of the branch
+
+    # A variable set by several branches gets the value of the last one
+    for name in args.merge:
+        for child in children:
+            if child.assigned is not None and name in child.assigned and name in child.variables:
+                runner.set_variable(name, child.variables[name])
+    if args.result_var is not None:
+        runner.set_variable(args.result_var, [dict(child.variables) for child in children])
+
+
+# Executes the branches concurrently, each one with a copy of the variables
+# If a branch fails (or exits), the branches not started yet are cancelled
+def exec_parallel(args: types.Arguments, runner: 'YRunner') -> None:
+    branches = args.branches
+    if not branches:
+        return
+    children = [runner.fork(dict(runner.variables), track_assigned=True) for _ in branches]
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=_parallel_workers(args, runner), thread_name_prefix='yrunner-parallel'
+    ) as pool:
+        # Branches runs on a copy of the current context, so instruments can relate them to this command
+        futures = [
+            pool.submit(contextvars.copy_context().run, child.execute, branch)
+            for child, branch in zip(children, branches)
+        ]
+        _, pending = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+    _parallel_finish(args, runner, children, [None if f.cancelled() else f.exception() for f in futures])
 
 
 # Define internal commands
 COMMANDS: typing.Final[typing.List[types.Command]] = [
-    types.Command('set', exec_set, [types.CommandParameter('name'), types.CommandParameter('value')]),
     types.Command(
-        'if', exec_if, [types.CommandParameter('condition'), types.CommandParameter('types.Commands')]
+        'set',
+        exec_set,
+        [
+            types.CommandParameter('var', kind=types.ParameterKind.VARIABLE),
+            types.CommandParameter('value', kind=types.ParameterKind.EXPRESSION),
+        ],
+        bind=True,
+    ),
+    types.Command(
+        'if',
+        exec_if,
+        [
+            types.CommandParameter('condition', kind=types.ParameterKind.EXPRESSION),
+            types.CommandParameter('commands', kind=types.ParameterKind.COMMANDS),
+        ],
+        bind=True,
+    ),
+    types.Command(
+        'while',
+        exec_while,
+        [
+            types.CommandParameter('condition', kind=types.ParameterKind.EXPRESSION),
+            types.CommandParameter('commands', kind=types.ParameterKind.COMMANDS),
+        ],
+        bind=True,
     ),
+    types.Command('break', exec_break, bind=True),
+    types.Command('continue', exec_continue, bind=True),
     types.Command(
-        'while', exec_while, [types.CommandParameter('condition'), types.CommandParameter('types.Commands')]
+        'exit',
+        exec_exit,
+        [types.CommandParameter('code', optional=True, default=0, kind=types.ParameterKind.EXPRESSION)],
+        bind=True,
     ),
-    types.Command('break', exec_break),
-    types.Command('continue', exec_continue),
-    types.Command('exit', exec_exit, [types.CommandParameter('code', optional=True)]),
-    types.Command('log', exec_log, [types.CommandParameter('message')]),
+    types.Command(
+        'log',
+        exec_log,
+        [
+            types.CommandParameter('message', kind=types.ParameterKind.TEMPLATE),
+            types.CommandParameter('level', optional=True, default='INFO'),
+            types.CommandParameter('args', optional=True, default=[]),
+            types.CommandParameter('kwargs', optional=True, default={}),
+        ],
+        bind=True,
+    ),
+    types.Command(
+        'parallel',
+        exec_parallel,
+        [
+            types.CommandParameter('branches', kind=types.ParameterKind.BLOCKS),
+            types.CommandParameter('max_workers', optional=True, kind=types.ParameterKind.EXPRESSION),
+            types.CommandParameter('merge', optional=True, default=[], kind=types.ParameterKind.VARIABLE),
+            types.CommandParameter('result_var', optional=True, kind=types.ParameterKind.VARIABLE),
+        ],
+        bind=True,
+    ),
+]
+
+
+# Coroutine versions of the commands, for AsyncYRunner
+# Commands that does not block are executed directly on the loop
+async def aexec_set(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    exec_set(args, runner)
+
+
+async def aexec_if(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    if runner.eval_expr(args.condition):
+        await runner.execute(args.commands)
+
+
+async def aexec_while(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    condition, commands = args.condition, args.commands
+    while runner.eval_expr(condition):
+        try:
+            await runner.execute(commands)
+        except exceptions.LoopBreak:
+            break
+        except exceptions.LoopContinue:
+            continue
+
+
+async def aexec_break(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    exec_break(args, runner)
+
+
+async def aexec_continue(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    exec_continue(args, runner)
+
+
+async def aexec_exit(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    exec_exit(args, runner)
+
+
+async def aexec_log(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    exec_log(args, runner)
+
+
+async def aexec_parallel(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    branches = args.branches
+    if not branches:
+        return
+    import asyncio  # Already imported by the running loop, not needed (nor imported) by sync runners
+
+    children = [typing.cast('AsyncYRunner', runner.fork(dict(runner.variables), track_assigned=True)) for _ in branches]
+    semaphore = asyncio.Semaphore(_parallel_workers(args, runner))
+
+    async def run_branch(child: 'AsyncYRunner', branch: typing.Any) -> None:
+        async with semaphore:
+            await child.execute(branch)
+
+    tasks = [asyncio.ensure_future(run_branch(child, branch)) for child, branch in zip(children, branches)]
+    _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    _parallel_finish(args, runner, list(children), [None if t.cancelled() else t.exception() for t in tasks])
+
+
+ASYNC_EXECUTORS: typing.Final[typing.Dict[str, types.AsyncExecutorType]] = {
+    'set': aexec_set,
+    'if': aexec_if,
+    'while': aexec_while,
+    'break': aexec_break,
+    'continue': aexec_continue,
+    'exit': aexec_exit,
+    'log': aexec_log,
+    'parallel': aexec_parallel,
+}
+
+# Same commands (and parameters), with the coroutine executors
+ASYNC_COMMANDS: typing.Final[typing.List[types.Command]] = [
+    command._replace(executor=ASYNC_EXECUTORS[command.name]) for command in COMMANDS
 ]
@@ -11,26 +11,48 @@ from .. import exceptions, types
 
 if typing.TYPE_CHECKING:
     from ..runner import YRunner
+    from ..async_runner import AsyncYRunner
 
 logger = logging.getLogger(__name__)
 
 
-def exec_gettime(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    var = node['gettime']['var']
-    runner.set_variable(var, time.time())
+def exec_gettime(args: types.Arguments, runner: 'YRunner') -> None:
+    runner.set_variable(args.var, time.time())
 
 
-def exec_sleep(node: typing.Mapping[str, typing.Any], runner: 'YRunner') -> None:
-    sleep = node['sleep']
-    value = runner.eval_expr(sleep['value'])
+def _sleep_seconds(args: types.Arguments, runner: 'YRunner') -> float:
+    value = runner.eval_expr(args.value)
     if isinstance(value, (int, float)):
-        time.sleep(value)
-    else:
-        raise Exception("Invalid sleep types.Command")
+        for i in runner.instruments:
+            i.sleep(value)
+        return value
+    raise Exception("Invalid sleep types.Command")
+
+
+def exec_sleep(args: types.Arguments, runner: 'YRunner') -> None:
+    time.sleep(_sleep_seconds(args, runner))
+
+
+# Coroutine versions, for AsyncYRunner
+async def aexec_gettime(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    exec_gettime(args, runner)
+
+
+async def aexec_sleep(args: types.Arguments, runner: 'AsyncYRunner') -> None:
+    import asyncio  # Already imported by the running loop
+
+    await asyncio.sleep(_sleep_seconds(args, runner))
 
 
 # Define internal commands
 COMMANDS: typing.Final[typing.List[types.Command]] = [
-    types.Command('gettime', exec_gettime, [types.CommandParameter('var')]),
-    types.Command('sleep', exec_sleep, [types.CommandParameter('seconds')]),
+    types.Command('gettime', exec_gettime, [types.CommandParameter('var', kind=types.ParameterKind.VARIABLE)], bind=True),
+    types.Command(
+        'sleep', exec_sleep, [types.CommandParameter('value', kind=types.ParameterKind.EXPRESSION)], bind=True
+    ),
+]
+
+ASYNC_COMMANDS: typing.Final[typing.List[types.Command]] = [
+    COMMANDS[0]._replace(executor=aexec_gettime),
+    COMMANDS[1]._replace(executor=aexec_sleep),
 ]
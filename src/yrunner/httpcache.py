@@ -0,0 +1,151 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Responses of the requests that opt in (the cache parameter of request, its time to live), shared by all the
+# runners of the process. Bounded by the size of the cached responses, least recently used ones are evicted first.
+# Expired responses with a validator (ETag or Last-Modified) are revalidated with a conditional request, and
+# reused (as a hit) if the server answers that they are not modified
+import typing
+import collections
+import threading
+import time
+
+from . import cache
+
+# Bytes accounted for each entry, besides its body and headers
+ENTRY_OVERHEAD: typing.Final[int] = 256
+
+
+class Entry(typing.NamedTuple):
+    response: typing.Any  # requests.Response, with its content already read
+    expires: float  # time.monotonic
+    size: int
+
+    # Headers of a conditional request, to revalidate the response
+    def validators(self) -> typing.Dict[str, str]:
+        headers = self.response.headers
+        result = {}
+        if 'ETag' in headers:
+            result['If-None-Match'] = headers['ETag']
+        if 'Last-Modified' in headers:
+            result['If-Modified-Since'] = headers['Last-Modified']
+        return result
+
+
+# Key of a request: method, url, params and the headers, auth and cookies that can change the response
+def request_key(args: typing.Mapping[str, typing.Any]) -> str:
+    def items(value: typing.Any) -> typing.Any:
+        return sorted(value.items()) if isinstance(value, dict) else value
+
+    return repr(
+        (
+            str(args['method']).upper(),
+            args['url'],
+            items(args.get('params')),
+            items(args.get('headers')),
+            args.get('auth'),
+            items(args.get('cookies')),
+        )
+    )
+
+
+# Only bodiless GET (and HEAD) requests whose response is read at once can be cached
+def cacheable(args: typing.Mapping[str, typing.Any]) -> bool:
+    return (
+        str(args['method']).upper() in ('GET', 'HEAD')
+        and not args.get('stream')
+        and args.get('data') is None
+        and args.get('json') is None
+    )
+
+
+class ResponseCache:
+    max_bytes: int
+    size: int  # Bytes of the cached responses
+    hits: int  # Responses reused, fresh or revalidated
+    revalidations: int  # Hits after a conditional request
+    misses: int
+    evictions: int
+
+    _data: 'collections.OrderedDict[str, Entry]'
+    _lock: threading.Lock
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        if max_bytes <= 0:
+            raise ValueError('max_bytes must be greater than 0')
+        self.max_bytes = max_bytes
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.size = self.hits = self.revalidations = self.misses = self.evictions = 0
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes:
+            _, entry = self._data.popitem(last=False)
+            self.size -= entry.size
+            self.evictions += 1
+
+    # (entry, fresh) for key, fresh ones are counted as hits. Stale entries are kept to be revalidated
+    def lookup(self, key: str) -> typing.Tuple[typing.Optional[Entry], bool]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None, False
+            self._data.move_to_end(key)
+            if entry.expires > time.monotonic():
+                self.hits += 1
+                return entry, True
+            return entry, False
+
+    # Response received for key (a miss), cached for ttl seconds if it can be reused
+    def store(self, key: str, response: typing.Any, ttl: float) -> None:
+        with self._lock:
+            self.misses += 1
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            if response.status_code != 200 or 'no-store' in response.headers.get('Cache-Control', ''):
+                return
+            size = ENTRY_OVERHEAD + len(response.content)
+            size += sum(len(name) + len(value) for name, value in response.headers.items())
+            if size > self.max_bytes:
+                return
+            self._data[key] = Entry(response, time.monotonic() + ttl, size)
+            self.size += size
+            self._evict()
+
+    # Server answered that entry is not modified, so it is fresh for ttl seconds more
+    def revalidated(self, key: str, entry: Entry, ttl: float) -> typing.Any:
+        with self._lock:
+            self.hits += 1
+            self.revalidations += 1
+            if self._data.get(key) is entry:
+                self._data[key] = entry._replace(expires=time.monotonic() + ttl)
+            return entry.response
+
+    def resize(self, max_bytes: int) -> None:
+        if max_bytes <= 0:
+            raise ValueError('max_bytes must be greater than 0')
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = self.hits = self.revalidations = self.misses = self.evictions = 0
+
+    # Counters, with size and maxsize in bytes
+    def info(self) -> cache.CacheInfo:
+        with self._lock:
+            return cache.CacheInfo(self.hits, self.misses, self.evictions, self.size, self.max_bytes)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+RESPONSE_CACHE: typing.Final[ResponseCache] = ResponseCache()
@@ -0,0 +1,45 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Instrumentation hooks of the runner, i.e. YRunner(instruments=[MyInstrument()])
+# Runs with instruments are always executed by the tree engine, and without instruments there is
+# no overhead other than a check per block of commands and per expression
+# Hooks can be called from several threads (parallel, request_many) and from concurrent asyncio tasks
+import typing
+
+from . import program
+
+if typing.TYPE_CHECKING:
+    from .runner import YRunner
+
+
+class Instrument:
+    source_marks: bool = False  # Scripts must be compiled keeping the yaml positions (Step.source)
+
+    # Start of a run (or of a stream of documents), before compiling the script
+    def run_start(self, runner: 'YRunner') -> None:
+        pass
+
+    def run_end(self, runner: 'YRunner') -> None:
+        pass
+
+    def command_start(self, step: program.Step) -> None:
+        pass
+
+    # elapsed is wall time in seconds, including nested commands
+    def command_end(self, step: program.Step, elapsed: float) -> None:
+        pass
+
+    # Expression evaluated by the runner (conditions, values and placeholders of templates)
+    def expression(self, source: str, elapsed: float) -> None:
+        pass
+
+    # HTTP request done by the http executors, status is None if the request failed
+    def http(self, method: str, url: str, status: typing.Optional[int], elapsed: float) -> None:
+        pass
+
+    # Sleep requested by a command, in seconds
+    def sleep(self, seconds: float) -> None:
+        pass
@@ -0,0 +1,50 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Compile time optimizations (see YRunner.optimize). Expressions are already folded by the parser
+# (see parser.fold_rpn), so expressions as "1 == 1" or "60 * 5" are compiled to a constant, and then:
+#  * Constant expression parameters (i.e. set values) are kept as its value, so they are not evaluated
+#  * if with a constant false condition is removed, and with a constant true one replaced by its commands
+#  * while with a constant false condition is removed
+# Only the builtin if/while are optimized, overriden ones are kept as they are
+import typing
+
+from . import parser, program, pyeval
+from .executors import internal
+
+_IF_EXECUTORS: typing.Final[typing.FrozenSet[typing.Any]] = frozenset([internal.exec_if, internal.aexec_if])
+_WHILE_EXECUTORS: typing.Final[typing.FrozenSet[typing.Any]] = frozenset(
+    [internal.exec_while, internal.aexec_while]
+)
+
+
+# (is constant, value) of a compiled expression parameter
+def constant_value(expr: typing.Any) -> typing.Tuple[bool, typing.Any]:
+    if isinstance(expr, parser.CompiledExpression):
+        return (True, expr.value) if expr.constant else (False, None)
+    if isinstance(expr, (str, pyeval.PythonExpression)):  # Not folded (python eval)
+        return False, None
+    return True, expr
+
+
+# Compiled expression parameter, as its value if constant. Constant strings are kept compiled,
+# because a string is evaluated as an expression
+def expression(expr: typing.Any) -> typing.Any:
+    if isinstance(expr, parser.CompiledExpression) and expr.constant and not isinstance(expr.value, str):
+        return expr.value
+    return expr
+
+
+# Steps that replaces an already compiled step (its nested blocks are already optimized)
+def optimize_step(step: program.Step) -> typing.Tuple[program.Step, ...]:
+    executor = step.command.executor
+    if executor in _IF_EXECUTORS or executor in _WHILE_EXECUTORS:
+        constant, value = constant_value(step.args.condition)
+        if constant:
+            if not value:
+                return ()
+            if executor in _IF_EXECUTORS:
+                return step.args.commands
+    return (step,)
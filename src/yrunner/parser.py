@@ -1,7 +1,13 @@
 import typing
+import contextlib
 import enum
+import functools
+import json
+import operator
 import re
-import yaml
+import sys
+
+from . import cache, exceptions
 
 # Simple tokenizer of an expression
 
@@ -39,6 +45,10 @@ class TokenType(enum.Enum):
     STRING = ("STRING", -1, None)
     VARIABLE = ("VARIABLE", -1, None)
 
+    # Pickled by name, values contains (not picklable) lambdas
+    def __reduce_ex__(self, protocol: object) -> typing.Tuple[typing.Any, ...]:
+        return (getattr, (TokenType, self.name))
+
 class Token(typing.NamedTuple):
     type: TokenType
     value: typing.Any
@@ -54,98 +64,132 @@ VALID_OPERATORS: typing.Final[typing.Dict[str, TokenType]] = {
     i.value[0]: i for i in TokenType if i not in [TokenType.NUMBER, TokenType.STRING, TokenType.VARIABLE]
 }
 
+# Keyword operators, recognized only as whole words (so "order" or "nothing" are variables)
+KEYWORD_OPERATORS: typing.Final[typing.Dict[str, TokenType]] = {
+    op: token_type for op, token_type in VALID_OPERATORS.items() if op in ('and', 'or', 'not')
+}
+
+# Characters that can not be part of a variable name or a number
+_DELIMITERS: typing.Final[str] = r'\s\'"()+\-*/%<>=!&|'
+
+# Single master regex, alternatives are tried in order and operators longest first,
+# so "<=" is never lexed as "<" followed by "=" (nor "**" as two "*")
+# Compiled on first tokenize, programs loaded from the disk cache do not need it
+@functools.lru_cache(maxsize=None)
+def _token_re() -> re.Pattern:
+    return re.compile(
+        r'(?P<space>\s+)'
+        r'|(?P<string>"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')'
+        rf'|(?P<float>\d+\.\d+)(?![^{_DELIMITERS}])'
+        rf'|(?P<int>\d+)(?![^{_DELIMITERS}])'
+        r'|(?P<operator>'
+        + '|'.join(
+            re.escape(op)
+            for op in sorted(
+                [op for op in VALID_OPERATORS if op not in KEYWORD_OPERATORS and op != 'NEG'] + ['!'],
+                key=len,
+                reverse=True,
+            )
+        )
+        + ')'
+        rf'|(?P<word>[^{_DELIMITERS}]+)'
+        r'|(?P<error>.)',
+        re.DOTALL,
+    )
+
+_ESCAPE_RE: typing.Final[re.Pattern] = re.compile(r'\\(.)', re.DOTALL)
+_ESCAPES: typing.Final[typing.Dict[str, str]] = {
+    'n': '\n',
+    't': '\t',
+    'r': '\r',
+    'b': '\b',
+    'f': '\f',
+    'v': '\v',
+    '\\': '\\',
+}
+
+# After one of these, an operator is binary, otherwise it must be an unary one
+_OPERAND_TYPES: typing.Final[typing.FrozenSet[TokenType]] = frozenset(
+    [TokenType.NUMBER, TokenType.STRING, TokenType.VARIABLE, TokenType.RPAREN]
+)
+
+
+def _unescape(quoted: str) -> str:
+    quote, content = quoted[0], quoted[1:-1]
+    if '\\' not in content:
+        return content
+
+    def replace(match: 're.Match[str]') -> str:
+        c = match.group(1)
+        if c == quote:
+            return quote
+        return _ESCAPES.get(c, '\\' + c)
+
+    return _ESCAPE_RE.sub(replace, content)
+
+
+# Variable names are interned when scripts are compiled, both on expressions and on the commands that store
+# them (see types.ParameterKind.VARIABLE), so the key stored on the variables dict and the name looked up by
+# expressions are the same object, and the lookup matches by identity instead of comparing the strings
+def symbol(name: str) -> str:
+    return sys.intern(name)
+
+
 # Tokenize an expression, taking into account strings, numbers (positive and negative), parenthesis and operators
+# Single pass over the expression, using the master regex (longest match for operators)
 def tokenize(expression: str) -> typing.List[Token]:
-    class State(enum.IntEnum):
-        NORMAL = 0
-        QUOTED = 1
-        ESCAPED = 2
-
     tokens: typing.List[Token] = []
-    quote: str = ""
-    current_token = ""   # nosec: command token, not a password
-    state = State.NORMAL
-
-    def append_number_or_string(current_token: str, tokens: typing.List[Token]):
-        if current_token:
-            # if an integer
-            if re.match(r"^-?\d+$", current_token):
-                tokens.append(Token(TokenType.NUMBER, int(current_token)))
-            elif re.match(r"^-?\d+\.\d+$", current_token):  # float
-                tokens.append(Token(TokenType.NUMBER, float(current_token)))
-            else:
-                tokens.append(Token(TokenType.VARIABLE, current_token))
-
-    i = 0
-    while i < len(expression):
-        c = expression[i]
-        if state == State.NORMAL:
-            if c.isspace():
-                # skip
-                pass
-            elif c in ["'", '"']:
-                # Skip the quote
-                quote = c
-                state = State.QUOTED
-            else:
-                for op in VALID_OPERATORS:
-                    if expression[i:].startswith(op):
-                        if current_token:
-                            append_number_or_string(current_token, tokens)
-                            tokens.append(Token(VALID_OPERATORS[op], op))
-                        else: # Unary operator, can only be negative or not
-                            if op not in UNARY_OPERATORS:
-                                raise Exception(f'Invalid unary operator {op} at pos {i}: {tokens}')
-                            tokens.append(Token(UNARY_OPERATORS[op], op))
-                        current_token = ""  # nosec: current_token is not a password
-                        # Skip the operator
-                        i += len(op) - 1
-                        c = ''
-                        break
-                current_token += c
-                    
-        elif state == State.QUOTED:
-            if c == "\\":
-                state = State.ESCAPED
-            elif c == quote:
-                tokens.append(Token(TokenType.STRING, current_token))
-                current_token = ""  # nosec: current_token is not a password
-                state = State.NORMAL
-            else:
-                current_token += c
-        elif state == State.ESCAPED:
-            if c == "n":
-                current_token += '\n'
-            elif c == "t":
-                current_token += '\t'
-            elif c == "r":
-                current_token += '\r'
-            elif c == "b":
-                current_token += '\b'
-            elif c == "f":
-                current_token += '\f'
-            elif c == "v":
-                current_token += '\v'
-            elif c == "\\":
-                current_token += '\\'
-            elif c == quote:
-                current_token += quote
+    append = tokens.append
+    last_type: typing.Optional[TokenType] = None
+
+    for match in _token_re().finditer(expression):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == 'space':
+            continue
+        if kind == 'word':
+            token_type = KEYWORD_OPERATORS.get(value)
+            if token_type is None:
+                token = Token(TokenType.VARIABLE, symbol(value))
             else:
-                current_token += '\\' + c
-            state = State.QUOTED
+                token = Token(token_type, value)
+                kind = 'operator'
+        elif kind == 'int':
+            token = Token(TokenType.NUMBER, int(value))
+        elif kind == 'float':
+            token = Token(TokenType.NUMBER, float(value))
+        elif kind == 'string':
+            token = Token(TokenType.STRING, _unescape(value))
+        elif kind == 'operator':
+            token = Token(UNARY_OPERATORS[value] if value == '!' else VALID_OPERATORS[value], value)
+        elif value in ('"', "'"):
+            raise Exception(f'Missing closing quote for string at pos {match.start()}')
         else:
-            raise Exception("Invalid state")
-        
-        i += 1
+            raise Exception(f'Invalid character {value!r} at pos {match.start()}')
 
-    if state == State.QUOTED:
-        raise Exception("Invalid state (missing closing quote)")
+        if kind == 'operator':
+            is_unary_position = last_type not in _OPERAND_TYPES
+            if token.type == TokenType.RPAREN and is_unary_position and last_type != TokenType.LPAREN:
+                raise Exception(f'Missing operand before {value} at pos {match.start()}')
+            if token.type == TokenType.LPAREN:
+                if not is_unary_position:
+                    raise Exception(f'Missing operator before {value} at pos {match.start()}')
+            elif token.type != TokenType.RPAREN:
+                if is_unary_position:
+                    if value not in UNARY_OPERATORS:
+                        raise Exception(f'Invalid unary operator {value} at pos {match.start()}')
+                    token = Token(UNARY_OPERATORS[value], value)
+                elif token.type == TokenType.NOT:
+                    raise Exception(f'Invalid binary operator {value} at pos {match.start()}')
+        elif last_type in _OPERAND_TYPES:
+            raise Exception(f'Missing operator before {value} at pos {match.start()}')
 
-    if current_token:
-        append_number_or_string(current_token, tokens)
+        append(token)
+        last_type = token.type
 
     return tokens
-    
+
+
 def rpn_expression(tokens: typing.List[Token]) -> typing.List[Token]:
     output: typing.List[Token] = []
     stack: typing.List[Token] = []
@@ -161,9 +205,18 @@ def rpn_expression(tokens: typing.List[Token]) -> typing.List[Token]:
             if not stack:
                 raise Exception("Mismatched parenthesis")
             stack.pop()
+        elif token.type in (TokenType.NOT, TokenType.NEG):
+            # Prefix operators, nothing on the left to pop
+            stack.append(token)
         else:
-            while stack and stack[-1].type != TokenType.LPAREN and token.type.value[1] <= stack[-1].type.value[1]:
-                output.append(stack.pop())
+            precedence = token.type.value[1]
+            while stack and stack[-1].type != TokenType.LPAREN:
+                top_precedence = stack[-1].type.value[1]
+                # "**" is right associative, all other binary operators are left associative
+                if precedence < top_precedence or (precedence == top_precedence and token.type != TokenType.POW):
+                    output.append(stack.pop())
+                else:
+                    break
             stack.append(token)
 
     while stack:
@@ -173,25 +226,281 @@ def rpn_expression(tokens: typing.List[Token]) -> typing.List[Token]:
 
     return output
 
-def eval_expression(expression: str, variables: typing.Mapping[str, typing.Any]) -> typing.Any:
-    tokens = tokenize(expression)
-    rpn = rpn_expression(tokens)
+# Stack based evaluation of an RPN expression (the reference interpreter, CompiledExpression is faster)
+def eval_rpn(rpn: typing.Iterable[Token], variables: typing.Mapping[str, typing.Any]) -> typing.Any:
     stack: typing.List[typing.Any] = []
 
     for token in rpn:
         if token.type in [TokenType.NUMBER, TokenType.STRING]:
             stack.append(token.value)
         elif token.type == TokenType.VARIABLE:
-            if token.value in variables:
+            try:
                 stack.append(variables[token.value])
-            else:
-                raise Exception(f"Unknown variable {token.value}")
+            except KeyError:
+                raise Exception(f"Unknown variable {token.value}") from None
         else:
             evaluator = token.type.value[2]
             if evaluator:
                 evaluator(stack)
 
     if len(stack) != 1:
-        raise Exception(f"Invalid expression: {expression} (stack: {stack})")
+        raise Exception(f"Invalid expression (stack: {stack})")
+
+    return stack[0]
+
+
+# Compiled expressions are a tree of closures, each one receives the variables mapping
+Evaluator = typing.Callable[[typing.Mapping[str, typing.Any]], typing.Any]
+
+BINARY_FUNCTIONS: typing.Final[typing.Dict[TokenType, typing.Callable[[typing.Any, typing.Any], typing.Any]]] = {
+    TokenType.EQ: operator.eq,
+    TokenType.NE: operator.ne,
+    TokenType.LT: operator.lt,
+    TokenType.GT: operator.gt,
+    TokenType.LE: operator.le,
+    TokenType.GE: operator.ge,
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.TIMES: operator.mul,
+    TokenType.DIVIDE: operator.truediv,
+    TokenType.MOD: operator.mod,
+    TokenType.POW: operator.pow,
+}
+
+UNARY_FUNCTIONS: typing.Final[typing.Dict[TokenType, typing.Callable[[typing.Any], typing.Any]]] = {
+    TokenType.NOT: operator.not_,
+    TokenType.NEG: operator.neg,
+}
+
+
+# Folded values bigger than this (string length or integer bits) are left to run time, as python does
+_FOLD_LIMIT: typing.Final[int] = 4096
+
+
+# Checks that folding an operation can not create a huge constant ("x" * 10000000, 2 ** 100000000...)
+def _foldable(token_type: TokenType, left: typing.Any, right: typing.Any) -> bool:
+    if token_type == TokenType.POW and isinstance(left, int) and isinstance(right, int) and right > 0:
+        return left.bit_length() * right <= _FOLD_LIMIT
+    if token_type == TokenType.TIMES:
+        for sequence, count in ((left, right), (right, left)):
+            if isinstance(sequence, str) and isinstance(count, int):
+                return len(sequence) * count <= _FOLD_LIMIT
+    return True
+
+
+def _constant_token(value: typing.Any) -> Token:
+    return Token(TokenType.STRING if isinstance(value, str) else TokenType.NUMBER, value)
+
+
+# Constant folding of a RPN token list: operators with constant operands are replaced by its result,
+# and "constant and x" / "constant or x" are reduced when the constant decides the result (as evaluation
+# short-circuits, x is not evaluated either). Operations that fail (i.e. 1 / 0) are kept, so the error is
+# raised when the expression is evaluated, as it would without folding
+def fold_rpn(rpn: typing.Iterable[Token]) -> typing.List[Token]:
+    output: typing.List[Token] = []
+    # Operands: start of its tokens on output, is constant, value
+    stack: typing.List[typing.Tuple[int, bool, typing.Any]] = []
+    try:
+        for token in rpn:
+            if token.type in (TokenType.NUMBER, TokenType.STRING):
+                stack.append((len(output), True, token.value))
+                output.append(token)
+                continue
+            if token.type == TokenType.VARIABLE:
+                stack.append((len(output), False, None))
+                output.append(token)
+                continue
+
+            folded: typing.Optional[typing.Tuple[typing.Any]] = None
+            if token.type in UNARY_FUNCTIONS:
+                start, constant, value = stack.pop()
+                if constant:
+                    with contextlib.suppress(Exception):
+                        folded = (UNARY_FUNCTIONS[token.type](value),)
+            else:
+                right, (start, constant, value) = stack.pop(), stack.pop()
+                if token.type in (TokenType.AND, TokenType.AND2, TokenType.OR, TokenType.OR2):
+                    is_and = token.type in (TokenType.AND, TokenType.AND2)
+                    if constant and bool(value) != is_and:  # false and x -> false, true or x -> true
+                        folded = (bool(value),)
+                    elif constant and right[1]:
+                        folded = (bool(right[2]),)
+                elif constant and right[1] and _foldable(token.type, value, right[2]):
+                    with contextlib.suppress(Exception):
+                        folded = (BINARY_FUNCTIONS[token.type](value, right[2]),)
+
+            if folded is None:
+                stack.append((start, False, None))
+                output.append(token)
+            else:
+                del output[start:]
+                stack.append((start, True, folded[0]))
+                output.append(_constant_token(folded[0]))
+    except IndexError:
+        raise Exception("Invalid expression (missing operand)") from None
+
+    return output
 
-    return stack[0]
\ No newline at end of file
+
+# Node of the tree while compiling, constant nodes keeps its value so operators can be specialized
+class _Node(typing.NamedTuple):
+    evaluator: Evaluator
+    constant: bool = False
+    value: typing.Any = None
+
+
+def _constant(value: typing.Any) -> _Node:
+    return _Node(lambda variables: value, True, value)
+
+
+def _load(name: str) -> _Node:
+    def load(variables: typing.Mapping[str, typing.Any]) -> typing.Any:
+        try:
+            return variables[name]
+        except KeyError:
+            raise Exception(f"Unknown variable {name}") from None
+
+    return _Node(load)
+
+
+def _unary(fnc: typing.Callable[[typing.Any], typing.Any], operand: _Node) -> _Node:
+    evaluator = operand.evaluator
+    return _Node(lambda variables: fnc(evaluator(variables)))
+
+
+def _binary(fnc: typing.Callable[[typing.Any, typing.Any], typing.Any], left: _Node, right: _Node) -> _Node:
+    lft, rgt = left.evaluator, right.evaluator
+    # Most common case is "var op constant", avoid a call for the constant operand
+    if right.constant:
+        value = right.value
+        return _Node(lambda variables: fnc(lft(variables), value))
+    if left.constant:
+        value = left.value
+        return _Node(lambda variables: fnc(value, rgt(variables)))
+    return _Node(lambda variables: fnc(lft(variables), rgt(variables)))
+
+
+# Logical operators short-circuit, right operand is only evaluated if needed
+def _and(left: _Node, right: _Node) -> _Node:
+    lft, rgt = left.evaluator, right.evaluator
+    return _Node(lambda variables: bool(lft(variables)) and bool(rgt(variables)))
+
+
+def _or(left: _Node, right: _Node) -> _Node:
+    lft, rgt = left.evaluator, right.evaluator
+    return _Node(lambda variables: bool(lft(variables)) or bool(rgt(variables)))
+
+
+# Converts a RPN token list to a closure tree
+def compile_rpn(rpn: typing.Iterable[Token]) -> Evaluator:
+    stack: typing.List[_Node] = []
+    try:
+        for token in rpn:
+            if token.type in (TokenType.NUMBER, TokenType.STRING):
+                stack.append(_constant(token.value))
+            elif token.type == TokenType.VARIABLE:
+                stack.append(_load(token.value))
+            elif token.type in UNARY_FUNCTIONS:
+                stack.append(_unary(UNARY_FUNCTIONS[token.type], stack.pop()))
+            else:
+                right, left = stack.pop(), stack.pop()
+                if token.type in (TokenType.AND, TokenType.AND2):
+                    stack.append(_and(left, right))
+                elif token.type in (TokenType.OR, TokenType.OR2):
+                    stack.append(_or(left, right))
+                else:
+                    stack.append(_binary(BINARY_FUNCTIONS[token.type], left, right))
+    except IndexError:
+        raise Exception("Invalid expression (missing operand)") from None
+
+    if len(stack) != 1:
+        raise Exception(f"Invalid expression ({len(stack)} values without operator)")
+
+    return stack[0].evaluator
+
+
+# Expression already tokenized and compiled, ready to be evaluated as many times as needed
+class CompiledExpression(typing.NamedTuple):
+    source: str
+    rpn: typing.Tuple[Token, ...]
+    evaluator: Evaluator
+
+    def evaluate(self, variables: typing.Mapping[str, typing.Any]) -> typing.Any:
+        return self.evaluator(variables)
+
+    # Folded to a single value (i.e. "1 == 1", "60 * 5"), does not depend on variables
+    @property
+    def constant(self) -> bool:
+        return len(self.rpn) == 1 and self.rpn[0].type in (TokenType.NUMBER, TokenType.STRING)
+
+    @property
+    def value(self) -> typing.Any:
+        return self.rpn[0].value
+
+    def __str__(self) -> str:
+        return self.source
+
+    # Shown as the original expression, so compiled nodes looks like the source ones on messages
+    def __repr__(self) -> str:
+        return repr(self.source)
+
+    # Evaluator closures can not be pickled, so they are rebuilt from the rpn (no tokenizing or parsing)
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return (_from_rpn, (self.source, self.rpn))
+
+
+def _from_rpn(source: str, rpn: typing.Tuple[Token, ...]) -> CompiledExpression:
+    return CompiledExpression(source, rpn, compile_rpn(rpn))
+
+
+# Expression (infix) of a RPN token list, fully parenthesized. Used to show folded expressions
+def format_rpn(rpn: typing.Iterable[Token]) -> str:
+    stack: typing.List[str] = []
+    for token in rpn:
+        if token.type == TokenType.STRING:
+            stack.append(json.dumps(token.value))
+        elif token.type == TokenType.NUMBER:
+            stack.append(repr(token.value))
+        elif token.type == TokenType.VARIABLE:
+            stack.append(token.value)
+        elif token.type == TokenType.NEG:
+            stack.append(f'-{stack.pop()}')
+        elif token.type == TokenType.NOT:
+            stack.append(f'not {stack.pop()}')
+        else:
+            right = stack.pop()
+            stack.append(f'({stack.pop()} {token.type.value[0]} {right})')
+    result = ' '.join(stack)
+    return result[1:-1] if len(stack) == 1 and result.startswith('(') and result.endswith(')') else result
+
+
+# Invalid content (to secure builtins, we check that no xxx.__identifier__ is used)
+INVALID_CONTENT_RE: typing.Final[re.Pattern] = re.compile(r'__\w+__')
+
+
+def check_content(expression: str) -> None:
+    match_invalid = INVALID_CONTENT_RE.search(expression)
+    if match_invalid is not None:
+        raise exceptions.YRunnerInvalidContent(f"Invalid content in {expression}: {match_invalid.group(0)}")
+
+
+# Compiled expressions, shared by all runners (compiled expressions are immutable)
+EXPRESSION_CACHE: typing.Final[cache.LRUCache[str, CompiledExpression]] = cache.LRUCache(maxsize=4096)
+
+
+def _compile_expression(expression: str) -> CompiledExpression:
+    check_content(expression)
+    try:
+        rpn = tuple(fold_rpn(rpn_expression(tokenize(expression))))
+        return CompiledExpression(expression, rpn, compile_rpn(rpn))
+    except Exception as e:
+        raise Exception(f"Invalid expression {expression}: {e}") from e
+
+
+# Checks, tokenizes and converts to RPN an expression, only once per distinct expression (while it is on cache)
+def compile_expression(expression: str) -> CompiledExpression:
+    return EXPRESSION_CACHE.get_or_create(expression, _compile_expression)
+
+
+def eval_expression(expression: str, variables: typing.Mapping[str, typing.Any]) -> typing.Any:
+    return compile_expression(expression).evaluate(variables)
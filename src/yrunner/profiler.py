@@ -0,0 +1,129 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Profiler by script lines: time of commands and expressions is aggregated by its yaml line, and
+# by stacks of nested commands (while, if, parallel...) in collapsed format, as used by flamegraph tools:
+#   profiler = Profiler()
+#   runner = YRunner(http.COMMANDS, instruments=[profiler])
+#   runner.run(script)
+#   print(profiler.report(script))
+#   profiler.write_collapsed('script.collapsed')  # flamegraph.pl script.collapsed > script.svg
+import typing
+import contextvars
+import threading
+
+from . import instrument, program, stats
+from .source import Source
+
+if typing.TYPE_CHECKING:
+    from .runner import YRunner
+
+
+class _Frame:
+    __slots__ = ('parent', 'path', 'source', 'nested', 'token')
+
+    parent: typing.Optional['_Frame']
+    path: str  # Collapsed stack, up to this frame
+    source: typing.Optional[Source]
+    nested: float
+    token: typing.Any
+
+    def __init__(
+        self, parent: typing.Optional['_Frame'], label: str, step_source: typing.Optional[Source]
+    ) -> None:
+        self.parent = parent
+        self.path = label if parent is None else parent.path + ';' + label
+        self.source = step_source
+        self.nested = 0.0
+
+    @property
+    def line(self) -> int:
+        return self.source.mark.line if self.source else 0
+
+
+_current: contextvars.ContextVar[typing.Optional[_Frame]] = contextvars.ContextVar('yrunner_profiler', default=None)
+
+
+def _label(text: str, line: int) -> str:
+    text = text.replace(';', ',').replace('\n', ' ')  # Separators of collapsed format
+    return f'{text} (line {line})' if line else text
+
+
+class Profiler(instrument.Instrument):
+    source_marks = True
+
+    lines: typing.Dict[int, stats.Timing]  # By script line (0 if unknown), commands and expressions on it
+    names: typing.Dict[int, typing.List[str]]  # Commands and expressions found on each line
+    stacks: typing.Dict[str, float]  # Self time by collapsed stack
+
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.lines = {}
+        self.names = {}
+        self.stacks = {}
+
+    def _add(self, line: int, name: str, path: str, elapsed: float, self_time: float) -> None:
+        with self._lock:
+            timing = self.lines.get(line)
+            if timing is None:
+                timing = self.lines[line] = stats.Timing()
+                self.names[line] = []
+            timing.add(elapsed, self_time)
+            if name not in self.names[line]:
+                self.names[line].append(name)
+            self.stacks[path] = self.stacks.get(path, 0.0) + self_time
+
+    def run_start(self, runner: 'YRunner') -> None:
+        self.reset()
+
+    def command_start(self, step: program.Step) -> None:
+        line = step.source.mark.line if step.source else 0
+        frame = _Frame(_current.get(), _label(step.command.name, line), step.source)
+        frame.token = _current.set(frame)
+
+    def command_end(self, step: program.Step, elapsed: float) -> None:
+        frame = _current.get()
+        if frame is None:
+            return
+        _current.reset(frame.token)
+        if frame.parent is not None:
+            frame.parent.nested += elapsed
+        self._add(frame.line, step.command.name, frame.path, elapsed, max(0.0, elapsed - frame.nested))
+
+    def expression(self, source: str, elapsed: float) -> None:
+        frame = _current.get()
+        if frame is None:  # Evaluated out of a command
+            self._add(0, source, _label(source, 0), elapsed, elapsed)
+            return
+        frame.nested += elapsed
+        # Position of the expression itself (i.e. the condition of a while), or else of the command
+        mark = frame.source.expressions.get(source) if frame.source else None
+        line = mark.line if mark else frame.line
+        self._add(line, source, frame.path + ';' + _label(source, line), elapsed, elapsed)
+
+    # Lines sorted by self time, with the text of the line if the script is provided
+    def report(self, script: typing.Optional[str] = None, top: int = 20) -> str:
+        text = script.splitlines() if script else []
+        lines = [f'{"line":>6} {"count":>9} {"total":>10} {"self":>10} {"max":>10}  source']
+        for line, timing in sorted(self.lines.items(), key=lambda item: item[1].self_time, reverse=True)[:top]:
+            content = text[line - 1].strip() if 0 < line <= len(text) else ', '.join(self.names[line])
+            lines.append(
+                f'{line or "?":>6} {timing.count:>9} {timing.total:>10.4f} {timing.self_time:>10.4f} '
+                f'{timing.max:>10.6f}  {content}'
+            )
+        return '\n'.join(lines)
+
+    # Collapsed stacks ("frame;frame;frame value"), value is self time in microseconds
+    def collapsed(self) -> typing.List[str]:
+        return [f'{path} {round(seconds * 1e6)}' for path, seconds in sorted(self.stacks.items()) if seconds > 0]
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in self.collapsed())
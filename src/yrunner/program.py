@@ -0,0 +1,93 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+import typing
+import json
+
+from . import parser, types
+from .source import Source
+
+if typing.TYPE_CHECKING:
+    from . import vm
+
+
+# A command with its executor already resolved, and its node with the parameters already compiled
+# (expressions, templates and nested blocks of commands)
+class Step(typing.NamedTuple):
+    command: types.Command
+    node: typing.Any
+    args: typing.Any  # What the executor receives, the node or its bound Arguments (see types.Command.bind)
+    source: typing.Optional[Source] = None  # Position on the script, if compiled keeping marks
+
+    def __str__(self) -> str:
+        return str(self.node)
+
+
+# Compiled script, can be executed as many times as needed (with different variables) by YRunner.run
+class Program:
+    steps: typing.Tuple[Step, ...]
+    code: typing.Optional['vm.Code']  # Lowered steps, if executed by the vm engine
+
+    def __init__(self, steps: typing.Iterable[Step]) -> None:
+        self.steps = tuple(steps)
+        self.code = None
+
+    def __iter__(self) -> typing.Iterator[Step]:
+        return iter(self.steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    # Yaml like listing of the compiled (and optimized) steps, for debugging. Expressions are shown as
+    # compiled (folded and parenthesized), with its source if different, and steps with its line if known
+    def dump(self) -> str:
+        lines: typing.List[str] = []
+        # Pending steps (with its indentation) or lines, LIFO, so nesting does not need recursion
+        pending: typing.List[typing.Union[typing.Tuple[int, Step], str]] = [(0, s) for s in reversed(self.steps)]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, str):
+                lines.append(item)
+                continue
+            indent, step = item
+            pad = ' ' * indent
+            name, params = next(iter(step.node.items())) if isinstance(step.node, dict) else (step.node, None)
+            line = f'{pad}- {name}:' if params else f'{pad}- {name}'
+            if step.source is not None:
+                line += f'  # line {step.source.mark.line}'
+            lines.append(line)
+            work: typing.List[typing.Union[typing.Tuple[int, Step], str]] = []
+            for key, value in params.items() if isinstance(params, dict) else ():
+                if _is_block(value):
+                    work.append(f'{pad}    {key}:')
+                    work.extend((indent + 8, s) for s in value)
+                elif isinstance(value, tuple) and value and all(_is_block(block) for block in value):
+                    work.append(f'{pad}    {key}:')
+                    for block in value:
+                        work.append(f'{pad}        -')
+                        work.extend((indent + 10, s) for s in block)
+                else:
+                    work.append(f'{pad}    {key}: {_format_value(value)}')
+            pending.extend(reversed(work))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    # Lowered code is not pickled, it is rebuilt on first execution by the vm
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return (Program, (self.steps,))
+
+
+def _is_block(value: typing.Any) -> bool:
+    return isinstance(value, tuple) and all(isinstance(step, Step) for step in value)
+
+
+def _format_value(value: typing.Any) -> str:
+    if isinstance(value, parser.CompiledExpression):
+        expression = parser.format_rpn(value.rpn)
+        return expression if expression == value.source else f'{expression}  # {value.source}'
+    # Compiled templates (named tuples) are shown as its source
+    if isinstance(value, tuple):
+        return json.dumps(str(value))
+    if isinstance(value, dict):
+        value = {k: str(v) if isinstance(v, tuple) else v for k, v in value.items()}
+    return json.dumps(value, default=str)
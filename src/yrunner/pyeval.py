@@ -0,0 +1,116 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Expressions evaluated with python eval (YRunner(use_python_eval=True)). Each distinct expression is
+# validated (on its syntax tree) and compiled to a code object only once, so evaluating it is just running
+# the code object with the safe builtins and the variables as locals
+import typing
+import ast
+
+from . import cache, exceptions, parser
+
+# secure builtins
+# Allow some builtins, those that are safe
+# This is used to evaluate expressions in "set"
+BUILTINS: typing.Final[typing.Dict[str, typing.Callable]] = {
+    'abs': abs,
+    'all': all,
+    'any': any,
+    'bool': bool,
+    'str': str,
+    'int': int,
+    'float': float,
+    'len': len,
+    'max': max,
+    'min': min,
+    'round': round,
+    'sum': sum,
+}
+
+# Globals of the evaluated expressions (expressions can not assign, so it is shared)
+GLOBALS: typing.Final[typing.Dict[str, typing.Any]] = {'__builtins__': BUILTINS}
+
+# Attributes that gives access to frames (and from them to globals and real builtins), or that
+# can access attributes by name from a string (as "{0.__class__}".format(x))
+UNSAFE_ATTRIBUTES: typing.Final[typing.FrozenSet[str]] = frozenset(
+    [
+        'format',
+        'format_map',
+        'mro',
+        'gi_frame',
+        'gi_code',
+        'gi_yieldfrom',
+        'cr_frame',
+        'cr_code',
+        'cr_await',
+        'ag_frame',
+        'ag_code',
+        'ag_await',
+        'f_back',
+        'f_builtins',
+        'f_globals',
+        'f_locals',
+        'f_code',
+        'tb_frame',
+        'tb_next',
+    ]
+)
+
+# Constructions not allowed on an expression (assignments, or only valid inside coroutines or generators)
+UNSAFE_NODES: typing.Final[typing.Tuple[typing.Type[ast.AST], ...]] = (ast.NamedExpr, ast.Await, ast.Yield, ast.YieldFrom)
+
+
+# Raises YRunnerInvalidContent if the expression uses names or attributes that could escape the safe builtins:
+# dunder names, private or unsafe attributes, strings with dunder names (as used by format) or assignments
+def validate(expression: str, tree: ast.AST) -> None:
+    for node in ast.walk(tree):
+        invalid: typing.Optional[str] = None
+        if isinstance(node, UNSAFE_NODES):
+            invalid = type(node).__name__
+        elif isinstance(node, ast.Name) and node.id.startswith('__'):
+            invalid = node.id
+        elif isinstance(node, ast.Attribute) and (node.attr.startswith('_') or node.attr in UNSAFE_ATTRIBUTES):
+            invalid = node.attr
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            match = parser.INVALID_CONTENT_RE.search(node.value)
+            invalid = match.group(0) if match else None
+        if invalid is not None:
+            raise exceptions.YRunnerInvalidContent(f"Invalid content in {expression}: {invalid}")
+
+
+# Expression validated and compiled, evaluated with the variables as locals
+class PythonExpression(typing.NamedTuple):
+    source: str
+    code: typing.Any  # Code object
+
+    def evaluate(self, variables: typing.Mapping[str, typing.Any]) -> typing.Any:
+        return eval(self.code, GLOBALS, variables)  # nosec: validated, and only safe builtins are available
+
+    def __str__(self) -> str:
+        return self.source
+
+    def __repr__(self) -> str:
+        return repr(self.source)
+
+    # Code objects can not be pickled, expressions are compiled again when unpickled
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return (compile_python, (self.source,))
+
+
+PYTHON_CACHE: typing.Final[cache.LRUCache[str, PythonExpression]] = cache.LRUCache(maxsize=4096)
+
+
+def _compile_python(expression: str) -> PythonExpression:
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise Exception(f"Invalid expression {expression}: {e}") from e
+    validate(expression, tree)
+    return PythonExpression(expression, compile(tree, '<expression>', 'eval'))
+
+
+# Validates and compiles an expression, only once per distinct expression (while it is on cache)
+def compile_python(expression: str) -> PythonExpression:
+    return PYTHON_CACHE.get_or_create(expression, _compile_python)
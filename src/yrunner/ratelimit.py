@@ -0,0 +1,164 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Rate limits by key (i.e. the host of the requests), shared by all the runners of the process:
+#  * token bucket: rate tokens per second, up to burst tokens. Each request takes a token, waiting for it if needed
+#  * concurrency: max operations at once
+#  * pause: no token is given until then (i.e. the host answered 429 with a Retry-After header)
+# Buckets can also be shared between processes, keeping its state on a file (locked while updated) of a
+# directory. A directory on a memory file system (as /dev/shm) keeps them on shared memory
+import typing
+import contextlib
+import os
+import re
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not posix, buckets can not be shared between processes
+    fcntl = None  # type: ignore[assignment]
+
+
+class Limits(typing.NamedTuple):
+    rate: float = 0.0  # Tokens per second (0, no rate limit)
+    burst: int = 1  # Tokens available at once
+    concurrency: int = 0  # Operations at once (0, no limit)
+
+
+# State of a bucket: available tokens (negative if already reserved), time of that count and paused until
+class _State(typing.NamedTuple):
+    tokens: float
+    updated: float
+    paused: float
+
+
+# Takes a token, returns the new state and the time to wait until the token is available
+def _reserve(state: _State, now: float, limits: Limits) -> typing.Tuple[_State, float]:
+    if limits.rate <= 0:
+        return state, state.paused - now
+    start = max(now, state.paused)  # No token is given before the end of the pause
+    tokens = min(float(limits.burst), state.tokens + max(0.0, start - state.updated) * limits.rate) - 1
+    updated = max(start, state.updated)
+    return _State(tokens, updated, state.paused), max(start - now, (start - now) - tokens / limits.rate)
+
+
+def _pause(state: _State, now: float, seconds: float) -> _State:
+    return state._replace(paused=max(state.paused, now + seconds))
+
+
+# Bucket of this process
+class Bucket:
+    limits: Limits
+    _state: _State
+    _lock: threading.Lock
+
+    def __init__(self, limits: Limits) -> None:
+        self.limits = limits
+        self._state = _State(float(limits.burst), time.monotonic(), 0.0)
+        self._lock = threading.Lock()
+
+    # Takes a token, returns the seconds to wait before using it
+    def reserve(self) -> float:
+        with self._lock:
+            self._state, wait = _reserve(self._state, time.monotonic(), self.limits)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._state = _pause(self._state, time.monotonic(), seconds)
+
+
+# Bucket shared between processes, its state is kept on a file (wall clock times, same on all processes)
+class FileBucket:
+    limits: Limits
+    path: str
+
+    STATE: typing.ClassVar[struct.Struct] = struct.Struct('<ddd')
+
+    def __init__(self, path: str, limits: Limits) -> None:
+        if fcntl is None:
+            raise Exception('Rate limits can not be shared between processes on this platform')
+        self.path = path
+        self.limits = limits
+
+    def _update(self, update: typing.Callable[[_State, float], typing.Tuple[_State, float]]) -> float:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)  # Released on close
+            now = time.time()
+            data = os.pread(fd, self.STATE.size, 0)
+            if len(data) == self.STATE.size:
+                state = _State(*self.STATE.unpack(data))
+            else:  # New file
+                state = _State(float(self.limits.burst), now, 0.0)
+            state, result = update(state, now)
+            os.pwrite(fd, self.STATE.pack(*state), 0)
+            return result
+        finally:
+            os.close(fd)
+
+    def reserve(self) -> float:
+        return self._update(lambda state, now: _reserve(state, now, self.limits))
+
+    def pause(self, seconds: float) -> None:
+        self._update(lambda state, now: (_pause(state, now, seconds), 0.0))
+
+
+# Limits of a key: its bucket and its concurrency
+class Limiter:
+    bucket: typing.Union[Bucket, FileBucket]
+    _semaphore: typing.Optional[threading.BoundedSemaphore]
+
+    def __init__(self, bucket: typing.Union[Bucket, FileBucket]) -> None:
+        self.bucket = bucket
+        concurrency = bucket.limits.concurrency
+        self._semaphore = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+
+    # Waits for a free slot and a token
+    @contextlib.contextmanager
+    def slot(self) -> typing.Iterator[None]:
+        if self._semaphore is not None:
+            self._semaphore.acquire()
+        try:
+            wait = self.bucket.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    # No token is given (to any runner, or process if shared) for seconds
+    def pause(self, seconds: float) -> None:
+        self.bucket.pause(seconds)
+
+
+_LIMITERS: typing.Final[typing.Dict[typing.Tuple[str, Limits, typing.Optional[str]], Limiter]] = {}
+_LIMITERS_LOCK: typing.Final[threading.Lock] = threading.Lock()
+
+
+def _file_name(key: str) -> str:
+    return re.sub(r'[^A-Za-z0-9.-]', '_', key) + '.bucket'
+
+
+# Limiter of a key, the same one for all callers with the same limits (and directory, if shared between processes)
+def limiter(key: str, limits: Limits, directory: typing.Optional[str] = None) -> Limiter:
+    index = (key, limits, directory)
+    result = _LIMITERS.get(index)
+    if result is None:
+        with _LIMITERS_LOCK:
+            result = _LIMITERS.get(index)
+            if result is None:
+                if directory is not None:
+                    os.makedirs(directory, exist_ok=True)
+                    bucket: typing.Union[Bucket, FileBucket] = FileBucket(
+                        os.path.join(directory, _file_name(key)), limits
+                    )
+                else:
+                    bucket = Bucket(limits)
+                result = _LIMITERS[index] = Limiter(bucket)
+    return result
@@ -1,66 +1,357 @@
 import typing
+import copy
 import re
 import logging
-import yaml
+import threading
+import time
 
-from . import parser, types, exceptions
+from . import cache, executors, instrument, optimizer, parser, pyeval, source, types, exceptions, program, vm
+from .source import load_yaml
 from .executors import internal
 
+if typing.TYPE_CHECKING:
+    from . import diskcache, stats as run_stats
+
 logger = logging.getLogger(__name__)
 
 
-# secure builtins
-# Allow some builtins, those that are safe
-# This is used to evaluate expressions in "set"
-BUILTINS: typing.Final[typing.Dict[str, typing.Callable]] = {
-    'abs': abs,
-    'all': all,
-    'any': any,
-    'bool': bool,
-    'str': str,
-    'int': int,
-    'float': float,
-    'len': len,
-    'max': max,
-    'min': min,
-    'round': round,
-    'sum': sum,
-}
+# Loader of the scripts (re-exported from source.py), yaml is imported on first access
+def __getattr__(name: str) -> typing.Any:
+    if name == 'SafeLoader':
+        return source.loaders()[0]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+# Safe builtins of python eval (see pyeval.py)
+BUILTINS: typing.Final[typing.Dict[str, typing.Callable]] = pyeval.BUILTINS
 # regex to find variables in a string
 INTERPOLATE_REGEX: typing.Final[re.Pattern] = re.compile(r'{{\s*(.*?)\s*}}')
 
 # Invalid content re (to secure builtins, we check that no xxx.__identifier__ is used)
-INVALID_CONTENT_RE: typing.Final[re.Pattern] = re.compile(r'__\w+__')
+INVALID_CONTENT_RE: typing.Final[re.Pattern] = parser.INVALID_CONTENT_RE
+
+# Document markers, "---" (start of a document, may be followed by content) and "..." (end of document)
+DOCUMENT_MARKER_RE: typing.Final[re.Pattern] = re.compile(r'(---|\.\.\.)(?:[ \t]|$)')
+
+
+# Splits a yaml stream (any iterable of lines, as a file or stdin) on its documents, yielding each one
+# as soon as its end is read (so a document can be executed before the next one is written to a pipe)
+def split_documents(lines: typing.Iterable[str]) -> typing.Iterator[str]:
+    return (document for _, document in _documents(lines))
+
+
+# Documents of the stream, with the (0 based) line where each one starts
+def _documents(lines: typing.Iterable[str]) -> typing.Iterator[typing.Tuple[int, str]]:
+    document: typing.List[str] = []
+    start = 0
+    has_content = False  # Directives, comments and blank lines before "---" belongs to the next document
+    for number, line in enumerate(lines):
+        match = DOCUMENT_MARKER_RE.match(line)
+        if match is None:
+            document.append(line)
+            has_content = has_content or line.strip()[:1] not in ('', '#', '%')
+            continue
+        if match.group(1) == '---':
+            # Content after "---" belongs to the new document, so keep the marker for the loader
+            if has_content:
+                yield start, ''.join(document)
+                document, start = [], number
+            document.append(line)
+            has_content = True
+        else:
+            if has_content:
+                yield start, ''.join(document)
+            document, start, has_content = [], number + 1, False
+    if has_content:
+        yield start, ''.join(document)
+
+
+# String with {{ expression }} placeholders, split on literals and expressions
+# Parts are literal strings or indexes on expressions (so repeated placeholders are evaluated only once)
+class CompiledTemplate(typing.NamedTuple):
+    source: str
+    parts: typing.Tuple[typing.Union[str, int], ...]
+    expressions: typing.Tuple[typing.Any, ...]  # As returned by YRunner.compile_expr
+
+    def render(self, evaluate: typing.Callable[[typing.Any], typing.Any]) -> str:
+        if not self.expressions:
+            return self.source
+        values = [str(evaluate(expression)) for expression in self.expressions]
+        return ''.join([part if part.__class__ is str else values[part] for part in self.parts])  # type: ignore
+
+    def __str__(self) -> str:
+        return self.source
+
+    def __repr__(self) -> str:
+        return repr(self.source)
+
+
+# Compiled templates, keyed by (use_python_eval, template), because expressions are compiled for the eval mode
+TEMPLATE_CACHE: typing.Final[cache.LRUCache[typing.Tuple[bool, str], CompiledTemplate]] = cache.LRUCache(
+    maxsize=1024
+)
 
 
 class YRunner:
     commands: typing.Dict[str, types.Command]
+    # Commands registered by executor module name (see executors), module by command name. Commands are added
+    # to self.commands when the module is imported, on first use
+    lazy_commands: typing.Dict[str, str]
+    commands_attribute: typing.ClassVar[str] = 'COMMANDS'  # Commands of the executor modules registered by name
     variables: typing.MutableMapping[str, typing.Any]
     error: typing.Optional[Exception] = None
     use_python_eval: bool = False  # Use python eval instead of simpler own safe eval
+    use_vm: bool = False  # Execute programs with the flat instructions engine (see vm.py)
+    optimize: bool = True  # Constant parameters and dead branches optimization when compiling (see optimizer.py)
+    settings: typing.Mapping[str, typing.Any]  # Executors settings, keyed by executor module (i.e. 'http')
+    disk_cache: typing.Optional['diskcache.DiskCache']  # Persistent cache of compiled scripts
+    instruments: typing.Tuple[instrument.Instrument, ...]  # Hooks called during runs (see instrument.py)
+    stats: typing.Optional['run_stats.RunStats']  # Statistics of last run, if enabled
+    source_marks: bool  # Keep the yaml positions of commands and expressions when compiling (see source.py)
+    resources: typing.Dict[str, typing.Any]  # Resources created by executors, closed at end of run
+    assigned: typing.Optional[typing.Set[str]] = None  # Names stored with set_variable, if tracked (see fork)
+
+    _resources_lock: threading.Lock
 
     def __init__(
         self,
-        *extra_commands: typing.Union[typing.List[types.Command], types.Command],
+        *extra_commands: typing.Union[typing.List[types.Command], types.Command, str],  # str: executor module
         variables: typing.Optional[typing.MutableMapping[str, typing.Any]] = None,
         use_python_eval: bool = False,
+        use_vm: bool = False,
+        optimize: bool = True,
+        settings: typing.Optional[typing.Mapping[str, typing.Any]] = None,
+        disk_cache: typing.Optional['diskcache.DiskCache'] = None,
+        instruments: typing.Iterable[instrument.Instrument] = (),
+        stats: bool = False,  # Collect runtime statistics, available on self.stats after each run
     ) -> None:
         # copy COMMANDS to self.commands
         self.commands = {command.name: command for command in internal.COMMANDS}
+        self.lazy_commands = {}
         for command in extra_commands:  # Can override existing commands
-            if isinstance(command, list):
+            if isinstance(command, str):
+                self._register_module(command)
+            elif isinstance(command, list):
                 for cmd in command:
-                    self.commands[cmd.name] = cmd
+                    self._register(cmd)
             else:
-                self.commands[command.name] = command
+                self._register(command)
 
         if variables is None:
             variables = {}
 
         self.variables = variables  # reference to the variables
         self.use_python_eval = use_python_eval
+        self.use_vm = use_vm
+        self.settings = settings or {}
+        self.disk_cache = disk_cache
+        self.stats = None
+        if stats:
+            from . import stats as run_stats  # Not needed (nor imported) unless enabled
 
-    def _exec_command(self, node: typing.Mapping[str, typing.Any]) -> None:
+            self.stats = run_stats.RunStats()
+        self.instruments = tuple(instruments) + ((self.stats,) if self.stats else ())
+        self.source_marks = any(i.source_marks for i in self.instruments)
+        # Instrumented runs reports every command and expression of the script, so they are not optimized
+        self.optimize = optimize and not self.instruments
+        self.resources = {}
+        self._resources_lock = threading.Lock()
+
+    def _register(self, command: types.Command) -> None:
+        self.commands[command.name] = command
+        self.lazy_commands.pop(command.name, None)
+
+    def _register_module(self, name: str) -> None:
+        command_names = executors.MODULES.get(name)
+        if command_names is None:  # Commands are not known until imported
+            for command in executors.load(name, self.commands_attribute):
+                self._register(command)
+            return
+        for command_name in command_names:
+            self.commands.pop(command_name, None)
+            self.lazy_commands[command_name] = name
+
+    # Imports the executor module of a command registered by module name (None if not registered)
+    def _load_command(self, name: str) -> typing.Optional[types.Command]:
+        module = self.lazy_commands.get(name)
+        if module is None:
+            return None
+        for command in executors.load(module, self.commands_attribute):
+            if self.lazy_commands.get(command.name) == module:  # Not overridden
+                self.commands[command.name] = command
+        return self.commands.get(name)
+
+    # Returns the resource with this name, creating it with factory if not already created on this run
+    # (i.e. a pooled http session). Resources with a "close" method are closed at the end of the run
+    def get_resource(self, name: str, factory: typing.Callable[[], typing.Any]) -> typing.Any:
+        resource = self.resources.get(name)
+        if resource is None:
+            with self._resources_lock:
+                resource = self.resources.get(name)
+                if resource is None:
+                    resource = self.resources[name] = factory()
+        return resource
+
+    # New runner, sharing commands, settings and resources with this one, but with its own variables
+    # Used to execute blocks of commands concurrently (i.e. parallel command)
+    # With track_assigned, the names stored by the child (set_variable) are kept on child.assigned
+    def fork(
+        self, variables: typing.Optional[typing.MutableMapping[str, typing.Any]] = None, track_assigned: bool = False
+    ) -> 'YRunner':
+        child = copy.copy(self)
+        child.variables = variables if variables is not None else {}
+        child.error = None
+        child.assigned = set() if track_assigned else None
+        return child
+
+    def close_resources(self) -> None:
+        with self._resources_lock:
+            resources, self.resources = self.resources, {}
+        for name, resource in resources.items():
+            try:
+                if hasattr(resource, 'close'):
+                    resource.close()
+            except Exception as e:
+                logger.warning(f"Error closing resource {name}: {e}")
+
+    # Resolves the command of a node, and compiles its parameters
+    # This is a generator: nested blocks of commands are yielded, and the compiled block is sent back
+    # (see _compile_block), so deeply nested scripts does not need recursion to be compiled
+    def _compile_step(
+        self, node: typing.Any, mark: typing.Optional[source.Mark] = None
+    ) -> typing.Generator[typing.Any, typing.Tuple[program.Step, ...], program.Step]:
+        if isinstance(node, str):  # Simple command
+            command_name, params = node, None
+        elif isinstance(node, dict) and len(node) == 1:
+            command_name, params = next(iter(node.items()))
+        else:
+            raise exceptions.YRunnerInvalidCommand(f"Invalid command: {node}")
+
+        cmd = self.commands.get(command_name) or self._load_command(command_name)
+        if cmd is None:
+            raise exceptions.YRunnerInvalidCommand(f"Invalid command: {node}")
+        try:
+            params = types.check_parameters(cmd, params)
+        except exceptions.YRunnerInvalidParameter as e:
+            if mark is None:
+                raise
+            raise exceptions.YRunnerInvalidParameter(f'{e} (line {mark.line})') from None
+
+        expression_marks: typing.Dict[str, source.Mark] = {}
+        if isinstance(params, dict) and cmd.parameters:
+            kinds = {parameter.name: parameter.kind for parameter in cmd.parameters}
+            compiled: typing.Dict[str, typing.Any] = {}
+            for name, value in params.items():
+                kind = kinds.get(name, types.ParameterKind.VALUE)
+                if kind == types.ParameterKind.COMMANDS:
+                    compiled[name] = yield value
+                elif kind == types.ParameterKind.BLOCKS:
+                    blocks: typing.List[typing.Tuple[program.Step, ...]] = []
+                    for block in value if isinstance(value, list) else [value]:
+                        blocks.append((yield block))
+                    compiled[name] = tuple(blocks)
+                else:
+                    compiled[name] = self._compile_parameter(kind, value)
+                    if mark is not None:
+                        self._expression_marks(compiled[name], params, name, expression_marks)
+            node = {command_name: compiled}
+            params = compiled
+
+        args = types.bind(cmd, params) if cmd.bind else node
+        return program.Step(cmd, node, args, source.Source(mark, expression_marks) if mark is not None else None)
+
+    # Positions of the expressions of a compiled parameter (value of key on the loaded params)
+    def _expression_marks(
+        self, value: typing.Any, params: typing.Any, key: typing.Any, marks: typing.Dict[str, source.Mark]
+    ) -> None:
+        mark = getattr(params, 'marks', {}).get(key)
+        if mark is None:
+            return
+        if isinstance(value, (str, parser.CompiledExpression, pyeval.PythonExpression)):
+            marks.setdefault(str(value), mark)
+        elif isinstance(value, CompiledTemplate):
+            for expression in value.expressions:
+                marks.setdefault(str(expression), mark)
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                self._expression_marks(v, params[key], k, marks)
+
+    def _compile_parameter(self, kind: types.ParameterKind, value: typing.Any) -> typing.Any:
+        if kind == types.ParameterKind.EXPRESSION:
+            if isinstance(value, str):
+                compiled = self.compile_expr(value)
+                return optimizer.expression(compiled) if self.optimize else compiled
+        elif kind == types.ParameterKind.VARIABLE:
+            if isinstance(value, str):
+                return parser.symbol(value)
+            if isinstance(value, list):
+                return [parser.symbol(v) if isinstance(v, str) else v for v in value]
+        elif kind == types.ParameterKind.TEMPLATE:
+            if isinstance(value, str):
+                return self.compile_template(value)
+            if isinstance(value, dict):
+                return {k: self.compile_template(v) if isinstance(v, str) else v for k, v in value.items()}
+        return value
+
+    def _compile_block(self, nodes: typing.Any) -> typing.Tuple[program.Step, ...]:
+        def as_list(nodes: typing.Any) -> typing.List[typing.Any]:
+            if nodes is None:
+                return []
+            return nodes if isinstance(nodes, list) else [nodes]
+
+        root: typing.List[program.Step] = []
+        def pending(nodes: typing.Any) -> typing.Iterator[typing.Tuple[typing.Any, typing.Optional[source.Mark]]]:
+            nodes = as_list(nodes)
+            return zip(nodes, source.item_marks(nodes))
+
+        # Blocks being compiled: pending nodes, steps already compiled and the step waiting for the block
+        stack: typing.List[typing.Tuple[typing.Iterator[typing.Any], typing.List[program.Step], typing.Any]] = [
+            (pending(nodes), root, None)
+        ]
+
+        def advance(step: typing.Any, block: typing.Optional[typing.Tuple[program.Step, ...]]) -> None:
+            try:
+                nested = step.send(block)
+            except StopIteration as e:  # Step compiled, belongs to the block on top of the stack
+                if self.optimize:
+                    stack[-1][1].extend(optimizer.optimize_step(e.value))
+                else:
+                    stack[-1][1].append(e.value)
+            else:
+                stack.append((pending(nested), [], step))
+
+        while stack:
+            nodes, steps, waiting = stack[-1]
+            item = next(nodes, stack)  # stack is used as sentinel
+            if item is not stack:
+                advance(self._compile_step(*item), None)
+            else:
+                stack.pop()
+                if waiting is not None:
+                    advance(waiting, tuple(steps))
+
+        return tuple(root)
+
+    # Parses the YAML script, resolving commands and compiling expressions only once
+    # The resulting program can be executed as many times as needed with run
+    # Already parsed scripts (list of commands, as generated or loaded from YAML) are also accepted
+    # line_offset: lines before the script (i.e. on a stream), added to the source marks
+    def compile(self, script: typing.Union[str, typing.List[typing.Any]], line_offset: int = 0) -> program.Program:
+        if isinstance(script, str):
+            if self.disk_cache is not None:
+                key = self.disk_cache.key(script, self, line_offset)
+                compiled = self.disk_cache.load(key)
+                if compiled is None:
+                    compiled = program.Program(
+                        self._compile_block(load_yaml(script, self.source_marks, line_offset))
+                    )
+                    self.disk_cache.store(key, compiled)
+                return compiled
+            script = load_yaml(script, self.source_marks, line_offset)
+        return program.Program(self._compile_block(script))
+
+    # Command of a (not compiled) node
+    def _get_command(self, node: typing.Mapping[str, typing.Any]) -> types.Command:
         # Node must have only one key
         if isinstance(node, str):  # Simple command
             command_name = node
@@ -69,88 +360,208 @@ class YRunner:
                 raise Exception(f"Invalid command: {node}")
 
             # Get command name
-            command_name = list(node.keys())[0]
+            command_name = next(iter(node))
 
-        # Execute command
-        cmd = self.commands.get(command_name)
+        cmd = self.commands.get(command_name) or self._load_command(command_name)
         if cmd is None:
             raise exceptions.YRunnerInvalidCommand(f"Invalid command: {node}")
-        cmd.executor(node, self)
+        return cmd
 
-    def execute(self, commands: typing.List[typing.Mapping[str, typing.Any]]) -> None:
+    # Step of a node executed without compiling it, its parameters are checked (and bound) on each execution
+    def _step(self, node: typing.Any) -> program.Step:
+        cmd = self._get_command(node)
+        params = types.check_parameters(cmd, None if isinstance(node, str) else node[cmd.name])
+        return program.Step(cmd, node, types.bind(cmd, params) if cmd.bind else node)
+
+    def _exec_command(self, node: typing.Mapping[str, typing.Any]) -> None:
+        step = self._step(node)
+        step.command.executor(step.args, self)
+
+    def execute(self, commands: typing.Iterable[typing.Any]) -> None:
         # if commands is not an iterable, make it one
         if not isinstance(commands, typing.Iterable):
             commands = [commands]
+        if self.instruments:
+            return self._execute_instrumented(commands)
 
         for command in commands:
             try:
-                self._exec_command(command)
+                if isinstance(command, program.Step):
+                    command.command.executor(command.args, self)
+                else:
+                    self._exec_command(command)
             except exceptions.YRunnerException:
                 raise
             except Exception as e:
                 # Attach command to exception
                 raise Exception(f"Error executing command: {command}") from e
 
-    # Interprets and executes the YAML file, return exit code
-    def run(self, script: str) -> int:
-        # Parse YAML
-        yml = yaml.safe_load(script)
+    def _execute_instrumented(self, commands: typing.Iterable[typing.Any]) -> None:
+        instruments = self.instruments
+        for command in commands:
+            start = time.perf_counter()
+            step = command
+            try:
+                if not isinstance(step, program.Step):
+                    step = self._step(command)
+                for i in instruments:
+                    i.command_start(step)
+                try:
+                    step.command.executor(step.args, self)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    for i in reversed(instruments):
+                        i.command_end(step, elapsed)
+            except exceptions.YRunnerException:
+                raise
+            except Exception as e:
+                raise Exception(f"Error executing command: {command}") from e
 
+    # Interprets and executes the YAML file (or an already compiled one), return exit code
+    # If variables are provided, they replace the runner variables for this (and following) runs
+    def run(
+        self,
+        script: typing.Union[str, program.Program],
+        variables: typing.Optional[typing.MutableMapping[str, typing.Any]] = None,
+    ) -> int:
         self.error = None
+        if variables is not None:
+            self.variables = variables
 
         # Execute
+        self._run_start()
+        try:
+            if not isinstance(script, program.Program):
+                script = self.compile(script)
+            self._execute_program(script)
+        except Exception as e:
+            return self._exit_code(e)
+        finally:
+            self.close_resources()
+            self._run_end()
+
+        return 0
+
+    # Executes a multi document ("---" separated) stream, compiling and executing each document as it is read
+    # Variables (and resources, as the http session) are shared by all documents.
+    # Execution stops on the first document that fails (or exits)
+    def run_stream(
+        self,
+        stream: typing.Union[str, typing.Iterable[str]],
+        variables: typing.Optional[typing.MutableMapping[str, typing.Any]] = None,
+    ) -> int:
+        if isinstance(stream, str):
+            stream = stream.splitlines(keepends=True)
+        self.error = None
+        if variables is not None:
+            self.variables = variables
+
+        self._run_start()
         try:
-            self.execute(yml)
-        except exceptions.Exit as e:
+            for start, document in _documents(stream):
+                self._execute_program(self.compile(document, line_offset=start))  # Marks relative to the stream
+        except Exception as e:
+            return self._exit_code(e)
+        finally:
+            self.close_resources()
+            self._run_end()
+
+        return 0
+
+    def _run_start(self) -> None:
+        for i in self.instruments:
+            i.run_start(self)
+
+    def _run_end(self) -> None:
+        for i in reversed(self.instruments):
+            i.run_end(self)
+
+    def _execute_program(self, compiled: program.Program) -> None:
+        if self.use_vm and not self.instruments:  # Instrumented runs uses the tree engine
+            vm.execute(vm.get_code(compiled), self)
+        else:
+            self.execute(compiled.steps)
+
+    # Exit code of a run finished with an exception
+    def _exit_code(self, e: Exception) -> int:
+        if isinstance(e, exceptions.Exit):
             logger.info(f"Exit with code {e.code}")
             return e.code
-        except exceptions.LoopBreak:
+        if isinstance(e, exceptions.LoopBreak):
             logger.error("Break outside of while loop")
-            return -1
-        except exceptions.LoopContinue:
+        elif isinstance(e, exceptions.LoopContinue):
             logger.error("Continue outside of while loop")
-            return -1
-        except Exception as e:
+        else:
             self.error = e
             logger.error(f"Error: {e}")
-            return -1
+        return -1
 
-        return 0
+    def _compile_template(self, key: typing.Tuple[bool, str]) -> CompiledTemplate:
+        string = key[1]
+        parts: typing.List[typing.Union[str, int]] = []
+        sources: typing.List[str] = []
+        position = 0
+        for match in INTERPOLATE_REGEX.finditer(string):
+            if match.start() > position:
+                parts.append(string[position : match.start()])
+            if match.group(1) not in sources:
+                sources.append(match.group(1))
+            parts.append(sources.index(match.group(1)))
+            position = match.end()
+        if position < len(string):
+            parts.append(string[position:])
+        return CompiledTemplate(string, tuple(parts), tuple(self.compile_expr(source) for source in sources))
+
+    # Compiles a template for later evaluation with eval_string
+    def compile_template(self, string: str) -> CompiledTemplate:
+        return TEMPLATE_CACHE.get_or_create((self.use_python_eval, string), self._compile_template)
 
     # Substitutes (evaluates) variables in a string
     # Variables to be substituted are in the form {{ expression }} (or expressions {{ var + 1 }})
-    def eval_string(self, string: str) -> str:
-        for match in INTERPOLATE_REGEX.finditer(string):
-            value = self.eval_expr(match.group(1))  # evaluate the expressio
-            string = string.replace(match.group(0), str(value))
-        return string
+    def eval_string(self, string: typing.Union[str, CompiledTemplate]) -> str:
+        if not isinstance(string, CompiledTemplate):
+            string = self.compile_template(string)
+        return string.render(self.eval_expr)
+
+    # Compiles an expression for later evaluation with eval_expr. Expressions are checked when compiled
+    # (once per distinct expression), with python eval they are also validated on its syntax tree
+    def compile_expr(self, expr: str) -> typing.Union[parser.CompiledExpression, pyeval.PythonExpression]:
+        if self.use_python_eval:
+            return pyeval.compile_python(expr)
+        return parser.compile_expression(expr)
 
     def eval_expr(
         self,
-        expr: str,
+        expr: typing.Any,
         *,
         force_quotes: bool = False,  # Force quotes on strings
     ) -> typing.Any:
-        # if matchs invalid strings, raise exception indicating that and the string found
+        if self.instruments:
+            return self._timed_eval_expr(expr, force_quotes)
+        cls = expr.__class__
+        if cls is parser.CompiledExpression or cls is pyeval.PythonExpression:  # Already compiled
+            return expr.evaluate(self.variables)
+        return self._eval_expr(expr, force_quotes)
+
+    def _timed_eval_expr(self, expr: typing.Any, force_quotes: bool) -> typing.Any:
+        if not isinstance(expr, (str, parser.CompiledExpression, pyeval.PythonExpression)):  # Constant
+            return expr
+        start = time.perf_counter()
+        try:
+            return self._eval_expr(expr, force_quotes)
+        finally:
+            elapsed = time.perf_counter() - start
+            for i in self.instruments:
+                i.expression(str(expr), elapsed)
+
+    def _eval_expr(self, expr: typing.Any, force_quotes: bool) -> typing.Any:
         if isinstance(expr, str):
-            # Look for invalid strings, that is, we don't want to allow xxx.__identifier__
-            # This is to secure the eval we cannot access to the system
-            match_invalid = INVALID_CONTENT_RE.search(expr)
-            if match_invalid is not None:
-                # Get the invalid string
-                invalid_string = match_invalid.group(0)
-                raise exceptions.YRunnerInvalidContent(f"Invalid content in {expr}: {invalid_string}")
-            if force_quotes:
-                expr = '"' + expr + '"'
-            if self.use_python_eval:
-                ret = eval(
-                    expr, {"__builtins__": BUILTINS}, self.variables
-                )  # nosec: Secure eval, only allow safe builtins (arithmetics, and a few more)
-            else:
-                ret = parser.eval_expression(expr, self.variables)
-        else:
-            ret = expr
-        return ret
+            expr = self.compile_expr('"' + expr + '"' if force_quotes else expr)
+        if isinstance(expr, (parser.CompiledExpression, pyeval.PythonExpression)):
+            return expr.evaluate(self.variables)
+        return expr
 
     def set_variable(self, name: str, value: typing.Any) -> None:
         self.variables[name] = value
+        if self.assigned is not None:
+            self.assigned.add(name)
@@ -0,0 +1,105 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Source positions of the yaml script, kept (if requested) when loading it, so compiled commands
+# and expressions can be related to the lines of the script (i.e. by the profiler)
+# yaml is imported when the first script is loaded, it takes longer to import than the rest of the package
+import typing
+import functools
+
+if typing.TYPE_CHECKING:
+    import yaml
+
+
+class Mark(typing.NamedTuple):
+    line: int  # 1 based
+    column: int  # 1 based
+
+    def __str__(self) -> str:
+        return f'{self.line}:{self.column}'
+
+
+# Source of a compiled command: its position, and the position of each of its expressions (by source)
+class Source(typing.NamedTuple):
+    mark: Mark
+    expressions: typing.Mapping[str, Mark]
+
+
+# Loaded mappings and sequences, with the position of the node and of each of its values
+class SourceMap(dict):
+    mark: typing.Optional[Mark] = None
+    marks: typing.Dict[typing.Any, Mark]  # By key
+
+
+class SourceList(list):
+    mark: typing.Optional[Mark] = None
+    marks: typing.List[Mark]  # By index
+
+
+def _mark(node: 'yaml.Node', line_offset: int = 0) -> Mark:
+    return Mark(node.start_mark.line + 1 + line_offset, node.start_mark.column + 1)
+
+
+# Yaml loaders, created on first use: the safe loader (libyaml based if available, PyYAML built with libyaml,
+# much faster than the pure python one) and the safe loader keeping the marks
+@functools.lru_cache(maxsize=None)
+def loaders() -> typing.Tuple[typing.Type['yaml.SafeLoader'], typing.Type['yaml.SafeLoader']]:
+    import yaml
+
+    safe_loader: typing.Type[yaml.SafeLoader] = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+    class SourceLoader(safe_loader):  # type: ignore[valid-type,misc]
+        line_offset: int = 0  # Lines before the script (i.e. a document of a stream), added to the marks
+
+        def construct_source_map(self, node: yaml.MappingNode) -> typing.Iterator[SourceMap]:
+            data = SourceMap()
+            yield data
+            data.update(self.construct_mapping(node))
+            data.mark = _mark(node, self.line_offset)
+            # Keys are already constructed (and hashable), so this just gets them from the constructed objects
+            data.marks = {
+                self.construct_object(key_node): _mark(value_node, self.line_offset)
+                for key_node, value_node in node.value
+            }
+
+        def construct_source_list(self, node: yaml.SequenceNode) -> typing.Iterator[SourceList]:
+            data = SourceList()
+            yield data
+            data.extend(self.construct_sequence(node))
+            data.mark = _mark(node, self.line_offset)
+            data.marks = [_mark(item, self.line_offset) for item in node.value]
+
+    SourceLoader.add_constructor('tag:yaml.org,2002:map', SourceLoader.construct_source_map)
+    SourceLoader.add_constructor('tag:yaml.org,2002:seq', SourceLoader.construct_source_list)
+    return safe_loader, SourceLoader
+
+
+# SafeLoader and SourceLoader are still available as module attributes (importing yaml on access)
+def __getattr__(name: str) -> typing.Any:
+    if name in ('SafeLoader', 'SourceLoader'):
+        return loaders()[name == 'SourceLoader']
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+# With marks, line_offset is added to the lines of the marks, so they are relative to a larger stream
+def load_yaml(script: typing.Union[str, typing.IO[str]], marks: bool = False, line_offset: int = 0) -> typing.Any:
+    import yaml
+
+    if not (marks and line_offset):
+        return yaml.load(script, Loader=loaders()[marks])  # nosec: safe loaders
+    loader: typing.Any = loaders()[1](script)  # SourceLoader
+    loader.line_offset = line_offset
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+# Marks of the items of a loaded sequence (None if loaded without marks)
+def item_marks(nodes: typing.Any) -> typing.Iterable[typing.Optional[Mark]]:
+    marks = getattr(nodes, 'marks', None)
+    if isinstance(marks, list):
+        return marks
+    return [None] * len(nodes)
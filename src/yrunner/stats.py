@@ -0,0 +1,178 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Runtime statistics of a run, enabled with YRunner(stats=True) and available on runner.stats after run()
+import typing
+import contextvars
+import threading
+import time
+import urllib.parse
+
+from . import cache, httpcache, instrument, parser, program, pyeval
+
+if typing.TYPE_CHECKING:
+    from .runner import YRunner
+
+
+# Calls and wall time of a command, expression or host
+class Timing:
+    __slots__ = ('count', 'total', 'self_time', 'max')
+
+    count: int
+    total: float  # Including nested commands
+    self_time: float  # Excluding nested commands (equal to total for expressions and requests)
+    max: float
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = self.self_time = self.max = 0.0
+
+    def add(self, elapsed: float, self_time: typing.Optional[float] = None) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.self_time += elapsed if self_time is None else self_time
+        if elapsed > self.max:
+            self.max = elapsed
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {'count': self.count, 'total': self.total, 'self': self.self_time, 'max': self.max}
+
+    def __repr__(self) -> str:
+        return f'Timing(count={self.count}, total={self.total:.6f}, self={self.self_time:.6f}, max={self.max:.6f})'
+
+
+# Command being executed on current thread/task, to compute the time spent on nested commands
+class _Frame:
+    __slots__ = ('parent', 'nested', 'token')
+
+    parent: typing.Optional['_Frame']
+    nested: float
+    token: typing.Any
+
+    def __init__(self, parent: typing.Optional['_Frame']) -> None:
+        self.parent = parent
+        self.nested = 0.0
+
+
+_current: contextvars.ContextVar[typing.Optional[_Frame]] = contextvars.ContextVar('yrunner_stats', default=None)
+
+
+def _cache_delta(end: cache.CacheInfo, start: cache.CacheInfo) -> cache.CacheInfo:
+    return end._replace(
+        hits=end.hits - start.hits, misses=end.misses - start.misses, evictions=end.evictions - start.evictions
+    )
+
+
+class RunStats(instrument.Instrument):
+    commands: typing.Dict[str, Timing]  # By command name
+    expressions: typing.Dict[str, Timing]  # By expression source
+    hosts: typing.Dict[str, Timing]  # HTTP requests, by host
+    elapsed: float  # Wall time of the run
+    # Activity of the (process wide) compiled expressions, templates and HTTP responses caches during the run
+    expression_cache: cache.CacheInfo
+    template_cache: cache.CacheInfo
+    response_cache: cache.CacheInfo  # size and maxsize in bytes
+
+    _lock: threading.Lock
+    _start: float
+    _caches_start: typing.Tuple[cache.CacheInfo, cache.CacheInfo, cache.CacheInfo]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.commands = {}
+        self.expressions = {}
+        self.hosts = {}
+        self.elapsed = 0.0
+        self.expression_cache = self.template_cache = self.response_cache = cache.CacheInfo(0, 0, 0, 0, 0)
+
+    # Expressions cache is the one of the eval mode of the runner
+    def _caches(self, runner: 'YRunner') -> typing.Tuple[cache.CacheInfo, cache.CacheInfo, cache.CacheInfo]:
+        from .runner import TEMPLATE_CACHE  # Avoid circular import
+
+        expressions = pyeval.PYTHON_CACHE if runner.use_python_eval else parser.EXPRESSION_CACHE
+        return expressions.info(), TEMPLATE_CACHE.info(), httpcache.RESPONSE_CACHE.info()
+
+    def _add(
+        self, table: typing.Dict[str, Timing], key: str, elapsed: float, self_time: typing.Optional[float] = None
+    ) -> None:
+        with self._lock:
+            timing = table.get(key)
+            if timing is None:
+                timing = table[key] = Timing()
+            timing.add(elapsed, self_time)
+
+    def run_start(self, runner: 'YRunner') -> None:
+        self.reset()
+        self._caches_start = self._caches(runner)
+        self._start = time.perf_counter()
+
+    def run_end(self, runner: 'YRunner') -> None:
+        self.elapsed = time.perf_counter() - self._start
+        expression_cache, template_cache, response_cache = self._caches(runner)
+        self.expression_cache = _cache_delta(expression_cache, self._caches_start[0])
+        self.template_cache = _cache_delta(template_cache, self._caches_start[1])
+        self.response_cache = _cache_delta(response_cache, self._caches_start[2])
+
+    def command_start(self, step: program.Step) -> None:
+        frame = _Frame(_current.get())
+        frame.token = _current.set(frame)
+
+    def command_end(self, step: program.Step, elapsed: float) -> None:
+        frame = _current.get()
+        if frame is None:  # Not started by us (i.e. instrument added during the run)
+            return
+        _current.reset(frame.token)
+        if frame.parent is not None:
+            frame.parent.nested += elapsed
+        # Concurrent nested commands (parallel) can take more time than its parent
+        self._add(self.commands, step.command.name, elapsed, max(0.0, elapsed - frame.nested))
+
+    def expression(self, source: str, elapsed: float) -> None:
+        self._add(self.expressions, source, elapsed)
+
+    def http(self, method: str, url: str, status: typing.Optional[int], elapsed: float) -> None:
+        self._add(self.hosts, urllib.parse.urlsplit(url).netloc, elapsed)
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'elapsed': self.elapsed,
+            'commands': {name: timing.as_dict() for name, timing in self.commands.items()},
+            'expressions': {source: timing.as_dict() for source, timing in self.expressions.items()},
+            'hosts': {host: timing.as_dict() for host, timing in self.hosts.items()},
+            'expression_cache': self.expression_cache._asdict(),
+            'template_cache': self.template_cache._asdict(),
+            'response_cache': self.response_cache._asdict(),
+        }
+
+    # Human readable report, with the top entries (by self time) of each table
+    def report(self, top: int = 10) -> str:
+        lines = [f'Elapsed: {self.elapsed:.3f}s']
+        tables = (('Commands', self.commands), ('Expressions', self.expressions), ('HTTP hosts', self.hosts))
+        for title, table in tables:
+            if not table:
+                continue
+            width = min(60, max(len(key) for key in table))
+            lines.append('')
+            lines.append(f'{title:<{width}} {"count":>9} {"total":>10} {"self":>10} {"mean":>10} {"max":>10}')
+            for key, timing in sorted(table.items(), key=lambda item: item[1].self_time, reverse=True)[:top]:
+                lines.append(
+                    f'{key[:width]:<{width}} {timing.count:>9} {timing.total:>10.4f} {timing.self_time:>10.4f} '
+                    f'{timing.mean:>10.6f} {timing.max:>10.6f}'
+                )
+        caches = (
+            ('Expression cache', self.expression_cache),
+            ('Template cache', self.template_cache),
+            ('Response cache', self.response_cache),
+        )
+        for title, info in caches:
+            lines.append(f'{title}: {info.hits} hits, {info.misses} misses, {info.evictions} evictions')
+        return '\n'.join(lines)
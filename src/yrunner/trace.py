@@ -0,0 +1,204 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Trace of the execution, on Chrome trace event format (can be loaded by chrome://tracing or ui.perfetto.dev):
+#   with Tracer('script.trace.json') as tracer:
+#       runner = YRunner(http.COMMANDS, instruments=[tracer])
+#       runner.run(script)
+# Each command is a begin/end pair of events (with its nesting depth and script line), and each HTTP request
+# a complete event with its url and status. Events are written by a background thread, and at most
+# max_pending events are kept in memory (commands wait for the writer if it falls behind)
+import typing
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from . import instrument, program
+
+if typing.TYPE_CHECKING:
+    from .runner import YRunner
+
+# Event: phase, name, category, timestamp (us), thread, duration (us, for complete events) and args
+# (args of command begin events are just (depth, line), formatted by the writer)
+Event = typing.Tuple[str, str, str, float, int, float, typing.Any]
+
+
+class _Frame:
+    __slots__ = ('depth', 'tid', 'args', 'token')
+
+    depth: int
+    tid: int
+    args: typing.Dict[str, typing.Any]  # Args of the end event, set while executing the command
+    token: typing.Any
+
+    def __init__(self, depth: int, tid: int) -> None:
+        self.depth = depth
+        self.tid = tid
+        self.args = {}
+
+
+_current: contextvars.ContextVar[typing.Optional[_Frame]] = contextvars.ContextVar('yrunner_trace', default=None)
+
+
+# Thread of the events: the asyncio task if running on a loop (so events of concurrent tasks are not mixed)
+def _tid() -> int:
+    asyncio = sys.modules.get('asyncio')  # Not imported, so no loop running
+    if asyncio is None:
+        return threading.get_ident()
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # No loop running on this thread
+        return threading.get_ident()
+    return id(task) if task is not None else threading.get_ident()
+
+
+class Tracer(instrument.Instrument):
+    source_marks = True
+
+    path: str
+    batch_size: int
+
+    _file: typing.Optional[typing.TextIO]
+    _queue: 'queue.Queue[typing.Optional[typing.List[Event]]]'
+    _writer: typing.Optional[threading.Thread]
+    _batch: typing.List[Event]
+    _lock: threading.Lock
+    _start: float
+    _pid: int
+    _first: bool
+
+    def __init__(self, path: str, max_pending: int = 65536, batch_size: int = 1024) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max(1, max_pending // batch_size))
+        self._file = None
+        self._writer = None
+        self._batch = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._pid = os.getpid()
+
+    def __enter__(self) -> 'Tracer':
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def _open(self) -> None:
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write('[\n')
+        self._first = True
+        self._writer = threading.Thread(target=self._write_events, name='yrunner-trace', daemon=True)
+        self._writer.start()
+
+    def _write_events(self) -> None:
+        assert self._file is not None  # nosec: opened before starting the writer
+        pid = self._pid
+        dumps = json.dumps
+        names: typing.Dict[str, str] = {}  # Encoded names, most of them are command names
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+                # Formatted by hand, much cheaper than dumping a dict per event (and this thread competes
+                # for the GIL with the traced one)
+                lines = []
+                for phase, name, category, ts, tid, dur, args in batch:
+                    encoded = names.get(name)
+                    if encoded is None:
+                        encoded = dumps(name)
+                        if len(names) < 1024:  # Requests names includes the url, do not keep all of them
+                            names[name] = encoded
+                    line = f'{{"name":{encoded},"cat":"{category}","ph":"{phase}","ts":{ts:.3f},"pid":{pid}'
+                    line += f',"tid":{tid}'
+                    if phase == 'X':
+                        line += f',"dur":{dur:.3f}'
+                    if args.__class__ is tuple:
+                        line += f',"args":{{"depth":{args[0]},"line":{args[1]}}}'
+                    elif args:
+                        line += f',"args":{dumps(args, default=str)}'
+                    lines.append(line + '}')
+                if lines:
+                    self._file.write(('' if self._first else ',\n') + ',\n'.join(lines))
+                    self._first = False
+            finally:
+                self._queue.task_done()
+
+    def _emit(self, event: Event) -> None:
+        with self._lock:
+            self._batch.append(event)
+            if len(self._batch) < self.batch_size:
+                return
+            batch, self._batch = self._batch, []
+        self._queue.put(batch)  # Waits if the writer is behind
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self._start) * 1e6
+
+    # Writes the pending events
+    def flush(self) -> None:
+        if self._writer is None:
+            return
+        with self._lock:
+            batch, self._batch = self._batch, []
+        self._queue.put(batch)
+        self._queue.join()
+        assert self._file is not None  # nosec: writer started
+        self._file.flush()
+
+    # Completes the trace file. Runs after closing are traced on a new file (overwriting this one)
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        assert self._file is not None  # nosec: writer started
+        self._file.write('\n]\n')
+        self._file.close()
+        self._file = self._writer = None
+
+    def run_start(self, runner: 'YRunner') -> None:
+        if self._writer is None:
+            self._open()
+        self._emit(('B', 'run', 'run', self._now(), _tid(), 0.0, None))
+
+    def run_end(self, runner: 'YRunner') -> None:
+        args = {'error': str(runner.error)} if runner.error else None
+        self._emit(('E', 'run', 'run', self._now(), _tid(), 0.0, args))
+        self.flush()
+
+    def command_start(self, step: program.Step) -> None:
+        parent = _current.get()
+        frame = _Frame(parent.depth + 1 if parent else 0, _tid())
+        frame.token = _current.set(frame)
+        args = (frame.depth, step.source.mark.line if step.source else 0)
+        self._emit(('B', step.command.name, 'command', self._now(), frame.tid, 0.0, args))
+
+    def command_end(self, step: program.Step, elapsed: float) -> None:
+        frame = _current.get()
+        if frame is None:
+            self._emit(('E', step.command.name, 'command', self._now(), _tid(), 0.0, None))
+            return
+        _current.reset(frame.token)
+        self._emit(('E', step.command.name, 'command', self._now(), frame.tid, 0.0, frame.args or None))
+
+    def http(self, method: str, url: str, status: typing.Optional[int], elapsed: float) -> None:
+        now = self._now()
+        args = {'url': url, 'status': status}
+        frame = _current.get()
+        if frame is not None:  # Also on the command (last request, if it does several)
+            frame.args.update(args)
+        self._emit(('X', f'{method} {url}', 'http', now - elapsed * 1e6, _tid(), elapsed * 1e6, args))
+
+    def sleep(self, seconds: float) -> None:
+        frame = _current.get()
+        if frame is not None:
+            frame.args['sleep'] = seconds
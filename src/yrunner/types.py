@@ -3,21 +3,131 @@
 # This software is released under the MIT License.
 # https://opensource.org/licenses/MIT
 import typing
+import enum
+import functools
+
+from . import exceptions
 
 if typing.TYPE_CHECKING:
     from .runner import YRunner
 
-ExecutorType = typing.Callable[[typing.Mapping[str, typing.Any], 'YRunner'], None]
+# Executors receive the node of the command, or its Arguments if the command binds them (Command.bind)
+ExecutorType = typing.Callable[[typing.Any, 'YRunner'], None]
+# Coroutine executors, receiving the node (or Arguments) and the AsyncYRunner
+AsyncExecutorType = typing.Callable[[typing.Any, typing.Any], typing.Awaitable[None]]
+
+# How a parameter value is prepared when a script is compiled
+class ParameterKind(enum.Enum):
+    VALUE = 'value'  # Used as is
+    EXPRESSION = 'expression'  # Expression, evaluated with runner.eval_expr
+    VARIABLE = 'variable'  # Name (or list of names) of variables, interned (see parser.symbol)
+    TEMPLATE = 'template'  # String (or dict of strings) with {{ expression }} placeholders, for runner.eval_string
+    COMMANDS = 'commands'  # Block of commands, for runner.execute
+    BLOCKS = 'blocks'  # List of blocks of commands
+
 
 class CommandParameter(typing.NamedTuple):
     name: str
     optional: bool = False
     default: typing.Any = None
+    kind: ParameterKind = ParameterKind.VALUE
 
 
 class Command(typing.NamedTuple):
     name: str
-    executor: ExecutorType
+    executor: typing.Union[ExecutorType, AsyncExecutorType]
     parameters: typing.Optional[
         typing.List[CommandParameter]
     ] = []  # None means any parameter, empty list means no parameters
+    # Executor receives the parameters bound (when the script is compiled) to an Arguments object,
+    # instead of the node. Parameters must be declared
+    bind: bool = False
+
+
+# Parameters of a step, bound once when the script is compiled: an attribute (slot) per declared parameter,
+# with the defaults applied, so executors use args.name instead of looking up the node on every execution
+# Can also be read as a mapping (args['name'], 'name' in args, args.get('name'))
+class Arguments:
+    __slots__ = ()
+
+    _names: typing.ClassVar[typing.Tuple[str, ...]] = ()
+
+    if typing.TYPE_CHECKING:  # Parameters are slots of the classes created by bind_arguments
+
+        def __getattr__(self, name: str) -> typing.Any:
+            ...
+
+    def __getitem__(self, name: str) -> typing.Any:
+        if name not in self._names:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Arguments):
+            return NotImplemented
+        return self._names == other._names and all(getattr(self, n) == getattr(other, n) for n in self._names)
+
+    def get(self, name: str, default: typing.Any = None) -> typing.Any:
+        return getattr(self, name) if name in self._names else default
+
+    # Classes are created on demand, so arguments are pickled by its names and values
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return (bind_arguments, (self._names, tuple(getattr(self, name) for name in self._names)))
+
+    def __repr__(self) -> str:
+        return '{' + ', '.join(f'{name!r}: {getattr(self, name)!r}' for name in self._names) + '}'
+
+
+# Arguments class for a set of parameter names (shared by all the steps of the same command)
+@functools.lru_cache(maxsize=None)
+def arguments_class(names: typing.Tuple[str, ...]) -> typing.Type[Arguments]:
+    for name in names:
+        if not name.isidentifier() or name.startswith('_') or hasattr(Arguments, name):
+            raise exceptions.YRunnerInvalidParameter(f"Invalid parameter name {name!r}, can not be bound")
+    return typing.cast(typing.Type[Arguments], type('Arguments', (Arguments,), {'__slots__': names, '_names': names}))
+
+
+def bind_arguments(names: typing.Tuple[str, ...], values: typing.Iterable[typing.Any]) -> Arguments:
+    args = arguments_class(names)()
+    for name, value in zip(names, values):
+        setattr(args, name, value)
+    return args
+
+
+# Checks the parameters of a node against the declared ones (all required present, and no unknown ones)
+# Returns them as a dict (empty if the node has no parameters, i.e. "- break")
+def check_parameters(command: Command, params: typing.Any) -> typing.Any:
+    if command.parameters is None:  # Any parameter
+        return params
+    if params is None:
+        params = {}
+    elif not isinstance(params, dict):
+        raise exceptions.YRunnerInvalidParameter(f"Invalid parameters of {command.name}: {params!r}, must be a mapping")
+    declared = [parameter.name for parameter in command.parameters]
+    unknown = [str(name) for name in params if name not in declared]
+    if unknown:
+        raise exceptions.YRunnerInvalidParameter(
+            f"Unknown parameters of {command.name}: {', '.join(unknown)} (valid ones: {', '.join(declared) or 'none'})"
+        )
+    missing = [p.name for p in command.parameters if not p.optional and p.name not in params]
+    if missing:
+        raise exceptions.YRunnerInvalidParameter(f"Missing parameters of {command.name}: {', '.join(missing)}")
+    return params
+
+
+# Arguments of a command with bind=True, from its (checked) parameters
+def bind(command: Command, params: typing.Mapping[str, typing.Any]) -> Arguments:
+    parameters = command.parameters or []
+    return bind_arguments(
+        tuple(parameter.name for parameter in parameters),
+        (params.get(parameter.name, parameter.default) for parameter in parameters),
+    )
@@ -0,0 +1,162 @@
+# Copyright (c) 2023 Adolfo Gómez García <dkmaster@dkmon.com>
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# Alternative execution engine: the compiled program is lowered to a flat list of instructions,
+# where if/while/break/continue are (conditional) jumps, executed by a non recursive dispatch loop
+import typing
+import enum
+
+from . import exceptions, parser, program, pyeval
+from .executors import internal
+
+if typing.TYPE_CHECKING:
+    from .runner import YRunner
+
+
+class Opcode(enum.IntEnum):
+    CALL = 0  # Execute the step (arg)
+    JUMP_IF_FALSE = 1  # Evaluate compiled condition (arg is its evaluator), jump to target if false
+    JUMP_IF_FALSE_EXPR = 2  # Same, but condition (arg) is evaluated with runner.eval_expr
+    JUMP = 3  # Jump to target
+    RAISE = 4  # Raise the exception (arg), i.e. break/continue outside of a while loop
+
+
+class Instruction(typing.NamedTuple):
+    opcode: Opcode
+    arg: typing.Any
+    target: int
+    step: program.Step  # Step that generated the instruction, for error messages
+
+
+class Code(typing.NamedTuple):
+    instructions: typing.Tuple[Instruction, ...]
+
+    # Human readable listing of the instructions, for debugging
+    def dump(self) -> str:
+        lines: typing.List[str] = []
+        for pc, instruction in enumerate(self.instructions):
+            if instruction.opcode == Opcode.CALL:
+                detail = str(instruction.step)
+            elif instruction.opcode in (Opcode.JUMP_IF_FALSE, Opcode.JUMP_IF_FALSE_EXPR):
+                detail = f'{instruction.step.command.name} -> {instruction.target}'
+            elif instruction.opcode == Opcode.JUMP:
+                detail = f'-> {instruction.target}'
+            else:
+                detail = instruction.arg.__name__
+            lines.append(f'{pc:5d} {instruction.opcode.name:<18} {detail}')
+        return '\n'.join(lines)
+
+
+class _Loop:
+    start: int
+    breaks: typing.List[int]
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.breaks = []
+
+
+def _condition(step: program.Step, instruction: typing.List[typing.Any]) -> None:
+    condition = step.args.condition
+    if isinstance(condition, parser.CompiledExpression):
+        instruction[0], instruction[1] = Opcode.JUMP_IF_FALSE, condition.evaluator
+    elif isinstance(condition, pyeval.PythonExpression):
+        instruction[0], instruction[1] = Opcode.JUMP_IF_FALSE, condition.evaluate
+    else:
+        instruction[0], instruction[1] = Opcode.JUMP_IF_FALSE_EXPR, condition
+
+
+# Lowers the steps to instructions. Only the builtin control flow commands are lowered,
+# (so overriden if/while/break/continue are executed as any other command)
+# Uses an explicit stack of pending work, so there is no recursion limit on nesting
+def lower(steps: typing.Iterable[program.Step]) -> Code:
+    code: typing.List[typing.List[typing.Any]] = []
+    # Pending work, LIFO. Either a step to lower (with its enclosing loop) or the end of a block
+    pending: typing.List[typing.Tuple[typing.Any, ...]] = [('steps', tuple(steps), None)]
+
+    def emit(opcode: Opcode, step: program.Step, arg: typing.Any = None, target: int = -1) -> typing.List[typing.Any]:
+        instruction = [opcode, arg, target, step]
+        code.append(instruction)
+        return instruction
+
+    while pending:
+        work = pending.pop()
+        if work[0] == 'steps':
+            pending.extend(('step', step, work[2]) for step in reversed(work[1]))
+        elif work[0] == 'step':
+            step, loop = work[1], work[2]
+            executor = step.command.executor
+            if executor is internal.exec_if:
+                jump = emit(Opcode.JUMP_IF_FALSE, step)
+                _condition(step, jump)
+                pending.append(('end_if', jump))
+                pending.append(('steps', step.args.commands, loop))
+            elif executor is internal.exec_while:
+                new_loop = _Loop(len(code))
+                jump = emit(Opcode.JUMP_IF_FALSE, step)
+                _condition(step, jump)
+                pending.append(('end_while', jump, new_loop, step))
+                pending.append(('steps', step.args.commands, new_loop))
+            elif executor is internal.exec_break:
+                if loop is None:
+                    emit(Opcode.RAISE, step, exceptions.LoopBreak)
+                else:
+                    loop.breaks.append(len(code))
+                    emit(Opcode.JUMP, step)
+            elif executor is internal.exec_continue:
+                if loop is None:
+                    emit(Opcode.RAISE, step, exceptions.LoopContinue)
+                else:
+                    emit(Opcode.JUMP, step, target=loop.start)
+            else:
+                emit(Opcode.CALL, step, step)
+        elif work[0] == 'end_if':
+            work[1][2] = len(code)
+        else:  # end_while, jump back to condition, and patch exits of the loop
+            loop, step = work[2], work[3]
+            emit(Opcode.JUMP, step, target=loop.start)
+            work[1][2] = len(code)
+            for pc in loop.breaks:
+                code[pc][2] = len(code)
+
+    return Code(tuple(Instruction(*instruction) for instruction in code))
+
+
+# Lowered code of a program, lowered only once per program
+def get_code(compiled: program.Program) -> Code:
+    if compiled.code is None:
+        compiled.code = lower(compiled.steps)
+    return compiled.code
+
+
+def execute(code: Code, runner: 'YRunner') -> None:
+    instructions = code.instructions
+    size = len(instructions)
+    CALL, JUMP_IF_FALSE, JUMP_IF_FALSE_EXPR, JUMP = (
+        Opcode.CALL,
+        Opcode.JUMP_IF_FALSE,
+        Opcode.JUMP_IF_FALSE_EXPR,
+        Opcode.JUMP,
+    )
+    pc = 0
+    try:
+        while pc < size:
+            opcode, arg, target, _ = instructions[pc]
+            if opcode is CALL:
+                arg.command.executor(arg.args, runner)
+                pc += 1
+            elif opcode is JUMP_IF_FALSE:
+                pc = pc + 1 if arg(runner.variables) else target
+            elif opcode is JUMP:
+                pc = target
+            elif opcode is JUMP_IF_FALSE_EXPR:
+                pc = pc + 1 if runner.eval_expr(arg) else target
+            else:
+                raise arg()
+    except exceptions.YRunnerException:
+        raise
+    except Exception as e:
+        # Attach command to exception (only once, there is no nesting here)
+        raise Exception(f"Error executing command: {instructions[pc].step}") from e
@@ -0,0 +1,102 @@
+import typing
+import json
+import threading
+import time
+import urllib.parse
+import http.server
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # headers and body are sent separately, avoid delayed ACK stalls
+    server: 'LocalServer'
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests += 1
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/limited' and self._refuse():  # 429 while the server has requests to refuse
+            self._send(b'', 'text/plain', 429, {'Retry-After': self.server.retry_after})
+            return
+        if url.path == '/versioned':  # ETag (and Last-Modified) of the current version, 304 if not modified
+            self._send_versioned()
+            return
+        if url.path.startswith('/delay/'):  # Answers after the requested seconds
+            time.sleep(float(url.path[7:]))
+        if url.path.startswith('/bytes/'):  # Binary body of the requested size
+            self._send(bytes(i % 256 for i in range(int(url.path[7:]))), 'application/octet-stream')
+            return
+        body = json.dumps(
+            {
+                'method': self.command,
+                'path': url.path,
+                'args': dict(urllib.parse.parse_qsl(url.query)),
+                'headers': dict(self.headers.items()),
+            }
+        ).encode()
+        self._send(body, 'application/json')
+
+    def _send_versioned(self) -> None:
+        version = self.server.version
+        etag = f'"v{version}"'
+        headers = {'ETag': etag, 'Last-Modified': 'Mon, 02 Jan 2023 00:00:00 GMT'}
+        if self.headers.get('If-None-Match') == etag:
+            self._send(b'', 'application/json', 304, headers)
+        else:
+            self._send(json.dumps({'version': version}).encode(), 'application/json', 200, headers)
+
+    def _refuse(self) -> bool:
+        with self.server.lock:
+            if self.server.refuse <= 0:
+                return False
+            self.server.refuse -= 1
+            return True
+
+    def _send(
+        self, body: bytes, content_type: str, status: int = 200, headers: typing.Mapping[str, str] = {}
+    ) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+# In process HTTP server, to test requests without external services
+class LocalServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Many clients connecting at once
+    connections: int
+    requests: int
+    refuse: int  # Requests to /limited answered with 429
+    retry_after: str
+    version: int  # Of the /versioned resource
+    lock: threading.Lock
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.connections = self.requests = self.refuse = self.version = 0
+        self.retry_after = '0'
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def __enter__(self) -> 'LocalServer':
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.shutdown()
+        self.server_close()
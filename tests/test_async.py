@@ -0,0 +1,104 @@
+import typing
+from unittest import TestCase
+import asyncio
+import logging
+import threading
+import time
+
+from yrunner import AsyncYRunner, types
+from yrunner.executors import http, time as ex_time
+
+from .local_server import LocalServer
+
+SLEEP_YAML = '''
+---
+- set:
+    var: x0
+    value: 0
+- while:
+    condition: x0 < 2
+    commands:
+        - set:
+            var: x0
+            value: x0 + 1
+        - sleep:
+            value: 0.1
+- exit:
+    code: x0 + id
+'''
+
+SYNC_COMMAND_YAML = '''
+---
+- sync_command
+- set:
+    var: x0
+    value: 1
+'''
+
+REQUEST_YAML = '''
+---
+- request:
+    method: GET
+    url: "{{ base_url }}/item"
+    params:
+        id: "{{ id }}"
+    response_var: response
+'''
+
+DELAYED_YAML = '''
+---
+- request:
+    method: GET
+    url: "{{ base_url }}/delay/0.5"
+    select: status_code
+    response_var: status
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestAsync(TestCase):
+    def test_concurrent_sleeps(self):
+        async def run_all() -> typing.List[int]:
+            runners = [AsyncYRunner(ex_time.ASYNC_COMMANDS, variables={'id': i}) for i in range(100)]
+            return await asyncio.gather(*(runner.run(SLEEP_YAML) for runner in runners))
+
+        start = time.monotonic()
+        codes = asyncio.run(run_all())
+        # 100 scripts sleeping 0.2 seconds each, concurrently
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(codes, [i + 2 for i in range(100)])
+
+    def test_sync_executor_off_loop(self):
+        threads: typing.List[threading.Thread] = []
+        sync_command = types.Command('sync_command', lambda node, runner: threads.append(threading.current_thread()))
+        runner = AsyncYRunner(sync_command)
+        self.assertEqual(asyncio.run(runner.run(SYNC_COMMAND_YAML)), 0)
+        self.assertEqual(runner.variables['x0'], 1)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_requests(self):
+        async def run_all(base_url: str) -> typing.List[AsyncYRunner]:
+            runners = [AsyncYRunner(http.ASYNC_COMMANDS, variables={'base_url': base_url, 'id': i}) for i in range(5)]
+            await asyncio.gather(*(runner.run(REQUEST_YAML) for runner in runners))
+            return runners
+
+        with LocalServer() as server:
+            runners = asyncio.run(run_all(server.url))
+        for i, runner in enumerate(runners):
+            self.assertIsNone(runner.error)
+            self.assertEqual(runner.variables['response'].json()['args'], {'id': str(i)})
+
+    def test_many_requests(self):
+        # Blocking requests are not limited by the cpus, all of them wait for the response at once
+        async def run_all(base_url: str) -> typing.List[typing.Any]:
+            runners = [AsyncYRunner(http.ASYNC_COMMANDS, variables={'base_url': base_url}) for _ in range(64)]
+            await asyncio.gather(*(runner.run(DELAYED_YAML) for runner in runners))
+            return [runner.variables.get('status') for runner in runners]
+
+        with LocalServer() as server:
+            start = time.monotonic()
+            statuses = asyncio.run(run_all(server.url))
+            self.assertLess(time.monotonic() - start, 2)  # 64 requests of 0.5 seconds
+        self.assertEqual(statuses, [200] * 64)
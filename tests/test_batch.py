@@ -0,0 +1,88 @@
+import typing
+from unittest import TestCase, mock
+import io
+import json
+import logging
+import os
+import tempfile
+
+from yrunner import batch, cli
+
+COUNT_YAML = '''
+---
+- set:
+    var: total
+    value: 0
+- while:
+    condition: total < n
+    commands:
+        - set:
+            var: total
+            value: total + step
+- exit:
+    code: total % 7
+'''
+
+FAIL_YAML = '''
+---
+- set:
+    var: x0
+    value: missing + 1
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestBatch(TestCase):
+    def test_one_script_many_variables(self):
+        variables = [{'n': n, 'step': 1} for n in range(20)]
+        for jobs in (1, 2):
+            results = list(batch.run_many(COUNT_YAML, variables, jobs=jobs))
+            self.assertEqual([r.position for r in results], list(range(20)))
+            self.assertEqual([r.code for r in results], [n % 7 for n in range(20)])
+            self.assertEqual(results[5].variables, {'n': 5, 'step': 1, 'total': 5})
+
+    def test_many_scripts(self):
+        scripts = [COUNT_YAML, FAIL_YAML, 'not: [valid']
+        results = list(batch.run_many(scripts, [{'n': 3, 'step': 2}, None, None], jobs=2))
+        self.assertEqual((results[0].code, results[0].error), (4, None))
+        self.assertEqual(results[1].code, -1)
+        self.assertIn('missing + 1', results[1].error)
+        self.assertEqual(results[2].code, -1)
+
+    def test_portable(self):
+        self.assertEqual(batch.portable({'a': (1, 2), 'b': {'c': None}}), {'a': [1, 2], 'b': {'c': None}})
+        self.assertEqual(batch.portable(object)[:6], "<class")
+
+
+class TestCli(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.script = os.path.join(self.dir.name, 'count.yaml')
+        with open(self.script, 'w') as f:
+            f.write(COUNT_YAML)
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_single_run(self):
+        self.assertEqual(cli.main([self.script, '--var', 'n=10', '--var', 'step=3']), 12 % 7)
+
+    def test_vars_file(self):
+        vars_file = os.path.join(self.dir.name, 'vars.jsonl')
+        with open(vars_file, 'w') as f:
+            f.writelines(json.dumps({'n': n, 'step': 1}) + '\n' for n in range(5))
+        output = io.StringIO()
+        with mock.patch('sys.stdout', output):
+            code = cli.main(['-j', '2', '--vars-file', vars_file, self.script])
+        lines: typing.List[typing.Dict[str, typing.Any]] = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(code, 1)  # Some exit codes are not 0
+        self.assertEqual([line['code'] for line in lines], [0, 1, 2, 3, 4])
+        self.assertEqual(lines[4]['variables']['total'], 4)
+        self.assertEqual(lines[0]['script'], self.script)
+
+    def test_stream(self):
+        stream = os.path.join(self.dir.name, 'stream.yaml')
+        with open(stream, 'w') as f:
+            f.write(COUNT_YAML.replace('- exit:\n    code: total % 7\n', '') + '---\n- exit:\n    code: total\n')
+        self.assertEqual(cli.main(['--stream', stream, '--var', 'n=10', '--var', 'step=5']), 10)
@@ -0,0 +1,143 @@
+from unittest import TestCase
+import logging
+import pickle
+
+from yrunner import YRunner, exceptions, instrument, program, types
+
+COUNTER_YAML = '''
+---
+- set:
+    var: x1
+    value: 0
+- while:
+    condition: x1 < x0
+    commands:
+        - set:
+            var: x1
+            value: x1 + 2
+        - if:
+            condition: x1 > 6
+            commands:
+                - break
+'''
+
+INVALID_YAML = '''
+---
+- set:
+    var: x0
+    value: 1
+- if:
+    condition: x0 == 1
+    commands:
+        - not_a_command:
+            var: x0
+'''
+
+MISSING_PARAMETER_YAML = '''
+---
+- set:
+    var: x0
+    value: 1
+- while:
+    condition: x0 < 10
+    commands:
+        - set:
+            var: x0
+'''
+
+UNKNOWN_PARAMETER_YAML = '''
+---
+- log:
+    message: "x0 is {{ x0 }}"
+    levle: WARNING
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class Marks(instrument.Instrument):
+    source_marks = True
+
+
+class TestCompile(TestCase):
+    def test_compile_once_run_many(self):
+        runner = YRunner()
+        compiled = runner.compile(COUNTER_YAML)
+        self.assertIsInstance(compiled, program.Program)
+        for x0, expected in [(3, 4), (5, 6), (100, 8)]:
+            variables = {'x0': x0}
+            result_code = runner.run(compiled, variables=variables)
+            self.assertEqual(result_code, 0)
+            self.assertIs(runner.variables, variables)
+            self.assertEqual(variables['x1'], expected)
+
+    def test_nested_blocks_compiled(self):
+        compiled = YRunner().compile(COUNTER_YAML)
+        while_step = compiled.steps[1]
+        self.assertEqual(while_step.command.name, 'while')
+        nested = while_step.node['while']['commands']
+        self.assertTrue(all(isinstance(step, program.Step) for step in nested))
+        self.assertEqual([step.command.name for step in nested], ['set', 'if'])
+
+    def test_invalid_command_before_execution(self):
+        runner = YRunner()
+        with self.assertRaises(exceptions.YRunnerInvalidCommand):
+            runner.compile(INVALID_YAML)
+        result_code = runner.run(INVALID_YAML)
+        self.assertEqual(result_code, -1)
+        self.assertIsInstance(runner.error, exceptions.YRunnerInvalidCommand)
+        self.assertNotIn('x0', runner.variables)  # Nothing executed
+
+    def test_invalid_parameters_before_execution(self):
+        runner = YRunner()
+        with self.assertRaisesRegex(exceptions.YRunnerInvalidParameter, 'Missing parameters of set: value'):
+            runner.compile(MISSING_PARAMETER_YAML)
+        with self.assertRaisesRegex(exceptions.YRunnerInvalidParameter, 'Unknown parameters of log: levle'):
+            runner.compile(UNKNOWN_PARAMETER_YAML)
+        with self.assertRaisesRegex(exceptions.YRunnerInvalidParameter, 'must be a mapping'):
+            runner.compile('- log: hello')
+        result_code = runner.run(MISSING_PARAMETER_YAML)
+        self.assertEqual(result_code, -1)
+        self.assertIsInstance(runner.error, exceptions.YRunnerInvalidParameter)
+        self.assertNotIn('x0', runner.variables)  # Nothing executed
+        # With the position, if compiled keeping marks
+        with self.assertRaisesRegex(exceptions.YRunnerInvalidParameter, r'\(line 9\)'):
+            YRunner(instruments=[Marks()]).compile(MISSING_PARAMETER_YAML)
+
+    def test_bound_arguments(self):
+        compiled = YRunner().compile('- log:\n    message: hello\n- exit')
+        log, exit = compiled.steps
+        self.assertIsInstance(log.args, types.Arguments)
+        self.assertEqual((log.args.level, log.args.args, log.args.kwargs), ('INFO', [], {}))  # Defaults
+        self.assertEqual(log.args['message'].source, 'hello')
+        self.assertNotIn('other', log.args)
+        self.assertEqual(exit.args.code, 0)
+        with self.assertRaises(AttributeError):
+            log.args.other = 1  # Slots, only the declared parameters
+        copy = pickle.loads(pickle.dumps(log.args))
+        self.assertEqual(list(copy), ['message', 'level', 'args', 'kwargs'])
+        self.assertEqual(copy.level, 'INFO')
+
+    def test_not_bound_and_not_compiled(self):
+        nodes = []
+        runner = YRunner(types.Command('custom', lambda node, runner: nodes.append(node), None))
+        runner.run('- custom:\n    anything: 1')
+        self.assertEqual(nodes, [{'custom': {'anything': 1}}])  # Commands without bind receive the node
+
+        # Nodes executed without compiling are checked and bound on execution
+        runner.execute([{'set': {'var': 'x0', 'value': '2 * 3'}}])
+        self.assertEqual(runner.variables['x0'], 6)
+        with self.assertRaises(exceptions.YRunnerInvalidParameter):
+            runner.execute([{'set': {'var': 'x0'}}])
+
+    def test_interned_variables(self):
+        # Stored names and names on expressions are the same object, so dict lookups match by identity
+        compiled = YRunner().compile(COUNTER_YAML)
+        stored = compiled.steps[0].args.var
+        loaded = [token.value for token in compiled.steps[1].args.condition.rpn if token.value == 'x1']
+        self.assertIs(loaded[0], stored)
+        self.assertIs(compiled.steps[1].args.commands[0].args.var, stored)
+
+        # Also on unpickled programs (i.e. loaded from the disk cache)
+        copy = pickle.loads(pickle.dumps(compiled))
+        self.assertIs(copy.steps[1].args.condition.rpn[0].value, copy.steps[0].args.var)
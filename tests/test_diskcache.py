@@ -0,0 +1,93 @@
+import typing
+from unittest import TestCase
+import glob
+import logging
+import os
+import pickle
+import tempfile
+
+from yrunner import YRunner, diskcache, types
+from yrunner.executors import time
+
+SCRIPT_YAML = '''
+---
+- set:
+    var: x1
+    value: 0
+- while:
+    condition: x1 < x0
+    commands:
+        - set:
+            var: x1
+            value: x1 + 2
+        - if:
+            condition: x1 > 6 and x0 != 100
+            commands:
+                - break
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestDiskCache(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def entries(self) -> typing.List[str]:
+        return glob.glob(os.path.join(self.dir.name, '*' + diskcache.SUFFIX))
+
+    def test_round_trip(self):
+        for use_vm in (False, True):
+            disk_cache = diskcache.DiskCache(self.dir.name)
+            compiled = YRunner(disk_cache=disk_cache, use_vm=use_vm).compile(SCRIPT_YAML)
+            # A new runner (i.e. on a new process) gets the compiled script from disk
+            runner = YRunner(disk_cache=diskcache.DiskCache(self.dir.name), use_vm=use_vm)
+            loaded = runner.compile(SCRIPT_YAML)
+            self.assertEqual(runner.disk_cache.hits, 1)  # type: ignore
+            self.assertIsNot(loaded, compiled)
+            self.assertEqual(len(loaded), len(compiled))
+            self.assertEqual(runner.run(loaded, variables={'x0': 20}), 0)
+            self.assertEqual(runner.variables['x1'], 8)
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_pickle_templates(self):
+        runner = YRunner(variables={'x0': 1})
+        template = pickle.loads(pickle.dumps(runner.compile_template('x0 is {{ x0 + 1 }}, {{ x0 * 2 }}')))
+        self.assertEqual(runner.eval_string(template), 'x0 is 2, 2')
+
+    def test_key(self):
+        disk_cache = diskcache.DiskCache(self.dir.name)
+        key = disk_cache.key(SCRIPT_YAML, YRunner())
+        self.assertEqual(key, disk_cache.key(SCRIPT_YAML, YRunner()))
+        self.assertNotEqual(key, disk_cache.key(SCRIPT_YAML + '\n', YRunner()))
+        self.assertNotEqual(key, disk_cache.key(SCRIPT_YAML, YRunner(use_python_eval=True)))
+        self.assertNotEqual(key, disk_cache.key(SCRIPT_YAML, YRunner(time.COMMANDS)))
+
+    def test_corrupt_entry(self):
+        runner = YRunner(disk_cache=diskcache.DiskCache(self.dir.name))
+        runner.compile(SCRIPT_YAML)
+        with open(self.entries()[0], 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertEqual(len(runner.compile(SCRIPT_YAML)), 2)
+        self.assertEqual(runner.disk_cache.misses, 2)  # type: ignore
+        self.assertEqual(len(runner.compile(SCRIPT_YAML)), 2)  # Stored again
+        self.assertEqual(runner.disk_cache.hits, 1)  # type: ignore
+
+    def test_eviction(self):
+        runner = YRunner(disk_cache=diskcache.DiskCache(self.dir.name))
+        runner.compile(SCRIPT_YAML)
+        size = os.path.getsize(self.entries()[0])
+        runner.disk_cache = diskcache.DiskCache(self.dir.name, max_size=size * 3)
+        for i in range(10):
+            runner.compile(SCRIPT_YAML + f'# {i}\n')
+            self.assertLessEqual(len(self.entries()), 3)
+        self.assertEqual(len(self.entries()), 3)
+
+    def test_not_picklable(self):
+        command = types.Command('noop', lambda node, runner: None)
+        runner = YRunner(command, disk_cache=diskcache.DiskCache(self.dir.name))
+        self.assertEqual(runner.run('- noop'), 0)
+        self.assertEqual(self.entries(), [])
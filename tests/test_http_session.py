@@ -0,0 +1,67 @@
+from unittest import TestCase
+import logging
+
+from yrunner import YRunner
+from yrunner.executors import http
+
+from .local_server import LocalServer
+
+POLL_YAML = '''
+---
+- set:
+    var: x0
+    value: 0
+- while:
+    condition: x0 < 5
+    commands:
+        - set:
+            var: x0
+            value: x0 + 1
+        - request:
+            method: GET
+            url: "{{ base_url }}/poll"
+            params:
+                n: "{{ x0 }}"
+            response_var: response
+'''
+
+# params as (key, value) pairs, passed to requests as they are
+PAIRS_YAML = '''
+---
+- request:
+    method: GET
+    url: "{{ base_url }}/pairs"
+    params: [[a, "1"], [b, "{{ x }}"]]
+    response_var: response
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestHttpSession(TestCase):
+    def test_keep_alive(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url})
+            result_code = runner.run(POLL_YAML)
+            self.assertEqual(result_code, 0)
+            self.assertEqual(runner.variables['response'].json()['args'], {'n': '5'})
+            self.assertEqual(server.requests, 5)
+            self.assertEqual(server.connections, 1)  # All requests on same connection
+            self.assertEqual(runner.resources, {})  # Session closed at end of run
+
+    def test_params_pairs(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url})
+            self.assertEqual(runner.run(PAIRS_YAML), 0)
+        self.assertEqual(runner.variables['response'].json()['args'], {'a': '1', 'b': '{{ x }}'})
+
+    def test_settings(self):
+        settings = http.HttpSettings(pool_maxsize=3, max_retries=2)
+        runner = YRunner(http.COMMANDS, settings={'http': settings})
+        session = http.get_session(runner)
+        self.assertIs(http.get_session(runner), session)
+        adapter = session.get_adapter('http://localhost')
+        self.assertEqual(adapter._pool_maxsize, 3)  # type: ignore
+        self.assertEqual(adapter.max_retries.total, 2)
+        runner.close_resources()
+        self.assertIsNot(http.get_session(runner), session)
@@ -0,0 +1,89 @@
+import typing
+from unittest import TestCase
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+from yrunner import YRunner, AsyncYRunner, diskcache, types
+from yrunner.executors import time as time_executors
+
+SLEEP_YAML = '''
+---
+- sleep:
+    value: 0
+- gettime:
+    var: now
+'''
+
+SET_YAML = '''
+---
+- set:
+    var: x0
+    value: 1
+'''
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+# Modules loaded after running code on a new interpreter
+def loaded_modules(code: str) -> typing.Set[str]:
+    output = subprocess.run(
+        [sys.executable, '-c', code + '\nimport sys\nprint("\\n".join(sys.modules))'],
+        env={**os.environ, 'PYTHONPATH': SRC},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(output.split())
+
+
+class TestLazyImports(TestCase):
+    def test_import(self):
+        modules = loaded_modules('import yrunner')
+        for name in ('yaml', 'requests', 'asyncio', 'yrunner.executors.http', 'yrunner.diskcache'):
+            self.assertNotIn(name, modules)
+
+    def test_lazy_executors(self):
+        modules = loaded_modules(f'import yrunner\nyrunner.YRunner("http", "time").run({SET_YAML!r})')
+        self.assertIn('yaml', modules)
+        self.assertNotIn('yrunner.executors.http', modules)
+        self.assertNotIn('yrunner.executors.time', modules)
+        self.assertNotIn('requests', modules)
+
+    def test_register_by_name(self):
+        runner = YRunner('time')
+        self.assertNotIn('sleep', runner.commands)
+        self.assertEqual(runner.lazy_commands, {'gettime': 'time', 'sleep': 'time'})
+        self.assertEqual(runner.run(SLEEP_YAML), 0)
+        self.assertIs(runner.commands['sleep'].executor, time_executors.exec_sleep)
+        self.assertIn('now', runner.variables)
+
+        # Full module names are imported on registration
+        runner = YRunner('yrunner.executors.time')
+        self.assertIs(runner.commands['sleep'].executor, time_executors.exec_sleep)
+        self.assertEqual(runner.lazy_commands, {})
+
+    def test_override(self):
+        calls = []
+        sleep = types.Command('sleep', lambda node, runner: calls.append(node), None)
+        runner = YRunner('time', sleep)
+        self.assertEqual(runner.run(SLEEP_YAML), 0)
+        self.assertEqual(len(calls), 1)
+        self.assertIs(runner.commands['sleep'], sleep)
+        self.assertIs(runner.commands['gettime'].executor, time_executors.exec_gettime)
+
+    def test_async(self):
+        runner = AsyncYRunner('time')
+        self.assertEqual(asyncio.run(runner.run(SLEEP_YAML)), 0)
+        self.assertIs(runner.commands['sleep'].executor, time_executors.aexec_sleep)
+
+    def test_disk_cache_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = diskcache.DiskCache(directory)
+            runner = YRunner('time')
+            key = cache.key(SLEEP_YAML, runner)
+            runner.run(SLEEP_YAML)  # Loads the module
+            self.assertEqual(cache.key(SLEEP_YAML, runner), key)
+            self.assertNotEqual(cache.key(SLEEP_YAML, YRunner(time_executors.COMMANDS)), key)
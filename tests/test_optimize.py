@@ -0,0 +1,108 @@
+from unittest import TestCase
+import asyncio
+
+from yrunner import YRunner, AsyncYRunner, parser, types
+from yrunner.executors import internal
+
+OPTIMIZABLE_YAML = '''
+---
+- set:
+    var: x0
+    value: 60 * 5
+- set:
+    var: x1
+    value: '"a" + "b"'
+- if:
+    condition: 1 == 2
+    commands:
+        - set:
+            var: dead
+            value: 1
+- if:
+    condition: 2 > 1 and 1
+    commands:
+        - set:
+            var: x2
+            value: 0
+        - while:
+            condition: 1
+            commands:
+                - set:
+                    var: x2
+                    value: x2 + 2 * 3
+                - if:
+                    condition: x2 > 10
+                    commands:
+                        - break
+- while:
+    condition: 0 or 0
+    commands:
+        - set:
+            var: dead
+            value: 1
+'''
+
+
+class TestOptimize(TestCase):
+    def test_folding(self):
+        for expression, expected in [
+            ('1 == 1', True),
+            ('60 * 5', 300),
+            ('-(2 + 3)', -5),
+            ('"a" * 3', 'aaa'),
+            ('not (1 > 2)', True),
+            ('0 and x', False),  # x is not evaluated, as without folding
+            ('1 or x', True),
+        ]:
+            compiled = parser.compile_expression(expression)
+            self.assertTrue(compiled.constant, expression)
+            self.assertEqual(compiled.value, expected, expression)
+            self.assertEqual(compiled.evaluate({}), expected, expression)
+
+        for expression, folded in [('x + 2 * 3', 'x + 6'), ('1 + 2 + x', '3 + x'), ('x and 0', 'x and 0')]:
+            compiled = parser.compile_expression(expression)
+            self.assertFalse(compiled.constant, expression)
+            self.assertEqual(parser.format_rpn(compiled.rpn), folded)
+
+    def test_not_folded(self):
+        # Errors are raised on evaluation, and huge values are not created on compilation
+        compiled = parser.compile_expression('1 / 0')
+        self.assertFalse(compiled.constant)
+        self.assertRaises(ZeroDivisionError, compiled.evaluate, {})
+        self.assertFalse(parser.compile_expression('2 ** 100000').constant)
+        self.assertFalse(parser.compile_expression('"x" * 100000').constant)
+
+    def test_dead_branches(self):
+        runner = YRunner()
+        compiled = runner.compile(OPTIMIZABLE_YAML)
+        self.assertEqual([step.command.name for step in compiled], ['set', 'set', 'set', 'while'])
+        self.assertEqual(compiled.steps[0].args.value, 300)  # Not evaluated on execution
+        self.assertEqual(runner.run(compiled), 0)
+        self.assertEqual(runner.variables, {'x0': 300, 'x1': 'ab', 'x2': 12})
+
+        for other in (YRunner(use_vm=True), YRunner(optimize=False), YRunner(use_python_eval=True)):
+            self.assertEqual(other.run(OPTIMIZABLE_YAML), 0)
+            self.assertEqual(other.variables, runner.variables)
+        self.assertEqual(len(YRunner(optimize=False).compile(OPTIMIZABLE_YAML)), 5)
+
+        async_runner = AsyncYRunner()
+        self.assertEqual(len(async_runner.compile(OPTIMIZABLE_YAML)), 4)
+        self.assertEqual(asyncio.run(async_runner.run(OPTIMIZABLE_YAML)), 0)
+        self.assertEqual(async_runner.variables, runner.variables)
+
+    def test_overridden_if(self):
+        calls = []
+        command = types.Command(
+            'if', lambda args, runner: calls.append(args.condition), internal.COMMANDS[1].parameters, bind=True
+        )
+        runner = YRunner(command)
+        self.assertEqual(runner.run('- if:\n    condition: 1 == 2\n    commands: []\n'), 0)
+        self.assertEqual(calls, [False])
+
+    def test_dump(self):
+        dump = YRunner().compile(OPTIMIZABLE_YAML).dump()
+        self.assertIn('    value: 300\n', dump)
+        self.assertIn('    value: "ab"  # "a" + "b"\n', dump)
+        self.assertIn('            value: x2 + 6  # x2 + 2 * 3\n', dump)
+        self.assertNotIn('dead', dump)
+        self.assertTrue(dump.startswith('- set:\n    var: "x0"\n'))
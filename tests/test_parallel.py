@@ -0,0 +1,170 @@
+from unittest import TestCase
+import asyncio
+import logging
+import time
+
+from yrunner import YRunner, AsyncYRunner, exceptions
+from yrunner.executors import time as ex_time
+
+PARALLEL_YAML = '''
+---
+- set:
+    var: x0
+    value: 1
+- parallel:
+    max_workers: workers
+    branches:
+        - - sleep:
+              value: 0.3
+          - set:
+              var: a
+              value: x0 + 1
+        - - sleep:
+              value: 0.3
+          - set:
+              var: b
+              value: x0 + 2
+          - set:
+              var: x0
+              value: 100
+        - - sleep:
+              value: 0.3
+          - set:
+              var: c
+              value: 3
+    merge: [a, b]
+    result_var: results
+'''
+
+ERROR_YAML = '''
+---
+- parallel:
+    branches:
+        - - set:
+              var: a
+              value: 1
+        - - set:
+              var: b
+              value: 1 / 0
+    merge: [a]
+'''
+
+EXIT_YAML = '''
+---
+- parallel:
+    branches:
+        - - sleep:
+              value: 0.1
+        - - exit:
+              code: 7
+- set:
+    var: after
+    value: 1
+'''
+
+# x already exists, and only the first branch sets it
+MERGE_EXISTING_YAML = '''
+---
+- set:
+    var: x
+    value: 1
+- parallel:
+    branches:
+        - - set:
+              var: x
+              value: 2
+        - - set:
+              var: y
+              value: 3
+    merge: [x, y]
+'''
+
+# The last branch sets x to the value (the same object) it had before the fork
+MERGE_SAME_VALUE_YAML = '''
+---
+- set:
+    var: x
+    value: 1
+- parallel:
+    branches:
+        - - set:
+              var: x
+              value: 2
+        - - set:
+              var: x
+              value: 1
+    merge: [x]
+'''
+
+BREAK_YAML = '''
+---
+- while:
+    condition: 1
+    commands:
+        - parallel:
+            branches:
+                - - break
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestParallel(TestCase):
+    def test_parallel(self):
+        runner = YRunner(ex_time.COMMANDS, variables={'workers': 3})
+        start = time.monotonic()
+        self.assertEqual(runner.run(PARALLEL_YAML), 0)
+        self.assertLess(time.monotonic() - start, 0.8)  # Sequentially, would take 0.9 seconds
+        variables = runner.variables
+        self.assertEqual((variables['a'], variables['b']), (2, 3))
+        self.assertEqual(variables['x0'], 1)  # Not merged
+        self.assertNotIn('c', variables)  # Not merged
+        self.assertEqual([r.get('c') for r in variables['results']], [None, None, 3])
+        self.assertEqual(variables['results'][1]['x0'], 100)
+
+    def test_merge_existing(self):
+        runner = YRunner()
+        self.assertEqual(runner.run(MERGE_EXISTING_YAML), 0)
+        self.assertEqual((runner.variables['x'], runner.variables['y']), (2, 3))
+
+        async_runner = AsyncYRunner()
+        self.assertEqual(asyncio.run(async_runner.run(MERGE_EXISTING_YAML)), 0)
+        self.assertEqual((async_runner.variables['x'], async_runner.variables['y']), (2, 3))
+
+        # Last branch wins, even when setting the value of before the fork
+        for other in (YRunner(), YRunner(use_vm=True)):
+            self.assertEqual(other.run(MERGE_SAME_VALUE_YAML), 0)
+            self.assertEqual(other.variables['x'], 1)
+        async_runner = AsyncYRunner()
+        self.assertEqual(asyncio.run(async_runner.run(MERGE_SAME_VALUE_YAML)), 0)
+        self.assertEqual(async_runner.variables['x'], 1)
+
+    def test_max_workers(self):
+        runner = YRunner(ex_time.COMMANDS, variables={'workers': 1})
+        start = time.monotonic()
+        self.assertEqual(runner.run(PARALLEL_YAML), 0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+    def test_error(self):
+        runner = YRunner()
+        self.assertEqual(runner.run(ERROR_YAML), -1)
+        self.assertIsInstance(runner.error.__cause__.__cause__, ZeroDivisionError)
+        self.assertNotIn('a', runner.variables)
+
+    def test_exit(self):
+        runner = YRunner(ex_time.COMMANDS)
+        self.assertEqual(runner.run(EXIT_YAML), 7)
+        self.assertNotIn('after', runner.variables)
+
+    def test_break_does_not_cross_branch(self):
+        runner = YRunner()
+        self.assertEqual(runner.run(BREAK_YAML), -1)
+        self.assertIsInstance(runner.error, exceptions.YRunnerInvalidCommand)
+
+    def test_async(self):
+        runner = AsyncYRunner(ex_time.ASYNC_COMMANDS, variables={'workers': 3})
+        start = time.monotonic()
+        self.assertEqual(asyncio.run(runner.run(PARALLEL_YAML)), 0)
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertEqual((runner.variables['a'], runner.variables['b'], runner.variables['x0']), (2, 3, 1))
+        self.assertEqual(asyncio.run(AsyncYRunner(ex_time.ASYNC_COMMANDS).run(EXIT_YAML)), 7)
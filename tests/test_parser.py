@@ -0,0 +1,128 @@
+from unittest import TestCase
+import logging
+
+from yrunner import YRunner, parser, cache
+
+LOOP_YAML = '''
+---
+- set:
+    var: x0
+    value: 10
+- while:
+    condition: x0 > 0
+    commands:
+        - set:
+            var: x0
+            value: x0 - 1
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestExpressionCache(TestCase):
+    def setUp(self) -> None:
+        parser.EXPRESSION_CACHE.clear()
+
+    def test_compile_once(self):
+        compiled = parser.compile_expression('x0 * 2 + 1')
+        self.assertIs(parser.compile_expression('x0 * 2 + 1'), compiled)
+        self.assertEqual(compiled.evaluate({'x0': 3}), 7)
+        self.assertEqual(compiled.evaluate({'x0': 5}), 11)
+        info = parser.EXPRESSION_CACHE.info()
+        self.assertEqual((info.hits, info.misses, info.size), (1, 1, 1))
+
+    def test_loop_hits_cache(self):
+        runner = YRunner()
+        result_code = runner.run(LOOP_YAML)
+        self.assertEqual(result_code, 0)
+        self.assertEqual(runner.variables['x0'], 0)
+        info = parser.EXPRESSION_CACHE.info()
+        # "x0 > 0" and "x0 - 1" are compiled once, loop iterations use the compiled program
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 0)
+        # Raw (not compiled) expressions are looked up on the cache
+        runner.eval_expr('x0 > 0')
+        self.assertEqual(parser.EXPRESSION_CACHE.info().hits, 1)
+
+    def test_lru_eviction(self):
+        lru: cache.LRUCache[str, int] = cache.LRUCache(maxsize=2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        self.assertEqual(lru.get('a'), 1)  # 'b' is now the least recently used
+        lru.put('c', 3)
+        self.assertNotIn('b', lru)
+        self.assertIn('a', lru)
+        self.assertEqual(lru.info().evictions, 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.info().misses, 1)
+
+
+class TestCompiledExpression(TestCase):
+    EXPRESSIONS = [
+        ('x0 * 2 + 1', 7),
+        ('x0 > 2 and x1 == "hello"', True),
+        ('x0 < 2 or x1 != "hello"', False),
+        ('(x0 + 1) * (x0 - 1)', 8),
+        ('2 ** 3 ** 2', 512),
+        ('x0 <= 3 && x0 >= 3', True),
+        ('not x0 == 3', False),
+        ('x1 + " world"', 'hello world'),
+        ('-x0 + 10 % 4', -1),
+    ]
+
+    def test_same_as_interpreter(self):
+        variables = {'x0': 3, 'x1': 'hello'}
+        for expression, expected in self.EXPRESSIONS:
+            compiled = parser.compile_expression(expression)
+            self.assertEqual(compiled.evaluate(variables), expected, expression)
+            self.assertEqual(parser.eval_rpn(compiled.rpn, variables), expected, expression)
+
+    def test_short_circuit(self):
+        # Right operands would fail (division by zero, unknown variable) if evaluated
+        self.assertFalse(parser.eval_expression('x0 != 0 and 10 / x0 > 1', {'x0': 0}))
+        self.assertTrue(parser.eval_expression('x0 == 0 || missing > 1', {'x0': 0}))
+        with self.assertRaises(ZeroDivisionError):
+            parser.eval_expression('x0 == 0 and 10 / x0 > 1', {'x0': 0})
+
+    def test_unknown_variable(self):
+        with self.assertRaisesRegex(Exception, 'Unknown variable missing'):
+            parser.eval_expression('missing + 1', {})
+
+
+class TestTokenize(TestCase):
+    def test_longest_match(self):
+        self.assertEqual(
+            [t.type for t in parser.tokenize('a<=b>=c**d')],
+            [
+                parser.TokenType.VARIABLE,
+                parser.TokenType.LE,
+                parser.TokenType.VARIABLE,
+                parser.TokenType.GE,
+                parser.TokenType.VARIABLE,
+                parser.TokenType.POW,
+                parser.TokenType.VARIABLE,
+            ],
+        )
+
+    def test_keywords_are_whole_words(self):
+        tokens = parser.tokenize('order and nothing or android')
+        self.assertEqual([t.value for t in tokens], ['order', 'and', 'nothing', 'or', 'android'])
+        self.assertEqual(tokens[1].type, parser.TokenType.AND)
+        self.assertEqual(tokens[2].type, parser.TokenType.VARIABLE)
+
+    def test_unary_and_binary(self):
+        self.assertEqual(parser.eval_expression('x - -1', {'x': 1}), 2)
+        self.assertEqual(parser.eval_expression('-(x + 1) * 2', {'x': 1}), -4)
+        self.assertEqual(parser.eval_expression('"a" + "b"', {}), 'ab')
+        self.assertTrue(parser.eval_expression('not not x', {'x': 1}))
+        self.assertTrue(parser.eval_expression('!x', {'x': 0}))
+
+    def test_strings(self):
+        tokens = parser.tokenize('"a \\"quoted\\" \\n string" + \'it\\\'s\'')
+        self.assertEqual(tokens[0], parser.Token(parser.TokenType.STRING, 'a "quoted" \n string'))
+        self.assertEqual(tokens[2], parser.Token(parser.TokenType.STRING, "it's"))
+
+    def test_invalid(self):
+        for expression in ['"unclosed', 'x y', '* 2', 'x = 1', '(x + 1']:
+            with self.assertRaises(Exception, msg=expression):
+                parser.eval_expression(expression, {'x': 1, 'y': 2})
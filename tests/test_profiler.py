@@ -0,0 +1,87 @@
+from unittest import TestCase
+import asyncio
+import logging
+import os
+import tempfile
+
+from yrunner import YRunner, AsyncYRunner, source
+from yrunner.profiler import Profiler
+from yrunner.executors import time
+
+SCRIPT_YAML = '''\
+---
+- set:
+    var: x1
+    value: 0
+- while:
+    condition: x1 < 20
+    commands:
+        - set:
+            var: x1
+            value: x1 + 1
+        - if:
+            condition: x1 % 5 == 0
+            commands:
+                - sleep:
+                    value: 0.005
+                - break
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestProfiler(TestCase):
+    def test_source_marks(self):
+        nodes = source.load_yaml(SCRIPT_YAML, marks=True)
+        self.assertIsInstance(nodes, source.SourceList)
+        self.assertEqual(nodes, source.load_yaml(SCRIPT_YAML))
+        self.assertEqual(nodes.marks, [source.Mark(2, 3), source.Mark(5, 3)])
+        self.assertEqual(nodes[1]['while'].marks['condition'], source.Mark(6, 16))
+
+        runner = YRunner(time.COMMANDS)
+        self.assertIsNone(runner.compile(SCRIPT_YAML).steps[0].source)  # Only kept when needed
+        runner.source_marks = True
+        steps = runner.compile(SCRIPT_YAML).steps
+        self.assertEqual(steps[1].source, source.Source(source.Mark(5, 3), {'x1 < 20': source.Mark(6, 16)}))
+        nested = steps[1].node['while']['commands']
+        self.assertEqual([step.source.mark.line for step in nested], [8, 11])  # type: ignore
+        self.assertEqual(nested[1].node['if']['commands'][1].source.mark.line, 16)  # Simple commands also
+
+    def test_profile(self):
+        profiler = Profiler()
+        runner = YRunner(time.COMMANDS, instruments=[profiler], use_vm=True)
+        self.assertTrue(runner.source_marks)
+        self.assertEqual(runner.run(SCRIPT_YAML), 0)
+        counts = {line: timing.count for line, timing in profiler.lines.items()}
+        self.assertEqual(counts, {2: 1, 5: 1, 6: 5, 8: 5, 10: 5, 11: 5, 12: 5, 14: 1, 16: 1})
+        self.assertGreaterEqual(profiler.lines[14].self_time, 0.005)  # Sleep
+        self.assertGreaterEqual(profiler.lines[5].total, profiler.lines[14].total)
+        self.assertLess(profiler.lines[5].self_time, 0.005)
+        self.assertEqual(profiler.names[6], ['x1 < 20'])
+
+        report = profiler.report(SCRIPT_YAML).splitlines()
+        self.assertIn('- sleep:', report[1])  # Sorted by self time
+        stacks = dict(line.rsplit(' ', 1) for line in profiler.collapsed())
+        self.assertGreaterEqual(int(stacks['while (line 5);if (line 11);sleep (line 14)']), 5000)
+        self.assertIn('while (line 5);if (line 11);x1 % 5 == 0 (line 12)', stacks)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.collapsed')
+            profiler.write_collapsed(path)
+            with open(path) as f:
+                self.assertEqual(f.read().splitlines(), profiler.collapsed())
+
+    def test_stream_lines(self):
+        profiler = Profiler()
+        runner = YRunner(time.COMMANDS, instruments=[profiler])
+        stream = '- set:\n    var: a\n    value: 1 + 1\n---\n- set:\n    var: b\n    value: a + 1\n'
+        self.assertEqual(runner.run_stream(stream), 0)
+        self.assertEqual(sorted(profiler.lines), [1, 3, 5, 7])  # Lines of the stream, not of each document
+
+        profiler = Profiler()
+        async_runner = AsyncYRunner(time.ASYNC_COMMANDS, instruments=[profiler])
+        self.assertEqual(asyncio.run(async_runner.run_stream(stream)), 0)
+        self.assertEqual(sorted(profiler.lines), [1, 3, 5, 7])
+
+        nodes = source.load_yaml('- set:\n    var: b\n    value: a + 1\n', marks=True, line_offset=4)
+        self.assertEqual((nodes.marks, nodes[0]['set'].marks['value']), ([source.Mark(5, 3)], source.Mark(7, 12)))
@@ -0,0 +1,112 @@
+from unittest import TestCase
+import concurrent.futures
+import email.utils
+import tempfile
+import threading
+import time
+
+from yrunner import YRunner, ratelimit
+from yrunner.executors import http
+
+from .local_server import LocalServer
+
+LIMITED_YAML = '''
+---
+- set:
+    var: n
+    value: 0
+- while:
+    condition: n < 5
+    commands:
+        - request:
+            method: GET
+            url: "{{ base_url }}/limited"
+            select: [status_code]
+            response_var: response
+        - set:
+            var: n
+            value: n + 1
+'''
+
+
+class TestRateLimit(TestCase):
+    def test_bucket(self):
+        bucket = ratelimit.Bucket(ratelimit.Limits(rate=10, burst=2))
+        waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0, 0])  # The burst
+        self.assertAlmostEqual(waits[2], 0.1, delta=0.02)
+        self.assertAlmostEqual(waits[3], 0.2, delta=0.02)
+
+        bucket = ratelimit.Bucket(ratelimit.Limits())  # No rate, only pauses
+        self.assertLessEqual(bucket.reserve(), 0)
+        bucket.pause(0.5)
+        self.assertAlmostEqual(bucket.reserve(), 0.5, delta=0.05)
+
+    def test_file_bucket(self):
+        # Buckets on the same file (as on different processes) share the tokens and the pauses
+        limits = ratelimit.Limits(rate=10, burst=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/host.bucket'
+            first, second = ratelimit.FileBucket(path, limits), ratelimit.FileBucket(path, limits)
+            self.assertEqual(first.reserve(), 0)
+            self.assertAlmostEqual(second.reserve(), 0.1, delta=0.02)
+            second.pause(1)
+            self.assertAlmostEqual(first.reserve(), 1, delta=0.05)  # Next token once the pause ends
+
+            shared = ratelimit.limiter('host:80', limits, directory)
+            self.assertIsInstance(shared.bucket, ratelimit.FileBucket)
+            self.assertIs(ratelimit.limiter('host:80', limits, directory), shared)
+            self.assertIsNot(ratelimit.limiter('host:80', limits), shared)
+
+    def test_concurrency(self):
+        limiter = ratelimit.Limiter(ratelimit.Bucket(ratelimit.Limits(concurrency=2)))
+        lock = threading.Lock()
+        running = []
+
+        def work(_):
+            with limiter.slot():
+                with lock:
+                    running.append(len(running) and running[-1] + 1 or 1)
+                time.sleep(0.01)
+                with lock:
+                    running.append(running[-1] - 1)
+
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            list(executor.map(work, range(16)))
+        self.assertEqual(max(running), 2)
+
+    def test_retry_after(self):
+        self.assertEqual(http.retry_after('3'), 3)
+        self.assertIsNone(http.retry_after('soon'))
+        self.assertIsNone(http.retry_after(None))
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(http.retry_after(date), 30, delta=2)
+        self.assertEqual(http.retry_after(email.utils.formatdate(0, usegmt=True)), 0)
+
+    def test_retry_statuses(self):
+        settings = http.HttpSettings(max_retries=3, retry_statuses=(429,))
+        with LocalServer() as server:
+            server.refuse = 2
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url}, settings={'http': settings})
+            self.assertEqual(runner.run(LIMITED_YAML), 0)
+            self.assertEqual(runner.variables['response'], {'status_code': 200})
+            self.assertEqual(server.requests, 7)  # 2 refused and retried
+
+            # Once retries are exhausted, the last response is returned
+            server.refuse = 3
+            runner = YRunner(
+                http.COMMANDS,
+                variables={'base_url': server.url},
+                settings={'http': http.HttpSettings(max_retries=1, retry_statuses=(429,))},
+            )
+            self.assertEqual(runner.run(LIMITED_YAML.replace('n < 5', 'n < 1')), 0)
+            self.assertEqual(runner.variables['response'], {'status_code': 429})
+
+    def test_rate_limit(self):
+        settings = http.HttpSettings(rate_limit=20, rate_burst=1, max_per_host=1)
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url}, settings={'http': settings})
+            start = time.perf_counter()
+            self.assertEqual(runner.run(LIMITED_YAML), 0)
+            self.assertGreaterEqual(time.perf_counter() - start, 0.18)  # 4 waits of 1/20 seconds
+            self.assertEqual(server.requests, 5)
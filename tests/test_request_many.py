@@ -0,0 +1,115 @@
+from unittest import TestCase
+import asyncio
+import logging
+
+from yrunner import YRunner, AsyncYRunner, exceptions
+from yrunner.executors import http
+
+from .local_server import LocalServer
+
+REQUEST_MANY_YAML = '''
+---
+- request_many:
+    items: ids
+    max_concurrency: 4
+    method: GET
+    url: "{{ base_url }}/items/{{ item }}"
+    params:
+        page: "{{ item * 10 }}"
+    headers:
+        X-Item: "{{ item }}"
+    select: [status_code, json]
+    response_var: responses
+'''
+
+SELECT_ONE_YAML = '''
+---
+- request_many:
+    items: ids
+    item_var: id
+    method: GET
+    url: "{{ base_url }}/items/{{ id }}"
+    select: status_code
+    response_var: statuses
+'''
+
+INVALID_SELECT_YAML = '''
+---
+- request_many:
+    items: ids
+    method: GET
+    url: "{{ base_url }}/items/{{ item }}"
+    select: not_an_attribute
+    response_var: statuses
+'''
+
+# The second url is invalid, so the request fails before being sent
+FAILING_ITEM_YAML = '''
+---
+- request_many:
+    items: urls
+    max_concurrency: 1
+    method: GET
+    url: "{{ item }}"
+    response_var: responses
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestRequestMany(TestCase):
+    def test_request_many(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url, 'ids': list(range(40))})
+            self.assertEqual(runner.run(REQUEST_MANY_YAML), 0)
+            self.assertEqual(server.requests, 40)
+            self.assertLessEqual(server.connections, 4)
+        responses = runner.variables['responses']
+        self.assertEqual(len(responses), 40)
+        for i, response in enumerate(responses):  # In input order
+            self.assertEqual(response['status_code'], 200)
+            self.assertEqual(response['json']['path'], f'/items/{i}')
+            self.assertEqual(response['json']['args'], {'page': str(i * 10)})
+            self.assertEqual(response['json']['headers']['X-Item'], str(i))
+        self.assertNotIn('item', runner.variables)
+
+    def test_select_one(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url, 'ids': [1, 2, 3], 'id': 'kept'})
+            self.assertEqual(runner.run(SELECT_ONE_YAML), 0)
+        self.assertEqual(runner.variables['statuses'], [200, 200, 200])
+        self.assertEqual(runner.variables['id'], 'kept')  # Item variable is restored
+
+    def test_invalid_select(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url, 'ids': [1]})
+            self.assertEqual(runner.run(INVALID_SELECT_YAML), -1)
+        self.assertIsInstance(runner.error, exceptions.YRunnerInvalidParameter)
+
+    def test_async(self):
+        with LocalServer() as server:
+            runner = AsyncYRunner(http.ASYNC_COMMANDS, variables={'base_url': server.url, 'ids': list(range(10))})
+            self.assertEqual(asyncio.run(runner.run(REQUEST_MANY_YAML)), 0)
+        self.assertEqual([r['json']['path'] for r in runner.variables['responses']], [f'/items/{i}' for i in range(10)])
+
+    def test_failing_item(self):
+        # Once an item fails, the pending ones are not requested (at most one already started)
+        with LocalServer() as server:
+            urls = [f'{server.url}/items/{i}' for i in range(5)]
+            urls[1] = 'http://[invalid'
+            runner = YRunner(http.COMMANDS, variables={'urls': urls})
+            self.assertEqual(runner.run(FAILING_ITEM_YAML), -1)
+            self.assertLessEqual(server.requests, 2)
+            self.assertNotIn('responses', runner.variables)
+
+        async def run_and_wait(runner: AsyncYRunner) -> int:
+            code = await runner.run(FAILING_ITEM_YAML)
+            await asyncio.sleep(0.2)  # Requests not cancelled would be issued meanwhile
+            return code
+
+        with LocalServer() as server:
+            urls = [f'{server.url}/items/{i}' for i in range(5)]
+            urls[1] = 'http://[invalid'
+            async_runner = AsyncYRunner(http.ASYNC_COMMANDS, variables={'urls': urls})
+            self.assertEqual(asyncio.run(run_and_wait(async_runner)), -1)
+            self.assertLessEqual(server.requests, 2)
@@ -0,0 +1,149 @@
+from unittest import TestCase
+import asyncio
+import logging
+import mmap
+import os
+import tempfile
+
+from yrunner import YRunner, AsyncYRunner, exceptions
+from yrunner.executors import http
+
+from .local_server import LocalServer
+
+PROJECTION_YAML = '''
+---
+- request:
+    method: GET
+    url: "{{ base_url }}/items/1?page=2"
+    select:
+        status: status_code
+        type: header:Content-Type
+        missing: header:X-Missing
+        path: json:path
+        page: json:args.page
+        not_found: json:args.other.x
+        elapsed: elapsed
+    response_var: response
+'''
+
+DOWNLOAD_YAML = '''
+---
+- request:
+    method: GET
+    url: "{{ base_url }}/bytes/{{ size }}"
+    download: "{{ directory }}/body-{{ size }}.bin"
+    select: [status_code, file, mmap]
+    response_var: response
+'''
+
+DOWNLOAD_MANY_YAML = '''
+---
+- request_many:
+    items: sizes
+    method: GET
+    url: "{{ base_url }}/bytes/{{ item }}"
+    download: "{{ directory }}/many-{{ item }}.bin"
+    select: file
+    response_var: files
+'''
+
+logger = logging.getLogger(__name__)
+
+
+# Enough of a requests.Response for projections
+class Response:
+    parsed = 0
+    closed = False
+
+    def json(self):
+        self.parsed += 1
+        return {'a': [{'b': 1}, {'b': 2}]}
+
+    def close(self):
+        self.closed = True
+
+
+def expected_body(size: int) -> bytes:
+    return bytes(i % 256 for i in range(size))
+
+
+class TestResponse(TestCase):
+    def test_projection(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url})
+            self.assertEqual(runner.run(PROJECTION_YAML), 0)
+        response = runner.variables['response']
+        elapsed = response.pop('elapsed')
+        self.assertIsInstance(elapsed, float)
+        self.assertEqual(
+            response,
+            {
+                'status': 200,
+                'type': 'application/json',
+                'missing': None,
+                'path': '/items/1',
+                'page': '2',
+                'not_found': None,
+            },
+        )
+
+    def test_json_parsed_once(self):
+        response = Response()
+        self.assertEqual(
+            http.project(response, ['json:a.1.b', 'json:a.0.b', 'json']),
+            {'json:a.1.b': 2, 'json:a.0.b': 1, 'json': {'a': [{'b': 1}, {'b': 2}]}},
+        )
+        self.assertEqual(response.parsed, 1)
+        self.assertTrue(response.closed)
+
+    def test_invalid_select(self):
+        for name in ('not_an_attribute', 'header:', 'other:x'):
+            with self.assertRaises(exceptions.YRunnerInvalidParameter):
+                http.project(Response(), name)
+
+    def test_download(self):
+        settings = {'http': http.HttpSettings(download_chunk_size=1000)}  # Many chunks
+        with LocalServer() as server, tempfile.TemporaryDirectory() as directory:
+            for size in (0, 1, 10000):
+                runner = YRunner(
+                    http.COMMANDS,
+                    settings=settings,
+                    variables={'base_url': server.url, 'directory': directory, 'size': size},
+                )
+                self.assertEqual(runner.run(DOWNLOAD_YAML), 0)
+                response = runner.variables['response']
+                self.assertEqual(response['status_code'], 200)
+                self.assertEqual(response['file'], os.path.join(directory, f'body-{size}.bin'))
+                with open(response['file'], 'rb') as f:
+                    self.assertEqual(f.read(), expected_body(size))
+                self.assertEqual(bytes(response['mmap']), expected_body(size))
+                if size:
+                    self.assertIsInstance(response['mmap'], mmap.mmap)
+                    response['mmap'].close()
+
+    def test_download_without_select(self):
+        with LocalServer() as server, tempfile.TemporaryDirectory() as directory:
+            variables = {'base_url': server.url, 'directory': directory, 'size': 100}
+            runner = YRunner(http.COMMANDS, variables=variables)
+            self.assertEqual(runner.run(DOWNLOAD_YAML.replace('    select: [status_code, file, mmap]\n', '')), 0)
+            response = runner.variables['response']
+            self.assertEqual(set(response), {'status_code', 'headers', 'file'})  # Not the consumed response
+            self.assertEqual(response['status_code'], 200)
+            self.assertEqual(response['headers']['Content-Length'], '100')
+            with open(response['file'], 'rb') as f:
+                self.assertEqual(f.read(), expected_body(100))
+
+    def test_download_many(self):
+        with LocalServer() as server, tempfile.TemporaryDirectory() as directory:
+            variables = {'base_url': server.url, 'directory': directory, 'sizes': [10, 20, 30]}
+            runner = YRunner(http.COMMANDS, variables=variables)
+            self.assertEqual(runner.run(DOWNLOAD_MANY_YAML), 0)
+            files = runner.variables['files']
+            self.assertEqual(files, [os.path.join(directory, f'many-{size}.bin') for size in (10, 20, 30)])
+            for size, path in zip((10, 20, 30), files):
+                self.assertEqual(os.path.getsize(path), size)
+
+            runner = AsyncYRunner(http.ASYNC_COMMANDS, variables={**variables, 'size': 5})
+            self.assertEqual(asyncio.run(runner.run(DOWNLOAD_YAML)), 0)
+            self.assertEqual(bytes(runner.variables['response']['mmap']), expected_body(5))
+            runner.variables['response']['mmap'].close()
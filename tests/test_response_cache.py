@@ -0,0 +1,101 @@
+from unittest import TestCase
+import asyncio
+
+from yrunner import YRunner, AsyncYRunner, httpcache
+from yrunner.executors import http
+
+from .local_server import LocalServer
+
+POLL_YAML = '''
+---
+- set:
+    var: n
+    value: 0
+- while:
+    condition: n < 5
+    commands:
+        - request:
+            method: GET
+            url: "{{ base_url }}/versioned"
+            params:
+                page: "{{ n % 2 }}"
+            cache: ttl
+            select: json:version
+            response_var: version
+        - set:
+            var: n
+            value: n + 1
+'''
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, content: bytes, headers=None) -> None:
+        self.content = content
+        self.headers = headers or {}
+
+
+class TestResponseCache(TestCase):
+    def setUp(self) -> None:
+        httpcache.RESPONSE_CACHE.clear()
+
+    def test_ttl(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url, 'ttl': 60}, stats=True)
+            self.assertEqual(runner.run(POLL_YAML), 0)
+            self.assertEqual(runner.variables['version'], 0)
+            self.assertEqual(server.requests, 2)  # One per distinct params
+            self.assertEqual(runner.stats.response_cache.hits, 3)
+            self.assertEqual(runner.stats.response_cache.misses, 2)
+            self.assertIn('Response cache: 3 hits, 2 misses', runner.stats.report())
+
+            # Not cached unless requested
+            runner = YRunner(http.COMMANDS, variables={'base_url': server.url})
+            self.assertEqual(runner.run(POLL_YAML.replace('cache: ttl', '')), 0)
+            self.assertEqual(server.requests, 7)
+
+    def test_revalidation(self):
+        with LocalServer() as server:
+            runner = AsyncYRunner(http.ASYNC_COMMANDS, variables={'base_url': server.url, 'ttl': 0})
+            self.assertEqual(asyncio.run(runner.run(POLL_YAML)), 0)
+            self.assertEqual(server.requests, 5)  # Expired at once, but not modified
+            self.assertEqual(httpcache.RESPONSE_CACHE.revalidations, 3)
+            self.assertEqual(httpcache.RESPONSE_CACHE.info()[:2], (3, 2))
+
+            server.version = 1
+            self.assertEqual(asyncio.run(runner.run(POLL_YAML)), 0)
+            self.assertEqual(runner.variables['version'], 1)
+            self.assertEqual(httpcache.RESPONSE_CACHE.revalidations, 6)  # Same 3, once the new version is cached
+
+    def test_key(self):
+        args = {'method': 'get', 'url': 'http://h/a', 'params': {'b': '1', 'a': '2'}}
+        self.assertEqual(
+            httpcache.request_key(args), httpcache.request_key({**args, 'params': {'a': '2', 'b': '1'}})
+        )
+        self.assertNotEqual(httpcache.request_key(args), httpcache.request_key({**args, 'headers': {'X': '1'}}))
+        self.assertTrue(httpcache.cacheable(args))
+        self.assertFalse(httpcache.cacheable({**args, 'method': 'POST'}))
+        self.assertFalse(httpcache.cacheable({**args, 'stream': True}))
+
+    def test_eviction(self):
+        response_cache = httpcache.ResponseCache(max_bytes=3 * (httpcache.ENTRY_OVERHEAD + 100))
+        for key in 'abc':
+            response_cache.store(key, Response(b'x' * 100), 60)
+        self.assertEqual(len(response_cache), 3)
+        self.assertTrue(response_cache.lookup('a')[1])  # a is now the most recently used
+        response_cache.store('d', Response(b'x' * 100), 60)
+        self.assertEqual(response_cache.evictions, 1)
+        self.assertNotIn('b', response_cache)
+        self.assertIn('a', response_cache)
+
+        # Too big, not stored responses, and no-store ones
+        response_cache.store('e', Response(b'x' * response_cache.max_bytes), 60)
+        response_cache.store('f', Response(b'', {'Cache-Control': 'no-store'}), 60)
+        self.assertEqual(len(response_cache), 3)
+
+        response_cache.store('g', Response(b''), -1)  # Already expired
+        self.assertEqual(response_cache.lookup('g')[1], False)
+        response_cache.resize(httpcache.ENTRY_OVERHEAD + 100)
+        self.assertEqual(len(response_cache), 1)
+        self.assertLessEqual(response_cache.size, response_cache.max_bytes)
@@ -1,7 +1,8 @@
 from unittest import TestCase
 import logging
+import pickle
 
-from yrunner import YRunner
+from yrunner import YRunner, pyeval
 from yrunner import exceptions
 
 INTERNALS_YAML = '''
@@ -23,4 +24,40 @@ class TestExit(TestCase):
         self.assertEqual(result_code, -1)
         self.assertNotIn('x0', runner.variables)
         self.assertIsInstance(runner.error, exceptions.YRunnerInvalidContent)
-    
\ No newline at end of file
+    
+    def test_python_eval_validation(self):
+        runner = YRunner(variables={'items': [1, 2, 3], 'name': 'x'}, use_python_eval=True)
+        for expression in [
+            "max.__import__('os')",
+            "__import__('os')",
+            "items._private",
+            "(i for i in items).gi_frame.f_globals",
+            "'{0.__class__}'.format(items)",
+            "'{0.x}'.format_map(items)",
+            "(items := 1)",
+        ]:
+            with self.assertRaises(exceptions.YRunnerInvalidContent, msg=expression):
+                runner.eval_expr(expression)
+        self.assertEqual(runner.variables['items'], [1, 2, 3])
+
+        # Valid expressions, including lambdas and comprehensions
+        self.assertEqual(runner.eval_expr('sum(i * 2 for i in items if i > 1)'), 10)
+        self.assertEqual(runner.eval_expr('(lambda x: x + 1)(len(items))'), 4)
+        self.assertEqual(runner.eval_expr(' name.upper()'), 'X')
+        with self.assertRaises(Exception):
+            runner.eval_expr('items +')
+
+    def test_python_eval_compiled_once(self):
+        pyeval.PYTHON_CACHE.clear()
+        runner = YRunner(variables={'x0': 1}, use_python_eval=True)
+        compiled = runner.compile('- set:\n    var: x1\n    value: x0 + 1\n')
+        self.assertIsInstance(compiled.steps[0].args.value, pyeval.PythonExpression)
+        for _ in range(3):
+            self.assertEqual(runner.eval_expr('x0 * 2'), 2)
+        self.assertEqual(pyeval.PYTHON_CACHE.info().misses, 2)
+        self.assertEqual(pyeval.PYTHON_CACHE.info().hits, 2)
+
+        # Code objects are compiled again when unpickled (i.e. loaded from the disk cache)
+        copy = pickle.loads(pickle.dumps(compiled))
+        self.assertEqual(runner.run(copy), 0)
+        self.assertEqual(runner.variables['x1'], 2)
@@ -0,0 +1,150 @@
+import typing
+from unittest import TestCase
+import asyncio
+import json
+import logging
+
+from yrunner import YRunner, AsyncYRunner, instrument, parser, program
+from yrunner.executors import http, time
+
+from .local_server import LocalServer
+
+COUNTER_YAML = '''
+---
+- set:
+    var: x1
+    value: 0
+- while:
+    condition: x1 < 10
+    commands:
+        - set:
+            var: x1
+            value: x1 + 1
+        - if:
+            condition: x1 % 2 == 0
+            commands:
+                - sleep:
+                    value: 0.001
+'''
+
+REQUEST_YAML = '''
+---
+- request:
+    method: GET
+    url: "{{ base_url }}/single"
+- request_many:
+    items: ids
+    method: GET
+    url: "{{ base_url }}/items/{{ item }}"
+    select: status_code
+'''
+
+PARALLEL_YAML = '''
+---
+- parallel:
+    branches:
+        - - sleep:
+                value: 0.02
+        - - sleep:
+                value: 0.02
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class Recorder(instrument.Instrument):
+    events: typing.List[str]
+
+    def __init__(self) -> None:
+        self.events = []
+
+    def run_start(self, runner: YRunner) -> None:
+        self.events.append('run')
+
+    def run_end(self, runner: YRunner) -> None:
+        self.events.append('/run')
+
+    def command_start(self, step: program.Step) -> None:
+        self.events.append(step.command.name)
+
+    def command_end(self, step: program.Step, elapsed: float) -> None:
+        self.events.append('/' + step.command.name)
+
+
+class TestStats(TestCase):
+    def test_disabled(self):
+        runner = YRunner(time.COMMANDS)
+        self.assertIsNone(runner.stats)
+        self.assertEqual(runner.instruments, ())
+
+    def test_commands_and_expressions(self):
+        for use_vm in (False, True):  # Instrumented runs always uses the tree engine
+            runner = YRunner(time.COMMANDS, stats=True, use_vm=use_vm)
+            self.assertEqual(runner.run(COUNTER_YAML), 0)
+            stats = runner.stats
+            assert stats is not None
+            self.assertEqual(
+                {name: timing.count for name, timing in stats.commands.items()},
+                {'set': 11, 'while': 1, 'if': 10, 'sleep': 5},
+            )
+            self.assertEqual(stats.expressions['x1 < 10'].count, 11)
+            self.assertEqual(stats.expressions['x1 + 1'].count, 10)
+            self.assertNotIn('0.001', stats.expressions)  # Constants are not expressions
+            loop = stats.commands['while']
+            self.assertGreaterEqual(loop.total, stats.commands['sleep'].total)
+            self.assertLess(loop.self_time, loop.total - stats.commands['sleep'].total + 1e-6)
+            self.assertGreaterEqual(stats.commands['sleep'].max, 0.001)
+            self.assertGreaterEqual(stats.elapsed, loop.total)
+            json.dumps(stats.as_dict())
+            self.assertIn('x1 < 10', stats.report())
+
+    def test_reset_on_run(self):
+        runner = YRunner(time.COMMANDS, stats=True)
+        runner.run(COUNTER_YAML)
+        runner.run('- set:\n    var: a\n    value: 1 + 1\n')
+        assert runner.stats is not None
+        self.assertEqual(list(runner.stats.commands), ['set'])
+
+    def test_cache_activity(self):
+        runner = YRunner(stats=True)
+        expression = 'x0 * 1234567 + 7654321'
+        parser.EXPRESSION_CACHE.clear()
+        runner.run(f'- set:\n    var: x1\n    value: {expression}\n', variables={'x0': 1})
+        assert runner.stats is not None
+        self.assertEqual(runner.stats.expression_cache.misses, 1)
+        runner.run([{'set': {'var': 'x1', 'value': expression}}] * 3)  # Not compiled nodes
+        self.assertEqual(runner.stats.expression_cache.hits, 3)
+
+    def test_parallel(self):
+        runner = YRunner(time.COMMANDS, stats=True)
+        self.assertEqual(runner.run(PARALLEL_YAML), 0)
+        assert runner.stats is not None
+        self.assertEqual(runner.stats.commands['sleep'].count, 2)
+        self.assertEqual(runner.stats.commands['parallel'].count, 1)
+
+    def test_http(self):
+        with LocalServer() as server:
+            runner = YRunner(http.COMMANDS, stats=True, variables={'base_url': server.url, 'ids': [1, 2, 3]})
+            self.assertEqual(runner.run(REQUEST_YAML), 0)
+        assert runner.stats is not None
+        host = server.url.split('//')[1]
+        self.assertEqual(runner.stats.hosts[host].count, 4)
+        self.assertGreater(runner.stats.hosts[host].total, 0)
+
+    def test_instrument_events(self):
+        recorder = Recorder()
+        runner = YRunner(time.COMMANDS, instruments=[recorder])
+        runner.run(
+            '- if:\n    condition: 1\n    commands:\n        - sleep:\n            value: 0\n'
+            '- set:\n    var: a\n    value: 1\n'
+        )
+        self.assertEqual(recorder.events, ['run', 'if', 'sleep', '/sleep', '/if', 'set', '/set', '/run'])
+
+    def test_async(self):
+        runner = AsyncYRunner(time.ASYNC_COMMANDS, stats=True)
+        self.assertEqual(asyncio.run(runner.run(COUNTER_YAML)), 0)
+        self.assertEqual(asyncio.run(runner.run(PARALLEL_YAML)), 0)
+        assert runner.stats is not None
+        parallel = runner.stats.commands['parallel']
+        self.assertEqual(runner.stats.commands['sleep'].count, 2)
+        self.assertLessEqual(parallel.self_time, parallel.total)
@@ -0,0 +1,72 @@
+import typing
+from unittest import TestCase
+import asyncio
+import logging
+
+import yaml
+
+from yrunner import YRunner, AsyncYRunner, runner
+
+STREAM_YAML = '''\
+- set:
+    var: x0
+    value: 1
+---
+- set:
+    var: x1
+    value: x0 + 1
+--- # Empty document
+---
+- set:
+    var: x2
+    value: x1 + 1
+...
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class TestStream(TestCase):
+    def test_loader(self):
+        if hasattr(yaml, 'CSafeLoader'):
+            self.assertIs(runner.SafeLoader, yaml.CSafeLoader)
+        self.assertEqual(runner.load_yaml('- a: 1'), [{'a': 1}])
+
+    def test_split_documents(self):
+        stream = 'a: 1\n--- # comment\nc: |\n  ---x\n...\n%YAML 1.1\n---\nd\n--- [1, 2]\n'
+        documents = list(runner.split_documents(stream.splitlines(keepends=True)))
+        self.assertEqual(
+            documents, ['a: 1\n', '--- # comment\nc: |\n  ---x\n', '%YAML 1.1\n---\nd\n', '--- [1, 2]\n']
+        )
+        self.assertEqual([yaml.safe_load(document) for document in documents], [{'a': 1}, {'c': '---x\n'}, 'd', [1, 2]])
+
+    def test_run_stream(self):
+        yrunner = YRunner()
+        self.assertEqual(yrunner.run_stream(STREAM_YAML), 0)
+        self.assertEqual(yrunner.variables, {'x0': 1, 'x1': 2, 'x2': 3})
+
+    def test_documents_run_as_read(self):
+        yrunner = YRunner()
+        seen: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+
+        def lines() -> typing.Iterator[str]:
+            for line in STREAM_YAML.splitlines(keepends=True):
+                seen.setdefault(line.strip(), dict(yrunner.variables))  # Variables when the line is read
+                yield line
+
+        self.assertEqual(yrunner.run_stream(lines()), 0)
+        self.assertEqual(seen['var: x1'], {'x0': 1})  # First document executed before reading the second one
+        self.assertEqual(seen['var: x2'], {'x0': 1, 'x1': 2})
+
+    def test_stops_on_error(self):
+        yrunner = YRunner(use_vm=True)
+        script = '- set:\n    var: a\n    value: 1\n---\n- exit:\n    code: 3\n---\n- set:\n    var: b\n    value: 2\n'
+        self.assertEqual(yrunner.run_stream(script), 3)
+        self.assertEqual(yrunner.variables, {'a': 1})
+        self.assertEqual(yrunner.run_stream('- set:\n    var: c\n---\n- [invalid', variables={}), -1)
+        self.assertIsNotNone(yrunner.error)
+
+    def test_async_run_stream(self):
+        yrunner = AsyncYRunner()
+        self.assertEqual(asyncio.run(yrunner.run_stream(STREAM_YAML)), 0)
+        self.assertEqual(yrunner.variables, {'x0': 1, 'x1': 2, 'x2': 3})
@@ -0,0 +1,50 @@
+import typing
+from unittest import TestCase
+import logging
+
+from yrunner import YRunner, runner as yrunner
+
+logger = logging.getLogger(__name__)
+
+
+# Counts the reads of each variable
+class CountingDict(dict):
+    reads: typing.Dict[str, int]
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.reads = {}
+
+    def __getitem__(self, key: str) -> typing.Any:
+        self.reads[key] = self.reads.get(key, 0) + 1
+        return super().__getitem__(key)
+
+
+class TestTemplate(TestCase):
+    def test_render(self):
+        runner = YRunner(variables={'x0': 5, 'name': 'world'})
+        self.assertEqual(runner.eval_string('hello {{ name }}, {{x0 + 1}} times'), 'hello world, 6 times')
+        self.assertEqual(runner.eval_string('no placeholders'), 'no placeholders')
+        self.assertEqual(runner.eval_string('{{ x0 }}'), '5')
+
+    def test_compiled_once(self):
+        runner = YRunner()
+        template = runner.compile_template('{{ a }}/{{ b }}')
+        self.assertIs(runner.compile_template('{{ a }}/{{ b }}'), template)
+        self.assertIsInstance(template, yrunner.CompiledTemplate)
+        self.assertEqual(template.parts, (0, '/', 1))
+
+    def test_duplicates_evaluated_once(self):
+        variables = CountingDict(x0=3)
+        runner = YRunner(variables=variables)
+        self.assertEqual(runner.eval_string('{{ x0 }}-{{ x0 }}-{{x0}}'), '3-3-3')
+        self.assertEqual(variables.reads['x0'], 1)
+
+    def test_values_not_substituted(self):
+        # Value of a contains the text of another placeholder, must be kept as is
+        runner = YRunner(variables={'a': '{{ b }}', 'b': 'B'})
+        self.assertEqual(runner.eval_string('{{ a }} {{ b }}'), '{{ b }} B')
+
+    def test_python_eval(self):
+        runner = YRunner(variables={'items': [1, 2, 3]}, use_python_eval=True)
+        self.assertEqual(runner.eval_string('total: {{ sum(items) }}'), 'total: 6')
@@ -0,0 +1,130 @@
+import typing
+from unittest import TestCase
+import asyncio
+import collections
+import json
+import logging
+import os
+import tempfile
+
+from yrunner import YRunner, AsyncYRunner
+from yrunner.trace import Tracer
+from yrunner.executors import http, time
+
+from .local_server import LocalServer
+
+LOOP_YAML = '''
+---
+- set:
+    var: x1
+    value: 0
+- while:
+    condition: x1 < count
+    commands:
+        - set:
+            var: x1
+            value: x1 + 1
+        - if:
+            condition: x1 == count
+            commands:
+                - sleep:
+                    value: 0.001
+'''
+
+REQUEST_YAML = '''
+---
+- request:
+    method: GET
+    url: "{{ base_url }}/single"
+- request_many:
+    items: [1, 2, 3]
+    method: GET
+    url: "{{ base_url }}/items/{{ item }}"
+    select: status_code
+'''
+
+PARALLEL_YAML = '''
+---
+- parallel:
+    branches:
+        - - sleep:
+                value: 0.01
+        - - sleep:
+                value: 0.01
+'''
+
+logger = logging.getLogger(__name__)
+
+Events = typing.List[typing.Dict[str, typing.Any]]
+
+
+class TestTrace(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'trace.json')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def load(self) -> Events:
+        with open(self.path) as f:
+            return json.load(f)
+
+    def check_nesting(self, events: Events) -> None:
+        stacks: typing.Dict[int, typing.List[str]] = collections.defaultdict(list)
+        for event in events:
+            if event['ph'] == 'B':
+                stacks[event['tid']].append(event['name'])
+            elif event['ph'] == 'E':
+                self.assertEqual(stacks[event['tid']].pop(), event['name'])
+        self.assertFalse(any(stacks.values()))
+
+    def test_commands(self):
+        with Tracer(self.path) as tracer:
+            runner = YRunner(time.COMMANDS, instruments=[tracer], variables={'count': 10})
+            self.assertEqual(runner.run(LOOP_YAML), 0)
+        events = self.load()
+        self.check_nesting(events)
+        begins = [event for event in events if event['ph'] == 'B']
+        counts = collections.Counter(event['name'] for event in begins)
+        self.assertEqual(counts, {'run': 1, 'set': 11, 'while': 1, 'if': 10, 'sleep': 1})
+        depths = {event['name']: event['args']['depth'] for event in begins if event['name'] != 'run'}
+        self.assertEqual(depths, {'set': 1, 'while': 0, 'if': 1, 'sleep': 2})
+        self.assertEqual([event['args']['line'] for event in begins[1:4]], [3, 6, 9])
+        sleep_end = next(event for event in events if event['ph'] == 'E' and event['name'] == 'sleep')
+        self.assertEqual(sleep_end['args'], {'sleep': 0.001})
+        self.assertEqual(sorted(event['ts'] for event in events), [event['ts'] for event in events])
+
+    def test_bounded(self):
+        tracer = Tracer(self.path, max_pending=8, batch_size=4)
+        self.assertEqual(tracer._queue.maxsize, 2)
+        runner = YRunner(time.COMMANDS, instruments=[tracer], variables={'count': 2000})
+        self.assertEqual(runner.run(LOOP_YAML), 0)
+        self.assertEqual(runner.run(LOOP_YAML, variables={'count': 10}), 0)  # Appended to the same trace
+        tracer.close()
+        events = self.load()
+        self.check_nesting(events)
+        # Run begin/end plus begin/end of each command: set, while, (set, if) per iteration and sleep
+        self.assertEqual(len(events), sum(2 + 2 * (3 + 2 * count) for count in (2000, 10)))
+
+    def test_http(self):
+        with LocalServer() as server, Tracer(self.path) as tracer:
+            runner = YRunner(http.COMMANDS, instruments=[tracer], variables={'base_url': server.url})
+            self.assertEqual(runner.run(REQUEST_YAML), 0)
+        events = self.load()
+        request_end = next(event for event in events if event['ph'] == 'E' and event['name'] == 'request')
+        self.assertEqual(request_end['args'], {'url': server.url + '/single', 'status': 200})
+        requests = [event for event in events if event['ph'] == 'X']
+        self.assertEqual(len(requests), 4)
+        self.assertEqual(requests[0]['name'], f'GET {server.url}/single')
+        self.assertTrue(all(event['dur'] > 0 and event['cat'] == 'http' for event in requests))
+
+    def test_async(self):
+        with Tracer(self.path) as tracer:
+            runner = AsyncYRunner(time.ASYNC_COMMANDS, instruments=[tracer])
+            self.assertEqual(asyncio.run(runner.run(PARALLEL_YAML)), 0)
+        events = self.load()
+        self.check_nesting(events)  # Per task
+        sleeps = [event for event in events if event['name'] == 'sleep' and event['ph'] == 'B']
+        self.assertEqual(len({event['tid'] for event in sleeps}), 2)
+        self.assertEqual([event['args']['depth'] for event in sleeps], [1, 1])
@@ -0,0 +1,112 @@
+import typing
+from unittest import TestCase
+import logging
+
+from yrunner import YRunner, vm, types
+
+LOOPS_YAML = '''
+---
+- set:
+    var: total
+    value: 0
+- set:
+    var: i
+    value: 0
+- while:
+    condition: i < 10
+    commands:
+        - set:
+            var: i
+            value: i + 1
+        - if:
+            condition: i % 2 == 0
+            commands:
+                - continue
+        - set:
+            var: j
+            value: 0
+        - while:
+            condition: 1
+            commands:
+                - set:
+                    var: j
+                    value: j + 1
+                - if:
+                    condition: j >= i
+                    commands:
+                        - break
+        - set:
+            var: total
+            value: total + j
+- exit:
+    code: total
+'''
+
+BREAK_OUTSIDE_YAML = '''
+---
+- set:
+    var: x0
+    value: 1
+- break
+'''
+
+ERROR_YAML = '''
+---
+- set:
+    var: x0
+    value: 0
+- while:
+    condition: x0 < 1
+    commands:
+        - set:
+            var: x0
+            value: 1 / x0
+'''
+
+logger = logging.getLogger(__name__)
+
+
+def nested_ifs(depth: int) -> typing.List[typing.Any]:
+    innermost: typing.List[typing.Any] = [{'set': {'var': 'reached', 'value': 'depth'}}]
+    block = innermost
+    for _ in range(depth):
+        block = [{'if': {'condition': 'depth > 0', 'commands': block}}]
+    return [{'set': {'var': 'depth', 'value': depth}}] + block
+
+
+class TestVM(TestCase):
+    def test_loops(self):
+        # Sum of odd numbers from 1 to 9
+        for use_vm in (False, True):
+            runner = YRunner(use_vm=use_vm)
+            self.assertEqual(runner.run(LOOPS_YAML), 25)
+            self.assertEqual(runner.variables['i'], 10)
+
+    def test_break_outside_loop(self):
+        runner = YRunner(use_vm=True)
+        self.assertEqual(runner.run(BREAK_OUTSIDE_YAML), -1)
+        self.assertEqual(runner.variables['x0'], 1)
+
+    def test_error_wrapped_once(self):
+        runner = YRunner(use_vm=True)
+        self.assertEqual(runner.run(ERROR_YAML), -1)
+        self.assertIn("'1 / x0'", str(runner.error))
+        self.assertIsInstance(runner.error.__cause__, ZeroDivisionError)
+
+    def test_deep_nesting(self):
+        runner = YRunner(use_vm=True)
+        compiled = runner.compile(nested_ifs(5000))
+        self.assertEqual(runner.run(compiled), 0)
+        self.assertEqual(runner.variables['reached'], 5000)
+
+    def test_overriden_commands_not_lowered(self):
+        calls: typing.List[typing.Any] = []
+        custom_if = types.Command('if', lambda node, runner: calls.append(node), None)
+        runner = YRunner(custom_if, use_vm=True)
+        compiled = runner.compile(nested_ifs(1))
+        self.assertEqual(runner.run(compiled), 0)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(
+            [instruction.opcode for instruction in vm.get_code(compiled).instructions],
+            [vm.Opcode.CALL, vm.Opcode.CALL],
+        )